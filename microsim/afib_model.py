@@ -1,3 +1,5 @@
+import numpy as np
+
 from microsim.data_loader import load_regression_model
 from microsim.statsmodel_logistic_risk_factor_model import StatsModelLogisticRiskFactorModel
 from microsim.statsmodel_linear_risk_factor_model import StatsModelLinearRiskFactorModel
@@ -11,6 +13,10 @@ class AFibPrevalenceModel(StatsModelLogisticRiskFactorModel):
     def estimate_next_risk(self, person):
         return person._rng.uniform() < super().estimate_next_risk(person)
 
+    def estimate_next_risk_for_population(self, columns, draws):
+        """Population version of estimate_next_risk, draws are the uniform draws of the people in columns."""
+        return draws < super().estimate_next_risk_for_population(columns)
+
 #moved away from linear probability risk factor model because this approach gives the least absolute deviations in afib versus the
 #global burden of disease data
 #the intercept and age coefficient of the cohort afib model were modified to fit the gbd data
@@ -25,6 +31,12 @@ class AFibIncidenceModel(StatsModelLinearRiskFactorModel):
         riskWithResidual = linearRisk + self.draw_from_residual_distribution(person._rng)
         return person._rng.uniform() < riskWithResidual
 
+    def estimate_next_risk_for_population(self, columns, rngs=None):
+        linearRisk = super().estimate_next_risk_for_population(columns)
+        #the residual and then the uniform draw for each person must come from the rng of that person, as in estimate_next_risk
+        riskWithResidual = linearRisk + self.draw_from_residual_distribution_for_population(rngs)
+        return np.array([rng.uniform() for rng in rngs]) < riskWithResidual
+
     def estimate_next_risk_vectorized(self, x, rng=None):
         linearRisk = super().estimate_next_risk_vectorized(x)
         riskWithResidual = linearRisk + self.draw_from_residual_distribution(rng)
@@ -5,5 +5,8 @@ class AgeModel:
     def estimate_next_risk(self, person):
         return person._age[-1]+1
    
+    def estimate_next_risk_for_population(self, columns, rngs=None):
+        return columns["age"]+1
+
     def get_next_risk_factor(self, person):
         return person._age[-1]+1
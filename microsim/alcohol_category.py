@@ -12,3 +12,8 @@ class AlcoholCategory(IntEnum):
     @staticmethod
     def get_category_for_consumption(drinks_per_week):
         return AlcoholCategory(pd.cut([drinks_per_week], [-1, 0, 6, 13, np.Infinity]).codes[0])
+
+    @staticmethod
+    def get_categories_for_consumption(drinks_per_week):
+        """Same as get_category_for_consumption but for an array of drinks per week, returns a list of categories."""
+        return [AlcoholCategory(code) for code in pd.cut(drinks_per_week, [-1, 0, 6, 13, np.Infinity]).codes]
@@ -4,6 +4,7 @@ from microsim.alcohol_category import AlcoholCategory
 from microsim.smoking_status import SmokingStatus
 from microsim.race_ethnicity import RaceEthnicity
 from microsim.gender import NHANESGender
+from microsim.population_evaluation import PopulationEvaluation
 
 class AlcoholPrevalenceModel:
 
@@ -57,6 +58,16 @@ class AlcoholPrevalenceModel:
         else:
              raise RuntimeError("Draw not consistent with cumulative probabilities in AlcoholPrevalenceModel.estimate_next_risk.")
 
+    def estimate_next_risk_for_population(self, columns, draws):
+        """Population version of estimate_next_risk, draws are the uniform draws of the people in columns."""
+        linearPredictors = PopulationEvaluation.apply_by_categories(self.calc_linear_predictor_for_patient_characteristics, columns,
+                                                                    ["gender", "smokingStatus"])
+        return PopulationEvaluation.select_category(draws,
+                                                    list(map(PopulationEvaluation.inverse_logit, linearPredictors)),
+                                                    [AlcoholCategory.NONE, AlcoholCategory.ONETOSIX,
+                                                     AlcoholCategory.SEVENTOTHIRTEEN, AlcoholCategory.FOURTEENORMORE],
+                                                    "AlcoholPrevalenceModel.estimate_next_risk_for_population")
+
     def inv_logit(self, lp):
         # note: limit the calculation to avoid over/under-flow issues
         if lp<-10:
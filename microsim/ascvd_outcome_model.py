@@ -5,6 +5,7 @@ from microsim.statsmodel_linear_risk_factor_model import StatsModelLinearRiskFac
 from microsim.treatment import TreatmentStrategiesType
 from microsim.outcome import OutcomeType
 from microsim.modality import Modality
+from microsim.risk_factor import DynamicRiskFactorsType
 
 # https://annals.org/aim/fullarticle/2683613/[XSLTImagePath]
 
@@ -20,14 +21,22 @@ class ASCVDOutcomeModel(StatsModelLinearRiskFactorModel):
         return {
                 "tot_chol_hdl_ratio": (
                     self._tot_chol_hdl_ratio,
-                    lambda person: person._totChol[-1] / person._hdl[-1],
+                    lambda person: person._totCholHdlRatio,
                 ),
                 "black_race_x_tot_chol_hdl_ratio": (
                     self._black_race_x_tot_chol_hdl_ratio,
-                    lambda person: person._totChol[-1] / person._hdl[-1] * int(person._black),
+                    lambda person: person._totCholHdlRatio * int(person._black),
                 ),
             }
 
+    def estimate_linear_predictor_for_population(self, columns):
+        """Population version of the regression part of the linear predictor, including the manual parameters."""
+        totCholHdlRatio = np.asarray(columns[DynamicRiskFactorsType.TOT_CHOL.value], dtype=float) / np.asarray(columns[DynamicRiskFactorsType.HDL.value], dtype=float)
+        black = np.asarray(columns["black"], dtype=int)
+        return (self.get_intercept() + self.get_design_matrix(columns) @ self.non_intercept_coefficients
+                + self._tot_chol_hdl_ratio * totCholHdlRatio
+                + self._black_race_x_tot_chol_hdl_ratio * totCholHdlRatio * black)
+
     def get_intercept_change_for_person(self, person, interceptChangeFor1bpMedsAdded):
         '''Returns a constant factor that is added to the risk for person to reflect the
         adjusted risk when a person is under treatment.'''
@@ -44,6 +53,17 @@ class ASCVDOutcomeModel(StatsModelLinearRiskFactorModel):
         lp += self.get_scd_term(person) 
         return lp
 
+    def get_one_year_linear_predictor_for_population(self, people, columns, interceptChangeFor1bpMedsAdded=0):
+        lp = self.estimate_linear_predictor_for_population(columns)
+        lp += np.array(list(map(lambda x: self.get_intercept_change_for_person(x, interceptChangeFor1bpMedsAdded), people)), dtype=float)
+        lp += np.array(list(map(lambda x: self.get_scd_term(x), people)), dtype=float)
+        return lp
+
+    def transform_to_ten_year_risk_for_population(self, linearRisk):
+        with np.errstate(over="ignore"):
+            risk = 1 / (1 + np.exp(-1 * linearRisk))
+        return np.where(linearRisk<-10, 0., np.where(linearRisk>10, 1., risk))
+
     def transform_to_ten_year_risk(self, linearRisk):
         # bound the calculation to avoid over/under-flow errors
         if linearRisk<-10:
@@ -69,6 +89,14 @@ class ASCVDOutcomeModel(StatsModelLinearRiskFactorModel):
 
         return (self.transform_to_ten_year_risk(linearRiskMinusFourYears)) / 10 * years
 
+    def get_risk_for_population(self, people, columns, years, interceptChangeFor1bpMedsAdded=0):
+        """Population version of get_risk_for_person, columns are the current values of the attributes of people."""
+        linearRisk = self.get_one_year_linear_predictor_for_population(people, columns, interceptChangeFor1bpMedsAdded)
+        fourYearLinearAgeChange = self.parameters["lagAge"] * 4
+        linearRiskMinusFourYears = linearRisk - fourYearLinearAgeChange
+
+        return (self.transform_to_ten_year_risk_for_population(linearRiskMinusFourYears)) / 10 * years
+
     def get_risk_components_for_person(self, person, rng, years, interceptChangeFor1bpMedsAdded=0):
         '''This function returns the silent cerebrovascular disease component of the ASCVD risk
         and the ascvd risk without the scd component.
@@ -1,3 +1,5 @@
+import numpy as np
+
 from microsim.risk_model_repository import RiskModelRepository
 from microsim.stats_model_rounded_linear_risk_factor_model import StatsModelRoundedLinearRiskFactorModel
 from microsim.data_loader import load_regression_model
@@ -50,6 +52,10 @@ class AlcoholCategoryModel(StatsModelRoundedLinearRiskFactorModel):
         drinks = super(StatsModelRoundedLinearRiskFactorModel, self).estimate_next_risk(person)
         return AlcoholCategory.get_category_for_consumption(drinks if drinks > 0 else 0)
 
+    def estimate_next_risk_for_population(self, columns, rngs=None):
+        drinks = super(StatsModelRoundedLinearRiskFactorModel, self).estimate_next_risk_for_population(columns)
+        return AlcoholCategory.get_categories_for_consumption(np.where(drinks > 0, drinks, 0))
+
     def estimate_next_risk_vectorized(self, x, rng=None):
         drinks = super(StatsModelRoundedLinearRiskFactorModel, self).estimate_next_risk_vectorized(
             x
@@ -0,0 +1,139 @@
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+class ColumnarCache:
+    """An on-disk cache of a DataFrame that is built from a source file, eg the NHANES dataframe that is read from the .dta file,
+       renamed and converted to the Microsim categories. The DataFrame is stored one column per .npy file, so loading it reads
+       no more than the files and numeric columns are memory mapped (copy-on-write) instead of being copied.
+       The cache of a source file is kept in a directory named after the checksum of the source file and the version of the function
+       that builds the DataFrame, so a cache is never used for a modified source or after the preprocessing changed, a new one is built.
+       Categorical columns are stored as their codes and categories, object columns, eg strings, are stored pickled.
+       Objects other than DataFrames, eg the fitted Kaiser distributions, are cached pickled in a single file, see load_object.
+       The caches are kept in the user cache directory, not next to the source files in the package, see get_cache_directory.
+       _checksums: the checksums of the source files already computed in this process, with the modification time and size of the file."""
+
+    _checksums = dict()
+    #the environment variable with the directory of the caches, if it is not set the user cache directory is used
+    cacheDirectoryVariable = "MICROSIM_CACHE_DIR"
+
+    @staticmethod
+    def get_cache_directory():
+        """Returns $MICROSIM_CACHE_DIR if it is set, otherwise the microsim directory in the user cache directory, $XDG_CACHE_HOME or ~/.cache."""
+        directory = os.environ.get(ColumnarCache.cacheDirectoryVariable)
+        if not directory:
+            directory = os.path.join(os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"), "microsim")
+        return directory
+
+    @staticmethod
+    def get_checksum(path):
+        stat = os.stat(path)
+        cached = ColumnarCache._checksums.get(path)
+        if (cached is None) or (cached[0] != (stat.st_mtime_ns, stat.st_size)):
+            sha = hashlib.sha256()
+            with open(path, "rb") as f:
+                for chunk in iter(lambda: f.read(1<<20), b""):
+                    sha.update(chunk)
+            cached = ColumnarCache._checksums[path] = ((stat.st_mtime_ns, stat.st_size), sha.hexdigest())
+        return cached[1]
+
+    @staticmethod
+    def get_cache_path(sourcePaths, name, version):
+        """sourcePaths: a source file or a list of source files.
+           The cache directory is shared by all sources, the name, version and checksum of the sources tell the caches apart."""
+        sourcePaths = [sourcePaths] if isinstance(sourcePaths, str) else list(sourcePaths)
+        directory = ColumnarCache.get_cache_directory()
+        checksums = list(map(ColumnarCache.get_checksum, sourcePaths))
+        checksum = checksums[0] if len(checksums)==1 else hashlib.sha256("".join(checksums).encode()).hexdigest()
+        return os.path.join(directory, f"{name}-v{version}-{checksum[:16]}")
+
+    @staticmethod
+    def load(sourcePath, build, name, version=1):
+        """Returns build(sourcePath), from the cache if there is a cache for the current source file and version.
+           build: the function that reads and preprocesses the source file, called only if there is no cache.
+           name: the name of the cache, eg nhanes.
+           version: must be increased every time build changes, so that caches built with the old build are not used."""
+        cachePath = ColumnarCache.get_cache_path(sourcePath, name, version)
+        if os.path.isdir(cachePath):
+            return ColumnarCache.read(cachePath)
+        df = build(sourcePath)
+        try:
+            ColumnarCache.write(df, cachePath)
+        except OSError:
+            #eg a read-only installation, the dataframe is still correct, just not cached
+            pass
+        return df
+
+    @staticmethod
+    def load_object(sourcePaths, build, name, version=1):
+        """Same as load but for any picklable object built from one or more source files, build is called with sourcePaths."""
+        cachePath = ColumnarCache.get_cache_path(sourcePaths, name, version) + ".pkl"
+        if os.path.isfile(cachePath):
+            with open(cachePath, "rb") as f:
+                return pickle.load(f)
+        obj = build(sourcePaths)
+        try:
+            os.makedirs(os.path.dirname(cachePath), exist_ok=True)
+            fd, tmpPath = tempfile.mkstemp(dir=os.path.dirname(cachePath))
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    pickle.dump(obj, f, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(tmpPath, cachePath)
+            except BaseException:
+                os.remove(tmpPath)
+                raise
+        except OSError:
+            pass
+        return obj
+
+    @staticmethod
+    def write(df, cachePath):
+        """Writes the cache in a temporary directory that is renamed when complete, so that other processes never see a partial cache."""
+        os.makedirs(os.path.dirname(cachePath), exist_ok=True)
+        tmpPath = tempfile.mkdtemp(dir=os.path.dirname(cachePath))
+        try:
+            columns = list()
+            for i, column in enumerate(df.columns):
+                values = df[column]
+                fileName = f"{i}.npy"
+                if isinstance(values.dtype, pd.CategoricalDtype):
+                    kind = "categorical"
+                    np.save(os.path.join(tmpPath, fileName), values.cat.codes.to_numpy())
+                    np.save(os.path.join(tmpPath, f"{i}.categories.npy"), values.cat.categories.to_numpy(), allow_pickle=True)
+                else:
+                    kind = "object" if values.dtype==object else "array"
+                    np.save(os.path.join(tmpPath, fileName), values.to_numpy(), allow_pickle=(kind=="object"))
+                columns.append({"name": column, "kind": kind, "file": fileName})
+            np.save(os.path.join(tmpPath, "index.npy"), df.index.to_numpy(), allow_pickle=True)
+            with open(os.path.join(tmpPath, "columns.json"), "w") as f:
+                json.dump(columns, f)
+            os.rename(tmpPath, cachePath)
+        except OSError:
+            shutil.rmtree(tmpPath, ignore_errors=True)
+            #another process may have written the same cache in the meantime
+            if not os.path.isdir(cachePath):
+                raise
+
+    @staticmethod
+    def read(cachePath):
+        with open(os.path.join(cachePath, "columns.json")) as f:
+            columns = json.load(f)
+        data = dict()
+        for column in columns:
+            path = os.path.join(cachePath, column["file"])
+            if column["kind"]=="array":
+                data[column["name"]] = np.load(path, mmap_mode="c").view(np.ndarray)
+            elif column["kind"]=="categorical":
+                categories = np.load(path.replace(".npy", ".categories.npy"), allow_pickle=True)
+                data[column["name"]] = pd.Categorical.from_codes(np.load(path), categories=categories)
+            else:
+                data[column["name"]] = np.load(path, allow_pickle=True)
+        index = np.load(os.path.join(cachePath, "index.npy"), allow_pickle=True)
+        index = pd.RangeIndex(len(index)) if np.array_equal(index, np.arange(len(index))) else pd.Index(index)
+        return pd.DataFrame(data, index=index, copy=False)
@@ -0,0 +1,496 @@
+import numpy as np
+import pandas as pd
+import weakref
+from multiprocessing import shared_memory
+
+from microsim.gfr_equation import GFREquation
+from microsim.history_buffer import HistoryBuffer
+from microsim.population import Population
+from microsim.population_executor import PopulationExecutor
+from microsim.outcome import OutcomeType
+from microsim.population_model_repository import PopulationRepositoryType
+from microsim.random_streams import RandomStreams
+from microsim.risk_factor import ContinuousRiskFactorsType, DynamicRiskFactorsType, StaticRiskFactorsType
+from microsim.treatment import ContinuousDefaultTreatmentsType
+
+class PopulationColumns:
+    """Struct-of-arrays representation of the state of a set of Person-instances.
+       Static risk factors are stored as 1-d arrays indexed by person.
+       Dynamic risk factors and default treatments are stored as 2-d arrays indexed by (person, wave), subscript [:,0] is
+       the baseline, exactly as in the Person lists.
+       Continuous quantities are stored as float arrays, everything else (enums, booleans, None) as object arrays so that
+       the values Person-instances see are the same values the models produced.
+       _nFilled: how many waves of history each person has (the fill pointer for the 2-d arrays).
+       _waveCompleted: the Person-instance _waveCompleted for every person.
+       _alive: True if the person does not have a death outcome.
+       _treatmentStrategyStatus: for every TreatmentStrategiesType value, an object array with the person strategy status.
+       _outcomeCounts: for every OutcomeType, an int array with the number of outcomes each person has."""
+
+    continuousTypes = [x.value for x in ContinuousRiskFactorsType] + [x.value for x in ContinuousDefaultTreatmentsType]
+
+    def __init__(self, people, extraWaves=0):
+        people = list(people)
+        self._n = len(people)
+        self._staticRiskFactors = list(people[0]._staticRiskFactors) if self._n>0 else []
+        self._dynamicRiskFactors = list(people[0]._dynamicRiskFactors) if self._n>0 else []
+        self._defaultTreatments = list(people[0]._defaultTreatments) if self._n>0 else []
+        self._nFilled = np.array([len(getattr(x, "_"+self._dynamicRiskFactors[0])) for x in people], dtype=int) if self._n>0 else np.zeros(0, dtype=int)
+        self._waveCompleted = np.array([x._waveCompleted for x in people], dtype=int)
+        self._alive = np.array([x.is_alive for x in people], dtype=bool)
+        nWaves = (self._nFilled.max() if self._n>0 else 0) + extraWaves
+        self._static = dict()
+        for attr in self._staticRiskFactors:
+            self._static[attr] = self.get_column_from_values([getattr(x, "_"+attr) for x in people], attr)
+        self._history = dict()
+        for attr in self._dynamicRiskFactors + self._defaultTreatments:
+            self._history[attr] = self.get_history_from_lists([getattr(x, "_"+attr) for x in people], attr, nWaves)
+        self._treatmentStrategyStatus = dict()
+        if self._n>0:
+            for tsType in people[0]._treatmentStrategies.keys():
+                self._treatmentStrategyStatus[tsType] = np.array([x._treatmentStrategies[tsType]["status"] for x in people], dtype=object)
+        self._outcomeCounts = dict()
+        if self._n>0:
+            for outcomeType in people[0]._outcomes.keys():
+                self._outcomeCounts[outcomeType] = np.array([len(x._outcomes[outcomeType]) for x in people], dtype=int)
+
+    def is_continuous(self, attr, values):
+        return (attr in PopulationColumns.continuousTypes) & all(map(lambda x: isinstance(x, (int, float, np.integer, np.floating)) and
+                                                                               not isinstance(x, (bool, np.bool_)), values))
+
+    def get_column_from_values(self, values, attr):
+        column = np.empty(len(values), dtype=float if self.is_continuous(attr, values) else object)
+        column[:] = values
+        return column
+
+    def get_history_from_lists(self, lists, attr, nWaves):
+        continuous = self.is_continuous(attr, [x for sublist in lists for x in sublist])
+        history = np.full((len(lists), nWaves), np.nan) if continuous else np.full((len(lists), nWaves), None, dtype=object)
+        for i, values in enumerate(lists):
+            history[i, :len(values)] = values
+        return history
+
+    @property
+    def nWaves(self):
+        """Returns the number of waves the history arrays can hold without reallocation."""
+        return self._history[self._dynamicRiskFactors[0]].shape[1] if len(self._dynamicRiskFactors)>0 else 0
+
+    def reserve(self, extraWaves):
+        """Makes sure that every person can have extraWaves more waves of history without reallocation.
+           Returns True if the history arrays were reallocated, views of the old arrays, eg bound Person-instances, are then stale."""
+        needed = (self._nFilled.max() if self._n>0 else 0) + extraWaves
+        nWaves = self.nWaves
+        if needed > nWaves:
+            for attr, history in self._history.items():
+                extra = np.full((self._n, needed-nWaves), np.nan if history.dtype==float else None, dtype=history.dtype)
+                self._history[attr] = np.concatenate([history, extra], axis=1)
+            return True
+        return False
+
+    def get_alive_indices(self):
+        return np.flatnonzero(self._alive)
+
+    def append(self, attr, indices, values, people):
+        """Stores the next wave values of attr for the people at indices and points the Person-instance attributes to
+           the extended history so that models that are evaluated after this one see the new value at [-1]."""
+        history = self._history[attr]
+        history[indices, self._nFilled[indices]] = values
+        for i, person in zip(indices, people):
+            setattr(person, "_"+attr, history[i, :self._nFilled[i]+1])
+            person.clear_derived_values()
+
+    def bind(self, people):
+        """Points the history attributes of the Person-instances to rows of the 2-d arrays."""
+        for attr, history in self._history.items():
+            for i, person in enumerate(people):
+                setattr(person, "_"+attr, history[i, :self._nFilled[i]])
+
+    def unbind(self, people):
+        """Restores plain list histories on the Person-instances, so that they can be used without the columns."""
+        for attr, history in self._history.items():
+            for i, person in enumerate(people):
+                setattr(person, "_"+attr, history[i, :self._nFilled[i]].tolist())
+
+    def update_person_state(self, indices, people):
+        """Collects the treatment strategy and outcome state the per-person models left on the Person-instances."""
+        self._waveCompleted[indices] = [x._waveCompleted for x in people]
+        self._alive[indices] = [x.is_alive for x in people]
+        for tsType, status in self._treatmentStrategyStatus.items():
+            status[indices] = [x._treatmentStrategies[tsType]["status"] for x in people]
+        for outcomeType, counts in self._outcomeCounts.items():
+            counts[indices] = [len(x._outcomes[outcomeType]) for x in people]
+
+    def get_rows(self, start, stop):
+        """Returns a PopulationColumns-instance for the people start:stop whose arrays are views of the arrays of this instance,
+           so that advancing the rows writes directly to these columns."""
+        rows = PopulationColumns.__new__(PopulationColumns)
+        rows._n = stop - start
+        rows._staticRiskFactors = self._staticRiskFactors
+        rows._dynamicRiskFactors = self._dynamicRiskFactors
+        rows._defaultTreatments = self._defaultTreatments
+        rows._nFilled = self._nFilled[start:stop]
+        rows._waveCompleted = self._waveCompleted[start:stop]
+        rows._alive = self._alive[start:stop]
+        rows._static = {attr: column[start:stop] for attr, column in self._static.items()}
+        rows._history = {attr: history[start:stop] for attr, history in self._history.items()}
+        rows._treatmentStrategyStatus = {tsType: status[start:stop] for tsType, status in self._treatmentStrategyStatus.items()}
+        rows._outcomeCounts = {outcomeType: counts[start:stop] for outcomeType, counts in self._outcomeCounts.items()}
+        return rows
+
+    def get_current(self, attr):
+        """Returns the most recent value of attr for every person."""
+        if attr in self._static.keys():
+            return self._static[attr]
+        else:
+            return self._history[attr][np.arange(self._n), self._nFilled-1]
+
+class SharedPopulationColumns:
+    """Keeps the numeric arrays of a PopulationColumns-instance (continuous histories, fill pointers, waves completed, alive flags
+       and outcome counts) in multiprocessing.shared_memory segments, so that worker processes can advance row ranges of the
+       columns in place and the parent process sees the results without deserialization.
+       Object arrays (enums, booleans, None) cannot be placed in shared memory, they stay private to each process.
+       _segments: the SharedMemory-instances created by the parent process.
+       descriptor: for every shared array, its location in the PopulationColumns-instance and the name, shape and dtype of
+                   its segment, this is what workers need in order to attach to the segments."""
+
+    def __init__(self, columns):
+        self._columns = columns
+        self._segments = []
+        self.descriptor = dict()
+        for key, array in SharedPopulationColumns.get_numeric_arrays(columns).items():
+            segment = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+            sharedArray = np.ndarray(array.shape, dtype=array.dtype, buffer=segment.buf)
+            sharedArray[...] = array
+            SharedPopulationColumns.set_array(columns, key, sharedArray)
+            self._segments.append(segment)
+            self.descriptor[key] = (segment.name, array.shape, array.dtype)
+
+    @staticmethod
+    def get_numeric_arrays(columns):
+        """Returns the arrays of columns that can be shared, keyed by (attribute, key) with key None for the 1-d arrays."""
+        arrays = {("_nFilled", None): columns._nFilled, ("_waveCompleted", None): columns._waveCompleted, ("_alive", None): columns._alive}
+        for attr, history in columns._history.items():
+            if history.dtype!=object:
+                arrays[("_history", attr)] = history
+        for outcomeType, counts in columns._outcomeCounts.items():
+            arrays[("_outcomeCounts", outcomeType)] = counts
+        return arrays
+
+    @staticmethod
+    def set_array(columns, key, array):
+        attr, subKey = key
+        if subKey is None:
+            setattr(columns, attr, array)
+        else:
+            getattr(columns, attr)[subKey] = array
+
+    @staticmethod
+    def attach(descriptor, rows, start, stop):
+        """Points the numeric arrays of rows, the PopulationColumns-instance for the people start:stop, to the shared segments.
+           Returns the SharedMemory-instances, which need to be kept open as long as the arrays are used."""
+        segments = []
+        for key, (name, shape, dtype) in descriptor.items():
+            segment = shared_memory.SharedMemory(name=name)
+            SharedPopulationColumns.set_array(rows, key, np.ndarray(shape, dtype=dtype, buffer=segment.buf)[start:stop])
+            segments.append(segment)
+        return segments
+
+    def close(self):
+        """Copies the shared arrays back to private memory and releases the shared segments."""
+        arrays = SharedPopulationColumns.get_numeric_arrays(self._columns)
+        for key in self.descriptor.keys():
+            SharedPopulationColumns.set_array(self._columns, key, np.array(arrays[key]))
+        del arrays
+        for segment in self._segments:
+            segment.close()
+            segment.unlink()
+        self._segments = []
+
+class CurrentValueColumns(dict):
+    """A dictionary with the current value of person attributes, one array per attribute, for the people at indices.
+       This is the columns argument of the population versions of the models, eg StatsModelLinearRiskFactorModel.get_design_matrix.
+       Attributes that are not held in the PopulationColumns, eg Person properties, are obtained from the people the first time they
+       are requested. The gfr is computed for everyone at once with GFREquation.get_gfr_for_population."""
+
+    def __init__(self, populationColumns, indices, people):
+        super().__init__()
+        self._people = people
+        for attr, column in populationColumns._static.items():
+            self[attr] = column[indices]
+        for attr, history in populationColumns._history.items():
+            self[attr] = history[indices, populationColumns._nFilled[indices]-1]
+
+    def __missing__(self, attr):
+        if attr=="gfr":
+            self[attr] = GFREquation.get_gfr_for_population(self[StaticRiskFactorsType.GENDER.value], self[StaticRiskFactorsType.RACE_ETHNICITY.value],
+                                                            self[DynamicRiskFactorsType.CREATININE.value], self[DynamicRiskFactorsType.AGE.value])
+            return self[attr]
+        values = [getattr(x, "_"+attr) for x in self._people]
+        column = np.empty(len(values), dtype=object)
+        column[:] = [x[-1] if isinstance(x, (list, np.ndarray, HistoryBuffer)) else x for x in values]
+        self[attr] = column
+        return column
+
+    def get_subset(self, positions):
+        """Returns the columns for the people at positions (positions in these columns, not in the population)."""
+        subset = CurrentValueColumns.__new__(CurrentValueColumns)
+        dict.__init__(subset, {attr: column[positions] for attr, column in self.items()})
+        subset._people = self._people[positions]
+        return subset
+
+class ColumnarPopulation(Population):
+    """A Population-instance that advances wave-by-wave over the whole population instead of person-by-person.
+       The state of the people is held in a PopulationColumns instance (struct-of-arrays). During advance the Person-instances
+       only hold views to rows of the columns, so adding a wave is an O(1) write instead of a copy of the history list.
+       Risk factor and default treatment models that implement estimate_next_risk_for_population are evaluated for everyone at once,
+       all other models are still evaluated with the same Person-instance arguments.
+       Outcomes are predicted one OutcomeType at a time, in the OutcomeType order, for everyone alive. Outcome model repositories that implement
+       get_next_outcomes_for_population (CV, stroke and MI partition, non CV death and dementia) predict the outcome for everyone
+       with array operations, the rest are evaluated person by person. Since every person has their own rng
+       and all models for a person draw from it in the same order as in Person.advance, the trajectories are the same as
+       the ones of Population.advance (up to floating point summation order in the population linear predictors).
+       horizon: the number of waves the population is expected to be advanced, used to preallocate the columns.
+       The columns are the representation of the population across advance calls: between calls the Person-instances keep
+       the views of the columns they hold during advance, so consecutive advance calls neither rebuild the columns nor copy the histories.
+       Reading the people (the _people property, eg the getters and reporting methods of Population) gives them plain list histories again,
+       and since the people may then be modified, the next advance starts from new columns built from their current state.
+       _peopleBound: True while the Person-instances hold views of the columns.
+       _sharedColumns: the SharedPopulationColumns-instance of the columns while the people are resident in the workers of _executor.
+       _shardBounds: the row ranges of the shards of _executor."""
+
+    def __init__(self, people, popModelRepository, horizon=0, seed=None):
+        self._peopleBound = False
+        self._sharedColumns = None
+        self._shardBounds = []
+        super().__init__(people, popModelRepository, seed=seed)
+        self._horizon = horizon
+        self._columns = PopulationColumns(self._peopleSeries, extraWaves=horizon)
+        self._columns.bind(self._peopleSeries.values)
+        self._peopleBound = True
+
+    @property
+    def _people(self):
+        self.gather_people()
+        self.unbind_people()
+        return self._peopleSeries
+
+    @_people.setter
+    def _people(self, people):
+        self._peopleSeries = people
+
+    def unbind_people(self):
+        """Gives the Person-instances plain list histories, the columns keep the same values."""
+        if self._peopleBound:
+            self._columns.unbind(self._peopleSeries.values)
+            self._peopleBound = False
+
+    def bind_people(self, years):
+        """Makes sure the columns can hold years more waves and that the Person-instances hold views of the columns.
+           Returns the array of the Person-instances."""
+        people = self._peopleSeries.values
+        extraWaves = max(years, self._horizon-self._waveCompleted-1)
+        if not self._peopleBound:
+            #the people may have been modified since they were read, so start from their current state
+            self._columns = PopulationColumns(people, extraWaves=extraWaves)
+            self._columns.bind(people)
+            self._peopleBound = True
+        elif self._columns.reserve(years):
+            self._columns.bind(people)
+        return people
+
+    def advance(self, years, treatmentStrategies=None, nWorkers=1, gather=True, nChunks=None):
+        """The population is advanced in row ranges of the columns with nWorkers>1 (see advance_parallel), nChunks is not used."""
+        if nWorkers==1:
+            self.gather_people()
+            self.advance_serial(years, treatmentStrategies=treatmentStrategies)
+        elif nWorkers>1:
+            self.advance_parallel(years, treatmentStrategies=treatmentStrategies, nWorkers=nWorkers, gather=gather)
+        else:
+            print(f"Invalid nWorkers={nWorkers} argument provided.")
+
+    def advance_serial(self, years, treatmentStrategies=None):
+        people = self.bind_people(years)
+        for year in range(years):
+            self.advance_wave(people, treatmentStrategies)
+        self._aliveIndices = self._columns.get_alive_indices()
+        self._waveCompleted += years
+
+    def advance_wave(self, people, treatmentStrategies=None):
+        """Performs one complete advance (risk factors, treatments, treatment strategies, outcomes) for everyone alive."""
+        columns = self._columns
+        alive = columns.get_alive_indices()
+        alivePeople = people[alive]
+        for person in alivePeople:
+            person.start_wave_random_numbers()
+            person.start_derived_values()
+        #people that have completed at least one wave need their risk factors and treatments advanced, see Person.advance
+        advancing = alive[columns._waveCompleted[alive] > -1]
+        advancingPeople = people[advancing]
+        if len(advancing)>0:
+            currentValues = CurrentValueColumns(columns, advancing, advancingPeople)
+            rngs = [x._rng for x in advancingPeople]
+            rfRepository = self._modelRepository[PopulationRepositoryType.DYNAMIC_RISK_FACTORS.value]
+            for i, rf in enumerate(columns._dynamicRiskFactors):
+                list(map(lambda x: x.start_random_substream(RandomStreams.riskFactorSubstreams + i), advancingPeople))
+                model = rfRepository.get_model(rf)
+                if ColumnarPopulation.has_population_estimate(model) and hasattr(rfRepository, "apply_bounds_for_population"):
+                    values = rfRepository.apply_bounds_for_population(rf, model.estimate_next_risk_for_population(currentValues, rngs))
+                else:
+                    values = list(map(lambda x: rfRepository.apply_bounds(rf, x.get_next_risk_factor(rf, rfRepository)), advancingPeople))
+                columns.append(rf, advancing, values, advancingPeople)
+                #models that are evaluated later in this wave see the new value, as in Person.advance_risk_factors
+                currentValues[rf] = columns._history[rf][advancing, columns._nFilled[advancing]]
+            treatmentRepository = self._modelRepository[PopulationRepositoryType.DEFAULT_TREATMENTS.value]
+            for i, treatment in enumerate(columns._defaultTreatments):
+                list(map(lambda x: x.start_random_substream(RandomStreams.treatmentSubstreams + i), advancingPeople))
+                model = treatmentRepository.get_model(treatment)
+                if ColumnarPopulation.has_population_estimate(model):
+                    values = model.estimate_next_risk_for_population(currentValues, rngs)
+                else:
+                    values = list(map(lambda x: x.get_next_treatment(treatment, treatmentRepository), advancingPeople))
+                columns.append(treatment, advancing, values, advancingPeople)
+                currentValues[treatment] = columns._history[treatment][advancing, columns._nFilled[advancing]]
+            columns._nFilled[advancing] += 1
+        for person in alivePeople:
+            person.advance_treatment_strategies_and_update_risk_factors(treatmentStrategies)
+        self.advance_outcomes_for_population(alive, alivePeople)
+        for person in alivePeople:
+            person._waveCompleted += 1
+            person.release_random_numbers()
+            person.stop_derived_values()
+        columns.update_person_state(alive, alivePeople)
+
+    def advance_outcomes_for_population(self, indices, people):
+        """Population version of Person.advance_outcomes for the people at indices.
+           Outcome types are visited in the same order as in Person.get_outcomes_in_order and the outcomes of one type are added
+           to the people before the next type is predicted, eg the stroke partition sees the CV outcomes of the current wave."""
+        if len(people)==0:
+            return
+        outcomeRepository = self._modelRepository[PopulationRepositoryType.OUTCOMES.value]
+        for outcomeType in people[0].get_outcomes_in_order():
+            list(map(lambda x: x.start_random_substream(RandomStreams.outcomeSubstreams + list(OutcomeType).index(outcomeType)), people))
+            repository = outcomeRepository._repository[outcomeType]
+            if hasattr(repository, "get_next_outcomes_for_population"):
+                #the columns are obtained again for every outcome type because outcomes change person properties, eg _stroke
+                columns = CurrentValueColumns(self._columns, indices, people)
+                outcomes = repository.get_next_outcomes_for_population(people, columns)
+            else:
+                outcomes = list(map(lambda x: repository.select_outcome_model_for_person(x).get_next_outcome(x), people))
+            list(map(lambda x, outcome: x.add_outcome(outcome), people, outcomes))
+
+    @staticmethod
+    def has_population_estimate(model):
+        """A model can be evaluated for the whole population only if the class that implements its estimate_next_risk
+           also implements estimate_next_risk_for_population, otherwise the two may not agree."""
+        for modelClass in type(model).__mro__:
+            if "estimate_next_risk" in modelClass.__dict__:
+                return "estimate_next_risk_for_population" in modelClass.__dict__
+        return False
+
+    def copy(self):
+        population = super().copy()
+        return ColumnarPopulation(population._people, self.get_pop_model_repository_copy(), horizon=self._horizon, seed=self._seed)
+
+    def advance_parallel(self, years, treatmentStrategies=None, nWorkers=2, gather=True):
+        """Advances the population in nWorkers worker processes of a PopulationExecutor that share the numeric columns of the population.
+           Each worker holds the people of a contiguous row range of the columns and advances them in place, in shared memory.
+           The shards are created only the first time and then stay resident, like the ones of Population.advance_parallel,
+           so consecutive calls only send the advance arguments to the workers and nothing is sent back: the parent process
+           sees the alive flags and the numeric histories in the shared columns.
+           If gather is True the people are brought back after the advance (see gather_people), otherwise they stay in the workers
+           until they are read. The shards are also gathered, and created again, if the columns cannot hold years more waves."""
+        if (self._executor is not None) and ((self._executor.nWorkers!=nWorkers) or
+                                             (self._columns._nFilled.max()+years > self._columns.nWaves)):
+            self.gather_people()
+        if self._executor is None:
+            people = self.bind_people(years)
+            self._sharedColumns = SharedPopulationColumns(self._columns)
+            bounds = np.cumsum([0] + [len(x) for x in np.array_split(np.arange(self._n), nWorkers)])
+            self._shardBounds = list(zip(bounds[:-1], bounds[1:]))
+            self._executor = PopulationExecutor([ColumnarPopulationShard(people[start:stop], self._columns.get_rows(start, stop), self._modelRepository,
+                                                                         self._sharedColumns.descriptor, start, stop)
+                                                 for start, stop in self._shardBounds])
+            self._executorFinalizer = weakref.finalize(self, ColumnarPopulation.close_resident_shards, self._executor, self._sharedColumns)
+        self._executor.advance(years, treatmentStrategies)
+        self._aliveIndices = self._columns.get_alive_indices()
+        self._waveCompleted += years
+        if gather:
+            self.gather_people()
+
+    def gather_people(self):
+        """Brings the people held by the workers back, copies the object columns of the workers to the columns of the population,
+           moves the shared columns back to private memory and closes the executor."""
+        if self._executor is not None:
+            executor = self._executor
+            self._executor = None
+            self._executorFinalizer.detach()
+            shardStates = executor.gather()
+            executor.close()
+            rows = [self._columns.get_rows(start, stop) for start, stop in self._shardBounds]
+            for shardRows, (people, objectColumns) in zip(rows, shardStates):
+                for attr, history in objectColumns["_history"].items():
+                    shardRows._history[attr][...] = history
+                for tsType, status in objectColumns["_treatmentStrategyStatus"].items():
+                    shardRows._treatmentStrategyStatus[tsType][...] = status
+            del rows
+            self._sharedColumns.close()
+            self._sharedColumns = None
+            people = np.empty(self._n, dtype=object)
+            people[:] = [person for shardPeople, objectColumns in shardStates for person in shardPeople]
+            self._peopleSeries = pd.Series(people, index=self._peopleSeries.index)
+            self._columns.bind(people)
+            self._peopleBound = True
+
+    @staticmethod
+    def close_resident_shards(executor, sharedColumns):
+        """Closes the workers and releases the shared segments of a population that is discarded while its shards are resident."""
+        executor.close()
+        sharedColumns.close()
+
+class ColumnarPopulationShard:
+    """The people start:stop of a ColumnarPopulation-instance, resident in a PopulationExecutor worker and advanced directly in the
+       shared columns of the population (see SharedPopulationColumns). The waves are advanced with the same methods as
+       ColumnarPopulation, but a shard is not a population: it has no people index, alive indices or executor of its own.
+       _people: array with the Person-instances of the rows.
+       _columns: the rows of the columns of the population, the numeric arrays are attached to the shared segments the first time
+                 the shard is advanced (they are not sent to the worker).
+       _descriptor: the SharedPopulationColumns descriptor of the shared segments.
+       _segments: the SharedMemory-instances the rows are attached to, None until the first advance."""
+
+    advance_wave = ColumnarPopulation.advance_wave
+    advance_outcomes_for_population = ColumnarPopulation.advance_outcomes_for_population
+
+    def __init__(self, people, rows, modelRepository, descriptor, start, stop):
+        self._people = people
+        self._n = stop - start
+        self._modelRepository = modelRepository
+        for key in descriptor.keys():
+            SharedPopulationColumns.set_array(rows, key, None)
+        self._columns = rows
+        self._descriptor = descriptor
+        self._start = start
+        self._stop = stop
+        self._segments = None
+
+    def worker_advance(self, years, treatmentStrategies=None):
+        """Advances the rows in the shared columns, the parent sees the results there so nothing is returned."""
+        if self._segments is None:
+            self._segments = SharedPopulationColumns.attach(self._descriptor, self._columns, self._start, self._stop)
+            self._columns.bind(self._people)
+        for year in range(years):
+            self.advance_wave(self._people, treatmentStrategies)
+
+    def worker_gather(self):
+        """Returns the Person-instances and the object columns of the rows, the only state the parent does not see in the shared columns.
+           The histories of the people are dropped, the parent points them to its columns again."""
+        objectColumns = {"_history": {attr: history for attr, history in self._columns._history.items() if history.dtype==object},
+                         "_treatmentStrategyStatus": self._columns._treatmentStrategyStatus}
+        for attr in self._columns._history.keys():
+            for person in self._people:
+                setattr(person, "_"+attr, None)
+        #drop all views of the segments before they are closed
+        self._columns = None
+        if self._segments is not None:
+            for segment in self._segments:
+                segment.close()
+            self._segments = None
+        return list(self._people), objectColumns
@@ -4,6 +4,8 @@ from microsim.data_loader import load_model_spec
 from microsim.outcome import Outcome, OutcomeType
 from microsim.treatment import TreatmentStrategiesType
 
+import numpy as np
+
 class CVModelBase(ASCVDOutcomeModel):
     """CV is an outcome type that we need to use with some outcome type model implementations (stroke and mi).
        The male and female cv models share the same functions so this base class includes all common elements."""
@@ -40,6 +42,19 @@ class CVModelBase(ASCVDOutcomeModel):
 
         return cvRisk
         
+    def get_risk_for_population(self, people, columns, years=1):
+        """Population version of get_risk_for_person."""
+        cvRisk = super().get_risk_for_population(people, columns, years=years, interceptChangeFor1bpMedsAdded=self.interceptChangeFor1bpMedsAdded)
+
+        secondaryPrevention = np.asarray(columns["mi"], dtype=bool) | np.asarray(columns["stroke"], dtype=bool)
+        cvRisk = np.where(secondaryPrevention, cvRisk * self._secondary_prevention_multiplier, cvRisk)
+
+        tst = TreatmentStrategiesType.STATIN.value
+        statinsAdded = np.array(list(map(lambda x: x._treatmentStrategies[tst].get("statinsAdded", 0), people)))
+        cvRisk = np.where(statinsAdded>0, cvRisk * self._statinAdded_relative_risk, cvRisk)
+
+        return cvRisk
+
     def generate_next_outcome(self, person):
         #for now assume it is not a fatal event, and update later at the stroke or mi outcomes
         #if in the future we chose different stroke/mi models that do not update cv outcome fatality, then cv fatality will need to be decided here
@@ -52,6 +67,12 @@ class CVModelBase(ASCVDOutcomeModel):
         else: 
             return None        
 
+    def get_next_outcomes_for_population(self, people, columns):
+        """Population version of get_next_outcome, returns a list with the outcome (or None) of every person."""
+        risks = self.get_risk_for_population(people, columns)
+        draws = np.array(list(map(lambda x: x._rng.uniform(size=1)[0], people)))
+        return list(map(lambda x, hasOutcome: self.generate_next_outcome(x) if hasOutcome else None, people, draws < risks))
+
     def get_risk_components_for_person(self, person, years=1):
         '''Returns the risk without taking into account silent cerebrovascular disease and the risk just due to scd.
         Does not make adjustments for secondary prevention as get_risk_for_person does.'''
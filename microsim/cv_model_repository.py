@@ -1,7 +1,10 @@
 from microsim.cv_model import *
 from microsim.gender import NHANESGender
+from microsim.risk_factor import StaticRiskFactorsType
 from microsim.treatment import TreatmentStrategiesType
 
+import numpy as np
+
 class CVModelRepository:
     def __init__(self, wmhSpecific=True):
         self._models = {"male": CVModelMale(wmhSpecific=wmhSpecific),
@@ -11,4 +14,16 @@ class CVModelRepository:
         gender = "male" if person._gender==NHANESGender.MALE else "female"
         return self._models[gender]
 
+    def get_next_outcomes_for_population(self, people, columns):
+        """Predicts the CV outcomes of people with one population evaluation per gender model."""
+        outcomes = [None] * len(people)
+        male = np.array(list(map(lambda x: x==NHANESGender.MALE, columns[StaticRiskFactorsType.GENDER.value])), dtype=bool)
+        for gender, mask in [("male", male), ("female", ~male)]:
+            positions = np.flatnonzero(mask)
+            if len(positions)>0:
+                genderOutcomes = self._models[gender].get_next_outcomes_for_population(people[positions], columns.get_subset(positions))
+                for position, outcome in zip(positions, genderOutcomes):
+                    outcomes[position] = outcome
+        return outcomes
+
 
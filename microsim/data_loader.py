@@ -1,6 +1,7 @@
 import json
 import re
 import os.path
+from types import MappingProxyType
 from microsim.regression_model import RegressionModel
 
 
@@ -16,13 +17,30 @@ def load_datafile(filename):
         return datafile.read()
 
 
+#parsed, read-only model specs, keyed by model name
+_model_spec_cache = dict()
+
+
+def freeze_model_spec(value):
+    """Returns a read-only version of a parsed JSON value, dictionaries become MappingProxyType-instances and lists become tuples."""
+    if isinstance(value, dict):
+        return MappingProxyType({k: freeze_model_spec(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return tuple(freeze_model_spec(v) for v in value)
+    return value
+
+
 def load_model_spec(modelname):
+    """Returns the spec of modelname. The file is parsed only the first time, all callers then share the same read-only spec,
+    so callers that need different values, eg the intercept of StrokePartitionModel, build a new dictionary from it."""
     modelspecnamepattern = r"^[A-Za-z0-9\-]+$"
     if not re.match(modelspecnamepattern, modelname):
         raise ValueError(f"Potentially unsafe model name: {modelname}")
-    data = load_datafile(f"{modelname}Spec.json")
-    model_spec = json.loads(data)
-    return model_spec
+    spec = _model_spec_cache.get(modelname)
+    if spec is None:
+        data = load_datafile(f"{modelname}Spec.json")
+        spec = _model_spec_cache[modelname] = freeze_model_spec(json.loads(data))
+    return spec
 
 
 def load_regression_model(modelname):
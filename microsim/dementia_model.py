@@ -8,6 +8,7 @@ from microsim.cox_regression_model import CoxRegressionModel
 from microsim.outcome import OutcomeType, Outcome
 from microsim.modality import Modality
 from microsim.wmh_severity import WMHSeverity
+from microsim.risk_factor import DynamicRiskFactorsType, StaticRiskFactorsType
 
 class DementiaModel(StatsModelCoxModel):
 
@@ -71,31 +72,60 @@ class DementiaModel(StatsModelCoxModel):
             xb += 0.1937563
 
         if self.wmhSpecific: #if we just want a mean increased risk for the kaiser population then the modified linear and quadratic term adjustment did it    
-            if sbi:
-                if currentAge < 70:
-                    xb += np.log(2.02)
-                else:
-                    xb += np.log(1.22) 
-            if modality == Modality.MR.value:
-                if severityUnknown:
-                    xb += np.log(1.67)
-                elif severity == WMHSeverity.MILD:
-                    xb += np.log(1.41)
-                elif severity == WMHSeverity.MODERATE:
-                    xb += np.log(2.03)
-                elif severity == WMHSeverity.SEVERE:
-                    xb += np.log(2.32)
-            elif modality == Modality.CT.value:
-                if severityUnknown:
-                    xb += np.log(3.40)
-                elif severity == WMHSeverity.MILD:
-                    xb += np.log(2.62)
-                elif severity == WMHSeverity.MODERATE:
-                    xb += np.log(4.16)
-                elif severity == WMHSeverity.SEVERE:
-                    xb += np.log(4.11)
-                elif severity == WMHSeverity.NO:
-                    xb += np.log(1.58)
+            xb = self.add_wmh_terms(xb, currentAge, modality, sbi, severityUnknown, severity)
 
         return xb
 
+    def add_wmh_terms(self, xb, currentAge, modality, sbi, severityUnknown, severity):
+        if sbi:
+            if currentAge < 70:
+                xb += np.log(2.02)
+            else:
+                xb += np.log(1.22) 
+        if modality == Modality.MR.value:
+            if severityUnknown:
+                xb += np.log(1.67)
+            elif severity == WMHSeverity.MILD:
+                xb += np.log(1.41)
+            elif severity == WMHSeverity.MODERATE:
+                xb += np.log(2.03)
+            elif severity == WMHSeverity.SEVERE:
+                xb += np.log(2.32)
+        elif modality == Modality.CT.value:
+            if severityUnknown:
+                xb += np.log(3.40)
+            elif severity == WMHSeverity.MILD:
+                xb += np.log(2.62)
+            elif severity == WMHSeverity.MODERATE:
+                xb += np.log(4.16)
+            elif severity == WMHSeverity.SEVERE:
+                xb += np.log(4.11)
+            elif severity == WMHSeverity.NO:
+                xb += np.log(1.58)
+        return xb
+
+    def linear_predictor_for_population(self, people, columns):
+        """Population version of linear_predictor, the terms are added in the same order as in linear_predictor_for_patient_characteristics."""
+        xb = np.asarray(columns[DynamicRiskFactorsType.AGE.value], dtype=float) * 0.1023685
+        xb += np.asarray(columns["baselineGcp"], dtype=float) * -0.0754936
+        xb += np.asarray(columns["gcpSlope"], dtype=float) * -0.000999
+        xb += np.array(list(map(lambda x: 0.0950601 if x==NHANESGender.FEMALE else 0., columns[StaticRiskFactorsType.GENDER.value])))
+        educationTerms = {Education.LESSTHANHIGHSCHOOL: 0.0307459,
+                          Education.SOMEHIGHSCHOOL: 0.0841255,
+                          Education.HIGHSCHOOLGRADUATE: -0.0846951,
+                          Education.SOMECOLLEGE: -0.2263593}
+        xb += np.array(list(map(lambda x: educationTerms.get(x, 0.), columns[StaticRiskFactorsType.EDUCATION.value])))
+        xb += np.array(list(map(lambda x: 0.1937563 if x==RaceEthnicity.NON_HISPANIC_BLACK else 0., columns[StaticRiskFactorsType.RACE_ETHNICITY.value])))
+        if self.wmhSpecific:
+            xb = np.array(list(map(lambda x, y: self.add_wmh_terms(y, x._age[-1], x._modality,
+                                                                  x.get_outcome_item_first(OutcomeType.WMH, "sbi", inSim=True),
+                                                                  x.get_outcome_item_first(OutcomeType.WMH, "wmhSeverityUnknown", inSim=True),
+                                                                  x.get_outcome_item_first(OutcomeType.WMH, "wmhSeverity", inSim=True)), people, xb)))
+        return xb
+
+    def get_next_outcomes_for_population(self, people, columns):
+        """Population version of get_next_outcome."""
+        yearsInSim = np.array(list(map(lambda x: len(x._age), people)))
+        risks = self.get_cumulative_hazard_for_years_in_sim(yearsInSim) * np.exp(self.linear_predictor_for_population(people, columns))
+        draws = np.array(list(map(lambda x: x._rng.uniform(size=1)[0], people)))
+        return list(map(lambda x, hasOutcome: self.generate_next_outcome(x) if hasOutcome else None, people, draws < risks))
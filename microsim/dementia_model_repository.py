@@ -2,6 +2,8 @@ from microsim.dementia_model import DementiaModel
 #from microsim.outcome import OutcomeType
 from microsim.modality import Modality
 
+import numpy as np
+
 class DementiaModelRepository:
     def __init__(self, wmhSpecific=True):
         #if we want the dementia model to return an average risk for the kaiser population, independently of their WMH outcome, then
@@ -23,4 +25,16 @@ class DementiaModelRepository:
         So, it is the imaging that determined participation in this group, not silent cerebrovascular disease.'''
         brainScan = not person._modality == Modality.NO.value #if person had a brain scan or not
         return self._models["brainScan"] if brainScan else self._models["NHANES"]
-        
+
+    def get_next_outcomes_for_population(self, people, columns):
+        '''Population version of select_outcome_model_for_person(person).get_next_outcome(person).'''
+        outcomes = [None] * len(people)
+        brainScan = np.array(list(map(lambda x: not x._modality == Modality.NO.value, people)), dtype=bool)
+        for modelName, mask in [("brainScan", brainScan), ("NHANES", ~brainScan)]:
+            positions = np.flatnonzero(mask)
+            if len(positions)>0:
+                modelOutcomes = self._models[modelName].get_next_outcomes_for_population(people[positions], columns.get_subset(positions))
+                for position, outcome in zip(positions, modelOutcomes):
+                    outcomes[position] = outcome
+        return outcomes
+
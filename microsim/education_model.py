@@ -3,6 +3,7 @@ import numpy as np
 from microsim.education import Education
 from microsim.smoking_status import SmokingStatus
 from microsim.race_ethnicity import RaceEthnicity
+from microsim.population_evaluation import PopulationEvaluation
 
 class EducationPrevalenceModel:
 
@@ -64,6 +65,17 @@ class EducationPrevalenceModel:
         else:
              raise RuntimeError("Draw not consistent with cumulative probabilities in EducationPrevalenceModel.estimate_next_risk.")
 
+    def estimate_next_risk_for_population(self, columns, draws):
+        """Population version of estimate_next_risk, draws are the uniform draws of the people in columns."""
+        linearPredictors = PopulationEvaluation.apply_by_categories(self.calc_linear_predictor_for_patient_characteristics, columns,
+                                                                    ["raceEthnicity", "smokingStatus"])
+        return PopulationEvaluation.select_category(draws,
+                                                    list(map(PopulationEvaluation.inverse_logit, linearPredictors)),
+                                                    [Education.LESSTHANHIGHSCHOOL, Education.SOMEHIGHSCHOOL, Education.HIGHSCHOOLGRADUATE,
+                                                     Education.SOMECOLLEGE, Education.COLLEGEGRADUATE],
+                                                    "EducationPrevalenceModel.estimate_next_risk_for_population",
+                                                    inclusiveLast=True)
+
     def inv_logit(self, lp):
         # note: limit the calculation to avoid over/under-flow issues
         if lp<-10:
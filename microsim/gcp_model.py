@@ -6,6 +6,7 @@ from microsim.race_ethnicity import RaceEthnicity
 from microsim.education import Education
 from microsim.gender import NHANESGender
 from microsim.person import Person
+from microsim.risk_factor import DynamicRiskFactorsType
 from collections import OrderedDict
 
 
@@ -134,7 +135,7 @@ class GCPModel:
                 bmi=person._bmi[-1],
                 waist=person._waist[-1],
                 totChol=person._totChol[-1],
-                meanSBP=np.array(person._sbp).mean(),
+                meanSBP=person.get_history_mean(DynamicRiskFactorsType.SBP.value),
                 anyAntiHpertensive=((person._antiHypertensiveCount[-1]>0) | person.is_in_bp_treatment),
                 fastingGlucose=person.get_fasting_glucose(not test, rng),
                 physicalActivity=person._anyPhysicalActivity[-1],
@@ -6,6 +6,7 @@ from microsim.race_ethnicity import RaceEthnicity
 from microsim.education import Education
 from microsim.gender import NHANESGender
 from microsim.person import Person
+from microsim.risk_factor import DynamicRiskFactorsType
 from microsim.outcome import OutcomeType
 from microsim.alcohol_category import AlcoholCategory
 from collections import OrderedDict
@@ -136,7 +137,6 @@ class GCPStrokeModel:
         linPred = 0
         ageAtLastStroke=person.get_age_at_last_outcome(OutcomeType.STROKE)
         yearsSinceStroke=person._age[-1]-ageAtLastStroke
-        personGCP = list(map(lambda x: x[1].gcp, person._outcomes[OutcomeType.COGNITION]))
         waveAtLastStroke=person.get_wave_for_age(ageAtLastStroke)
         linPred = self.calc_linear_predictor_for_patient_characteristics(
                 ageAtLastStroke=ageAtLastStroke,
@@ -148,15 +148,15 @@ class GCPStrokeModel:
                 #diabetes=person.has_diabetestx(),
                 physicalActivity=person._anyPhysicalActivity[-1],
                 alcoholPerWeek=person._alcoholPerWeek[-1],
-                meanBmiPrestroke=np.mean(np.array(person._bmi[:waveAtLastStroke+1])),
-                meanSBP=np.array(person._sbp[waveAtLastStroke+1:]).mean(),
-                meanSBPPrestroke=np.array(person._sbp[:waveAtLastStroke+1]).mean(),
-                meanLdlPrestroke=np.array(person._ldl[:waveAtLastStroke+1]).mean(),
-                meanLdl=np.array(person._ldl[waveAtLastStroke+1:]).mean(),
+                meanBmiPrestroke=person.get_history_mean(DynamicRiskFactorsType.BMI.value, stop=waveAtLastStroke+1),
+                meanSBP=person.get_history_mean(DynamicRiskFactorsType.SBP.value, start=waveAtLastStroke+1),
+                meanSBPPrestroke=person.get_history_mean(DynamicRiskFactorsType.SBP.value, stop=waveAtLastStroke+1),
+                meanLdlPrestroke=person.get_history_mean(DynamicRiskFactorsType.LDL.value, stop=waveAtLastStroke+1),
+                meanLdl=person.get_history_mean(DynamicRiskFactorsType.LDL.value, start=waveAtLastStroke+1),
                 gfr=person._gfr,
-                meanWaistPrestroke=np.mean(np.array(person._waist[:waveAtLastStroke+1])),
-                meanFastingGlucose=Person.convert_a1c_to_fasting_glucose(np.array(person._a1c[waveAtLastStroke+1:]).mean()),
-                meanFastingGlucosePrestroke=Person.convert_a1c_to_fasting_glucose(np.array(person._a1c[:waveAtLastStroke+1]).mean()),
+                meanWaistPrestroke=person.get_history_mean(DynamicRiskFactorsType.WAIST.value, stop=waveAtLastStroke+1),
+                meanFastingGlucose=Person.convert_a1c_to_fasting_glucose(person.get_history_mean(DynamicRiskFactorsType.A1C.value, start=waveAtLastStroke+1)),
+                meanFastingGlucosePrestroke=Person.convert_a1c_to_fasting_glucose(person.get_history_mean(DynamicRiskFactorsType.A1C.value, stop=waveAtLastStroke+1)),
                 anyAntiHypertensive=person._any_antiHypertensive,
                 #Q: how to deal with otherLipidlowering meds? We used to use this attribute but now that I have not
                 #   included a treatment model for this (and I think I do not even bring it in from NHANES)
@@ -165,7 +165,9 @@ class GCPStrokeModel:
                 anyLipidLowering= person._statin[-1],
                 afib=person._afib[-1],
                 mi=person._mi,
-                meanGCPPrestroke=np.mean(np.array(personGCP[:waveAtLastStroke+1]))) 
+                meanGCPPrestroke=person.get_final_mean(("gcpPrestroke", waveAtLastStroke+1),
+                                                       lambda: list(map(lambda x: x[1].gcp, person._outcomes[OutcomeType.COGNITION][:waveAtLastStroke+1])),
+                                                       len(person._outcomes[OutcomeType.COGNITION]) >= waveAtLastStroke+1)) 
         random_effect_slope_term = random_effect_slope * yearsSinceStroke   
 
         return linPred + random_effect + random_effect_slope_term + residual      
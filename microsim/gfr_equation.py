@@ -9,6 +9,8 @@ import numpy as np
 
 
 class GFREquation:
+    #the exponents and constants of the equation, the tables are kept for reference, the scalar and population functions
+    #use the dictionaries below that hold exactly the same values (np.float64 exponents so that powers behave as before)
     exponentForGenderCr = pd.DataFrame(
         {
             "female": [True, True, False, False],
@@ -25,6 +27,11 @@ class GFREquation:
         }
     )
 
+    #keys: (female, underThreshold)
+    exponents = dict(zip(zip(exponentForGenderCr["female"], exponentForGenderCr["underThreshold"]), map(np.float64, exponentForGenderCr["exponent"])))
+    #keys: (black, female)
+    constants = dict(zip(zip(constantForRaceGender["black"], constantForRaceGender["female"]), constantForRaceGender["constant"]))
+
     def __init__(self):
         pass
 
@@ -38,32 +45,34 @@ class GFREquation:
             person._creatinine[wave], person._age[wave])
 
     def get_gfr_for_person_attributes(self, gender, raceEthnicity, creatinine, age):
-        crThreshold = 0.7 if gender == NHANESGender.FEMALE else 0.9
-        
-        exponent = GFREquation.exponentForGenderCr.loc[
-            (GFREquation.exponentForGenderCr["female"] == (gender == NHANESGender.FEMALE))
-            & (
-                GFREquation.exponentForGenderCr["underThreshold"]
-                == (creatinine <= crThreshold)
-            )
-        ].iloc[0]["exponent"]
-        constant = GFREquation.constantForRaceGender.loc[
-            (
-                GFREquation.constantForRaceGender["black"]
-                == (raceEthnicity == RaceEthnicity.NON_HISPANIC_BLACK)
-            )
-            & (
-                GFREquation.constantForRaceGender["female"]
-                == (gender == NHANESGender.FEMALE)
-            )
-        ].iloc[0]["constant"]
+        female = gender == NHANESGender.FEMALE
+        crThreshold = 0.7 if female else 0.9
+        exponent = GFREquation.exponents[(female, bool(creatinine <= crThreshold))]
+        constant = GFREquation.constants[(raceEthnicity == RaceEthnicity.NON_HISPANIC_BLACK, female)]
 
         #Q: creatinine and exponent are both negative and fractional...what do we return in this case?
         if (crThreshold < 0.001) | (creatinine/crThreshold<0) | np.isnan(exponent) | np.isinf(exponent) | np.isnan(creatinine / crThreshold) | np.isinf(creatinine / crThreshold):
-            print(f"thresholds: {crThreshold} constant: {constant} exponent: {exponent} female: {gender==NHANESGender.FEMALE}, black: {raceEthnicity==NHANESRaceEthnicity.NON_HISPANIC_BLACK}, cr: {creatinine}")
+            print(f"thresholds: {crThreshold} constant: {constant} exponent: {exponent} female: {gender==NHANESGender.FEMALE}, black: {raceEthnicity==RaceEthnicity.NON_HISPANIC_BLACK}, cr: {creatinine}")
         return (
             constant
             * (creatinine / crThreshold) ** exponent
             * 0.993 ** age
         )
 
+    @staticmethod
+    def get_gfr_for_population(gender, raceEthnicity, creatinine, age):
+        """Returns the GFR for arrays of people attributes, one value per person, the same as get_gfr_for_person_attributes on each person
+           up to the last digits, since NumPy computes array powers with SIMD routines that can differ in the last bit from scalar powers."""
+        female = np.asarray(gender) == NHANESGender.FEMALE
+        black = np.asarray(raceEthnicity) == RaceEthnicity.NON_HISPANIC_BLACK
+        creatinine = np.asarray(creatinine, dtype=float)
+        age = np.asarray(age, dtype=float)
+        crThreshold = np.where(female, 0.7, 0.9)
+        underThreshold = creatinine <= crThreshold
+        exponent = np.empty(len(creatinine), dtype=float)
+        constant = np.empty(len(creatinine), dtype=float)
+        for (isFemale, isUnderThreshold), value in GFREquation.exponents.items():
+            exponent[(female == isFemale) & (underThreshold == isUnderThreshold)] = value
+        for (isBlack, isFemale), value in GFREquation.constants.items():
+            constant[(black == isBlack) & (female == isFemale)] = value
+        return constant * np.power(creatinine / crThreshold, exponent) * np.power(0.993, age)
@@ -0,0 +1,66 @@
+import numpy as np
+
+class HistoryBuffer:
+    """A list-like history of a Person-instance dynamic risk factor or default treatment, eg person._sbp, that lives in a
+       preallocated NumPy buffer with a fill pointer, so that adding a wave is a write instead of a copy of the entire history.
+       Indexing (including negative indices, eg _sbp[-1], and _age[0]), slicing, len, iteration, in-place updates of the last
+       value and np.array work exactly as with the list histories.
+       The buffer is an object array so that the values stored are the values the models produced, eg enums and booleans.
+       If more values than the capacity are appended, the buffer is reallocated with twice the capacity.
+       _buffer: the preallocated buffer.
+       _n: the fill pointer, the number of values in the history."""
+
+    def __init__(self, values, capacity=0):
+        values = list(values)
+        self._n = len(values)
+        self._buffer = np.empty(max(capacity, self._n, 1), dtype=object)
+        for i, value in enumerate(values):
+            self._buffer[i] = value
+
+    @property
+    def capacity(self):
+        return self._buffer.shape[0]
+
+    def append(self, value):
+        if self._n == self.capacity:
+            self._buffer = np.concatenate([self._buffer, np.empty(self.capacity, dtype=object)])
+        self._buffer[self._n] = value
+        self._n += 1
+
+    def get_index(self, index):
+        i = index + self._n if index < 0 else index
+        if (i < 0) | (i >= self._n):
+            raise IndexError("HistoryBuffer index out of range")
+        return i
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self._buffer[:self._n][index].tolist()
+        return self._buffer[self.get_index(index)]
+
+    def __setitem__(self, index, value):
+        self._buffer[self.get_index(index)] = value
+
+    def __len__(self):
+        return self._n
+
+    def __iter__(self):
+        return iter(self._buffer[:self._n])
+
+    def __array__(self, dtype=None):
+        #same result as np.array on the list history, eg a float array for continuous risk factors
+        return np.array(self.tolist(), dtype=dtype)
+
+    def tolist(self):
+        return self._buffer[:self._n].tolist()
+
+    def __add__(self, other):
+        return self.tolist() + list(other)
+
+    def __eq__(self, other):
+        if isinstance(other, (HistoryBuffer, list)):
+            return self.tolist() == list(other)
+        return NotImplemented
+
+    def __repr__(self):
+        return repr(self.tolist())
@@ -1,5 +1,7 @@
 from microsim.outcome import OutcomeType, Outcome
 
+import numpy as np
+
 class MIPartitionModel:
     """Fatal mi probability from: Wadhera, R. K., Joynt Maddox, K. E., Wang, Y., Shen, C., Bhatt, D. L., & Yeh, R. W. (2018). 
        Association Between 30-Day Episode Payments and Acute Myocardial Infarction Outcomes Among Medicare Beneficiaries. 
@@ -31,3 +33,19 @@ class MIPartitionModel:
                 miOutcome = self.generate_next_outcome(person)
                 self.update_cv_outcome(person, miOutcome.fatal)
                 return miOutcome
+
+    def get_next_outcomes_for_population(self, people, columns):
+        """Population version of get_next_outcome: every person with a CV outcome but no stroke in the current wave
+           has an MI, the fatality of all these MIs is decided at once."""
+        outcomes = [None] * len(people)
+        positions = np.flatnonzero(np.array(list(map(lambda x: x.has_outcome_at_current_age(OutcomeType.CARDIOVASCULAR) and
+                                                               not x.has_outcome_at_current_age(OutcomeType.STROKE), people)), dtype=bool))
+        if len(positions)>0:
+            miPeople = people[positions]
+            fatalProbs = np.where(np.asarray(columns.get_subset(positions)["mi"], dtype=bool), self._mi_secondary_case_fatality, self._mi_case_fatality)
+            draws = np.array(list(map(lambda x: x._rng.uniform(), miPeople)))
+            for position, person, fatal in zip(positions, miPeople, draws < fatalProbs):
+                miOutcome = Outcome(OutcomeType.MI, bool(fatal))
+                self.update_cv_outcome(person, miOutcome.fatal)
+                outcomes[position] = miOutcome
+        return outcomes
@@ -6,3 +6,6 @@ class MIPartitionModelRepository:
     
     def select_outcome_model_for_person(self, person):
         return self._model
+
+    def get_next_outcomes_for_population(self, people, columns):
+        return self._model.get_next_outcomes_for_population(people, columns)
@@ -1,3 +1,5 @@
+import numpy as np
+
 from microsim.modality import Modality
 
 class ModalityPrevalenceModel:
@@ -9,3 +11,6 @@ class ModalityPrevalenceModel:
     def estimate_next_risk(self, person):
         return  Modality.NO.value 
 
+    def estimate_next_risk_for_population(self, columns, draws):
+        return np.full(len(draws), Modality.NO.value, dtype=object)
+
@@ -1,10 +1,14 @@
 from abc import ABCMeta, abstractmethod
 from copy import copy
-from typing import Dict, Iterable, List, Tuple
+from functools import reduce
+from operator import attrgetter
+from typing import Callable, Dict, Iterable, List, NamedTuple, Tuple
 import re
 
 import numpy as np
 
+from microsim.history_buffer import HistoryBuffer
+
 
 categorical_param_name_pattern = r"^(?P<propname>[^\[]+)\[T\.(?P<matchingval>[^\]]+)\]"
 categorical_param_name_regex = re.compile(categorical_param_name_pattern)
@@ -24,6 +28,10 @@ class AbstractBaseTransform(metaclass=ABCMeta):
     def extractsData(self):
         return False
 
+    # applies the transform to a column of values, one value per person, with the same result as apply on each value
+    def apply_to_column(self, column):
+        return np.array([self.apply(value) for value in column])
+
 
 class IndicatorTransform(AbstractBaseTransform):
     """
@@ -42,6 +50,9 @@ class IndicatorTransform(AbstractBaseTransform):
     def apply(self, value):
         return 1 if value == self._matching_value else 0
 
+    def apply_to_column(self, column):
+        return (np.asarray(column) == self._matching_value).astype(int)
+
     def __eq__(self, other):
         if issubclass(type(other), IndicatorTransform):
             return self._matching_value == other.matching_value
@@ -80,13 +91,25 @@ class LogTransform(AbstractBaseTransform):
     def apply(self, value):
         return np.log(value)
 
+    def apply_to_column(self, column):
+        return np.log(np.asarray(column, dtype=float))
+
 
 class MeanTransform(AbstractBaseTransform):
     """Returns the mean of the given value."""
 
     def apply(self, value):
+        # StatsModelLinearRiskFactorModel passes the last value of the history, the mean of a single number is that number
+        # and that is much cheaper than building an array for it
+        if isinstance(value, (int, float, np.number, np.bool_)):
+            return np.float64(value)
         return np.array(value).mean()
 
+    # StatsModelLinearRiskFactorModel applies the transforms on the last value of a person attribute
+    # so the mean of that single value is the value itself
+    def apply_to_column(self, column):
+        return np.asarray(column, dtype=float)
+
 
 class MeanTransformVectorized(AbstractBaseTransform):
     def apply(self, value):
@@ -105,6 +128,9 @@ class SquareTransform(AbstractBaseTransform):
     def apply(self, value):
         return value**2
 
+    def apply_to_column(self, column):
+        return np.asarray(column, dtype=float)**2
+
 
 class FirstElementTransform(AbstractBaseTransform):
     """Returns the first element of the given value."""
@@ -215,6 +241,71 @@ def get_all_argument_transforms(
     return param_transforms
 
 
+class CompiledArgument(NamedTuple):
+    """Immutable, precompiled recipe for obtaining the value of one model argument (a parameter name without interactions).
+       accessor: returns the person attribute the argument is derived from, eg attrgetter("_sbp") for meanLagSbp.
+       operations: the apply methods of the transforms, in the order they are applied.
+       columnOperations: the apply_to_column methods of the same transforms, for the population path.
+       vectorizedKey: the key of the argument in the vectorized (dataframe row) representation, eg meanSbp.
+       vectorizedOperations: the operations that remain to be applied after vectorizedKey has been looked up."""
+
+    name: str
+    propName: str
+    accessor: Callable
+    operations: Tuple[Callable, ...]
+    columnOperations: Tuple[Callable, ...]
+    vectorizedKey: str
+    vectorizedOperations: Tuple[Callable, ...]
+
+    def get_value(self, person):
+        value = self.accessor(person)
+        if isinstance(value, (list, np.ndarray, HistoryBuffer)):
+            value = value[-1]
+        value = reduce(lambda v, op: op(v), self.operations, value)
+        if isinstance(value, (list, np.ndarray, HistoryBuffer)):
+            value = value[-1]
+        return value
+
+    def get_value_vectorized(self, x):
+        return reduce(lambda v, op: op(v), self.vectorizedOperations, x[self.vectorizedKey])
+
+    def get_column(self, columns):
+        return np.asarray(reduce(lambda v, op: op(v), self.columnOperations, columns[self.propName]), dtype=float)
+
+
+def compile_argument(parameter_name: str) -> CompiledArgument:
+    """Resolves the person attribute and the transforms of a parameter name once, so that model evaluation
+    does not need to look them up (or modify the transforms) on every call."""
+    prop_name, transforms = get_argument_transforms(parameter_name)
+    if parameter_name.casefold() == prop_name:
+        return CompiledArgument(parameter_name, parameter_name, attrgetter(f"_{parameter_name}"), (), (), parameter_name, ())
+
+    vectorized_prop_name, vectorized_transforms = get_argument_transforms(parameter_name, True)
+    vectorized_transforms = reorganize_transforms_vectorized(vectorized_transforms)
+    # the data extracting transform is always first, see reorganize_transforms_vectorized
+    extractor, remaining = vectorized_transforms[0], vectorized_transforms[1:]
+    vectorized_operations = [t.apply for t in remaining]
+    if isinstance(extractor, MeanTransformVectorized):
+        vectorized_key = "mean" + vectorized_prop_name.capitalize()
+    elif isinstance(extractor, FirstElementTransformVectorized):
+        vectorized_key = "base" + vectorized_prop_name.capitalize()
+    elif isinstance(extractor, IndicatorTransformVectorized):
+        vectorized_key = vectorized_prop_name
+        vectorized_operations.insert(0, IndicatorTransform(extractor.matching_value).apply)
+    else:
+        vectorized_key = vectorized_prop_name
+
+    return CompiledArgument(
+        parameter_name,
+        prop_name,
+        attrgetter(f"_{prop_name}"),
+        tuple(t.apply for t in transforms),
+        tuple(t.apply_to_column for t in transforms),
+        vectorized_key,
+        tuple(vectorized_operations),
+    )
+
+
 # the order of operations of transforms has to be modified here a bit for the vectorized scenario
 # only one transform can extract data.
 # the identity transform is redundant if there is another extraction mechanism.
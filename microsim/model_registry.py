@@ -0,0 +1,22 @@
+class ModelRegistry:
+    """A process-wide registry of shared model instances.
+       Models and model repositories hold only their parameters, all person-specific quantities are obtained from the
+       Person-instance arguments, so one instance per class and constructor arguments, eg one CVModelRepository for each
+       wmhSpecific variant, can be used everywhere instead of building a new instance for every person or every event.
+       The instances are shared by all callers in the process, so they must be treated as read-only.
+       _models: the shared instances, keyed by the class and the keyword arguments of the constructor."""
+
+    _models = dict()
+
+    @staticmethod
+    def get_model(modelClass, **kwargs):
+        """Returns the shared instance of modelClass(**kwargs), the instance is constructed the first time it is requested."""
+        key = (modelClass, tuple(sorted(kwargs.items())))
+        model = ModelRegistry._models.get(key)
+        if model is None:
+            model = ModelRegistry._models[key] = modelClass(**kwargs)
+        return model
+
+    @staticmethod
+    def clear():
+        ModelRegistry._models = dict()
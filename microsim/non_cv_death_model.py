@@ -11,8 +11,10 @@ class NonCVDeathModel(StatsModelLogisticRiskFactorModel):
     def __init__(self, wmhSpecific=True):
         modelSpec = load_model_spec("nhanesMortalityModelLogit")
         # Recalibrate mortalitly model to align with life table data, as explored in notebook buildNHANESMortalityModel
-        modelSpec["coefficients"]["age"] = modelSpec["coefficients"]["age"]*(-1)
-        modelSpec["coefficients"]["squareAge"] = modelSpec["coefficients"]["squareAge"]*4 
+        coefficients = {**modelSpec["coefficients"],
+                        "age": modelSpec["coefficients"]["age"]*(-1),
+                        "squareAge": modelSpec["coefficients"]["squareAge"]*4}
+        modelSpec = {**modelSpec, "coefficients": coefficients}
         super().__init__(RegressionModel(**modelSpec), False)
         self.wmhSpecific=wmhSpecific
         
@@ -31,6 +33,21 @@ class NonCVDeathModel(StatsModelLogisticRiskFactorModel):
             else:
                 return None
         
+    def get_next_outcomes_for_population(self, people, columns):
+        """Population version of get_next_outcome, the risk of everyone without a fatal CV outcome in the current wave
+           is obtained at once."""
+        outcomes = [None] * len(people)
+        positions = np.flatnonzero(np.array(list(map(lambda x: not x.has_fatal_outcome_at_current_age(OutcomeType.CARDIOVASCULAR), people)), dtype=bool))
+        if len(positions)>0:
+            atRiskPeople = people[positions]
+            risks = self.logit_for_population(self.estimate_linear_predictor_for_population(columns.get_subset(positions)) +
+                                              np.array(list(map(lambda x: self.get_scd_term(x), atRiskPeople)), dtype=float))
+            draws = np.array(list(map(lambda x: x._rng.uniform(size=1)[0], atRiskPeople)))
+            for position, person, hasOutcome in zip(positions, atRiskPeople, draws < risks):
+                if hasOutcome:
+                    outcomes[position] = self.generate_next_outcome(person)
+        return outcomes
+
     def get_scd_term(self, person):
         '''This term, for silent cerebrovascular disease, is based on time-dependent hazard ratios (see Clancy2024 paper).
         The linear models for the time-dependent hazard ratios were obtain by a LLS fit to the values shown in the Clancy2024 paper.
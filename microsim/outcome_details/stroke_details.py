@@ -1,4 +1,5 @@
 import numpy as np
+from microsim.model_registry import ModelRegistry
 from microsim.statsmodel_linear_risk_factor_model import StatsModelLinearRiskFactorModel
 from microsim.statsmodel_rel_risk_factor_model import StatsModelRelRiskFactorModel
 from microsim.stroke_outcome import StrokeOutcome, StrokeSubtype, StrokeType, Localization
@@ -189,9 +190,9 @@ class StrokeSubtypeModelRepository:
  
     def get_stroke_subtype(self, person):
         
-        ceRelRisk = StrokeSubtypeCEModel().estimate_rel_risk(person)
-        lvRelRisk = StrokeSubtypeLVModel().estimate_rel_risk(person)
-        svRelRisk = StrokeSubtypeSVModel().estimate_rel_risk(person)
+        ceRelRisk = ModelRegistry.get_model(StrokeSubtypeCEModel).estimate_rel_risk(person)
+        lvRelRisk = ModelRegistry.get_model(StrokeSubtypeLVModel).estimate_rel_risk(person)
+        svRelRisk = ModelRegistry.get_model(StrokeSubtypeSVModel).estimate_rel_risk(person)
         otRelRisk = 1 #this was the base subtype on the multinomial logistic regression model
 
         sumRelRisk = otRelRisk + ceRelRisk + lvRelRisk + svRelRisk
@@ -210,9 +211,9 @@ class StrokeSubtypeModelRepository:
 
     def get_stroke_subtype_vectorized(self, person):
         
-        ceRelRisk = StrokeSubtypeCEModel().estimate_rel_risk_vectorized(person)
-        lvRelRisk = StrokeSubtypeLVModel().estimate_rel_risk_vectorized(person)
-        svRelRisk = StrokeSubtypeSVModel().estimate_rel_risk_vectorized(person)
+        ceRelRisk = ModelRegistry.get_model(StrokeSubtypeCEModel).estimate_rel_risk_vectorized(person)
+        lvRelRisk = ModelRegistry.get_model(StrokeSubtypeLVModel).estimate_rel_risk_vectorized(person)
+        svRelRisk = ModelRegistry.get_model(StrokeSubtypeSVModel).estimate_rel_risk_vectorized(person)
         otRelRisk = 1 #this was the base subtype on the multinomial logistic regression model
 
         sumRelRisk = otRelRisk + ceRelRisk + lvRelRisk + svRelRisk
@@ -0,0 +1,52 @@
+class OutcomeEventIndex:
+    """A summary of the outcomes of one OutcomeType of a Person-instance, so that questions like the age at the last outcome
+       or whether an outcome occurred during the simulation by some age are answered without going over the outcome list.
+       The index is updated when Person.add_outcome adds an outcome. An index is valid only for the list it was built from
+       and only as long as that list has as many outcomes as the index has seen, the Person-instance builds a new index
+       if that is not the case, eg when the outcome list was replaced.
+       _outcomes: the outcome list of the Person-instance the index was built from.
+       _n: the number of outcomes in the index.
+       _ages: the set of the ages at all outcomes.
+       firstAge, lastAge: the ages at the first and last outcome, None if there are no outcomes.
+       firstAgeInSim: the age at the first outcome that did not occur prior to the simulation.
+       minAgeInSim: the minimum age at an outcome that did not occur prior to the simulation.
+       anyPriorToSim, anyInSim: whether any outcome occurred prior to, or during, the simulation.
+       Whether an outcome was fatal is not indexed because the partition models change it after the outcome was added."""
+
+    __slots__ = ("_outcomes", "_n", "_ages", "firstAge", "lastAge", "firstAgeInSim", "minAgeInSim",
+                 "anyPriorToSim", "anyInSim")
+
+    def __init__(self, outcomes):
+        self._outcomes = outcomes
+        self._n = 0
+        self._ages = set()
+        self.firstAge = None
+        self.lastAge = None
+        self.firstAgeInSim = None
+        self.minAgeInSim = None
+        self.anyPriorToSim = False
+        self.anyInSim = False
+        for age, outcome in outcomes:
+            self.add(age, outcome)
+
+    def is_index_of(self, outcomes):
+        return (self._outcomes is outcomes) and (self._n == len(outcomes))
+
+    def add(self, age, outcome):
+        """Updates the index with an outcome that was added at the end of the outcome list."""
+        self._n += 1
+        self._ages.add(age)
+        if self.firstAge is None:
+            self.firstAge = age
+        self.lastAge = age
+        if outcome.priorToSim:
+            self.anyPriorToSim = True
+        else:
+            if self.firstAgeInSim is None:
+                self.firstAgeInSim = age
+            if (self.minAgeInSim is None) or (age < self.minAgeInSim):
+                self.minAgeInSim = age
+            self.anyInSim = True
+
+    def has_age(self, age):
+        return age in self._ages
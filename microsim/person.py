@@ -10,11 +10,16 @@ from typing import Callable
 from microsim.education import Education
 from microsim.gender import NHANESGender
 from microsim.outcome import Outcome, OutcomeType
+from microsim.outcome_event_index import OutcomeEventIndex
 from microsim.race_ethnicity import RaceEthnicity
 from microsim.smoking_status import SmokingStatus
 from microsim.alcohol_category import AlcoholCategory
 from microsim.qaly_assignment_strategy import QALYAssignmentStrategy
 from microsim.gfr_equation import GFREquation
+from microsim.history_buffer import HistoryBuffer
+from microsim.random_block import RandomBlock
+from microsim.random_streams import RandomStreams, RandomStreamBlock
+from microsim.running_mean import RunningMean
 from microsim.pvd_model import PVDPrevalenceModel
 from microsim.risk_factor import DynamicRiskFactorsType, StaticRiskFactorsType
 from microsim.treatment import TreatmentStrategiesType, TreatmentStrategyStatus, DefaultTreatmentsType
@@ -47,11 +52,20 @@ class Person:
        _name: indicates the specific origin of the Person's instance data, eg in NHANES it will be the NHANES person unique identifier, 
               more than one Person instances can have the same name.
        _index: a unique identifier when the Person-instance is part of a bigger group, eg a Population instance (this is set from the Population instance).
+       _rng: a RandomStreamBlock, a stream key on shared streams instead of a np.random.Generator of the person. Unseeded people get a stream key
+             from OS entropy on the process-wide default streams, so no two unseeded people, not even in different processes, share a stream.
+             Seeded people get the stream of their index on the streams of the seed (see Population.seed_people).
        _waveCompleted: every time a complete advanced has been performed, increase this by 1, first complete advanced corresponds to 0.
                        A complete advanced = risk factors, treatment, treatment strategies, updated risk factors, outcomes.
        _outcomes: a dictionary of arrays with the keys being OutcomeTypes, each element in the array is a tuple (age, outcome).
                   Multiple events can be accounted for by having multiple elements in the array.
-       _randomEffects: some outcome models require random effects, store them in this dictionary, the outcome models set their key:value."""
+       _randomEffects: some outcome models require random effects, store them in this dictionary, the outcome models set their key:value.
+       _derived: during a wave, a dictionary with the derived quantities already computed for the current values, eg _gfr, so that
+                 the models of the wave that read them do not compute them again. It is cleared every time a risk factor, treatment
+                 or treatment strategy status changes and it is None outside of a wave, when the quantities are always computed.
+       _historyMeans: the RunningMean-instances of the history means models use every wave, eg the mean sbp, and the means over
+                      parts of the history that no longer change, eg the values prior to a stroke (see get_history_mean).
+       _outcomeIndex: a dictionary with an OutcomeEventIndex-instance for every OutcomeType that was queried, eg for the age at the last outcome."""
 
     def __init__(self, 
                  name, 
@@ -65,7 +79,11 @@ class Person:
         self._index = None
         self._waveCompleted = -1    
         self._randomEffects = dict()
-        self._rng = np.random.default_rng() #assume that the OS-derived entropy will be different for each person instance even when mp is used
+        self._derived = None
+        self._historyMeans = dict()
+        self._outcomeIndex = dict()
+        #a small object with a stream key from OS entropy on the shared process-wide streams, not a np.random.Generator, see RandomStreams
+        self._rng = RandomStreams.get_default().get_rng()
 
         #will it be better if static, dynamic RiskFactors and treatments were attributes-dictionaries like the outcomes?
         #will it double the attribute access time by having to find 2 pointers as opposed to 1? how significant will that be?
@@ -115,6 +133,8 @@ class Person:
 
         for yearIndex in range(years):
             if self.is_alive:
+                self.start_wave_random_numbers()
+                self.start_derived_values()
                 #choice of words: advance=append, update=modify last quantity in place
                 if self._waveCompleted > -1:
                     self.advance_risk_factors(dynamicRiskFactorRepository)
@@ -123,12 +143,72 @@ class Person:
                 self.advance_outcomes(outcomeModelRepository)
                 #finished one more complete advance 
                 self._waveCompleted += 1
+                self.release_random_numbers()
+                self.stop_derived_values()
+
+    def start_wave_random_numbers(self):
+        """Prepares the random numbers for the next wave when the rng pre-draws them in blocks (see RandomBlock)."""
+        if isinstance(self._rng, RandomBlock):
+            self._rng.start_wave(self._waveCompleted+1)
+
+    def start_random_substream(self, substream):
+        """Makes the next draws of the wave come from a substream of the person stream, when the streams use substreams
+           (see RandomStreams), so that the draws of every model are the same no matter what happened earlier in the wave."""
+        if isinstance(self._rng, RandomStreamBlock):
+            self._rng.start_substream(substream)
+
+    def release_random_numbers(self):
+        """Releases the random numbers of a stream rng at the end of a wave, so that only the stream key is kept (see RandomStreamBlock)."""
+        if isinstance(self._rng, RandomStreamBlock):
+            self._rng.release()
+
+    def start_derived_values(self):
+        """Starts memoizing the derived quantities for the wave (see _derived)."""
+        self._derived = dict()
+
+    def stop_derived_values(self):
+        self._derived = None
+
+    def clear_derived_values(self):
+        """Must be called after any change to the values the derived quantities depend on."""
+        if self._derived is not None:
+            self._derived.clear()
+
+    def get_derived_value(self, name, function):
+        """Returns function(self), computed only once per wave and set of current values when the memo is active."""
+        if self._derived is None:
+            return function(self)
+        if name not in self._derived:
+            self._derived[name] = function(self)
+        return self._derived[name]
+
+    def get_history_mean(self, attr, start=0, stop=None):
+        """Returns np.array(getattr(self, "_"+attr)[start:stop]).mean() without going over the entire history every wave.
+           Without stop the mean is kept up to date with a RunningMean-instance, a mean with a stop before the last value
+           is over values that do not change anymore, so it is computed only once."""
+        history = getattr(self, "_"+attr)
+        if stop is not None:
+            return self.get_final_mean((attr, start, stop), lambda: history[start:stop], stop < len(history))
+        runningMean = self._historyMeans.get((attr, start))
+        #a RunningMean-instance that has added more values than the history has, eg after a history was replaced, is not valid
+        if (runningMean is None) or (runningMean.get_count() > len(history)-start-1):
+            runningMean = self._historyMeans[(attr, start)] = RunningMean()
+        return runningMean.get_mean(history, start)
+
+    def get_final_mean(self, key, getValues, final):
+        """Returns np.array(getValues()).mean(), computed only once if final, ie the values will not change anymore."""
+        if not final:
+            return np.array(getValues()).mean()
+        if key not in self._historyMeans:
+            self._historyMeans[key] = np.array(getValues()).mean()
+        return self._historyMeans[key]
 
     def advance_risk_factors(self, rfdRepository):
         """Makes predictions for the risk factors 1 year to the future."""
-        for rf in self._dynamicRiskFactors:
+        for i, rf in enumerate(self._dynamicRiskFactors):
+            self.start_random_substream(RandomStreams.riskFactorSubstreams + i)
             nextRiskFactor = rfdRepository.apply_bounds(rf, self.get_next_risk_factor(rf, rfdRepository))
-            setattr(self, "_"+rf, getattr(self,"_"+rf)+[nextRiskFactor]) 
+            self.append_to_history(rf, nextRiskFactor)
 
     # Q: it is not clear to me why treatment strategies affect the person attributes directly
     #whereas treatments affect the person attributes indirectly through the attribute regression models
@@ -138,8 +218,26 @@ class Person:
     #also, notice that dynamic risk factors and treatments are lists that get their next quantity in the same way
     def advance_treatments(self, defaultTreatmentRepository):
         """Makes predictions for the default treatments 1 year to the future."""
-        for treatment in self._defaultTreatments:
-            setattr(self, "_"+treatment, getattr(self,"_"+treatment)+[self.get_next_treatment(treatment, defaultTreatmentRepository)]) 
+        for i, treatment in enumerate(self._defaultTreatments):
+            self.start_random_substream(RandomStreams.treatmentSubstreams + i)
+            self.append_to_history(treatment, self.get_next_treatment(treatment, defaultTreatmentRepository))
+
+    def append_to_history(self, attr, value):
+        """Adds the next wave value of a dynamic risk factor or default treatment.
+           Histories in preallocated buffers are appended to in place, list histories are replaced by a new list."""
+        history = getattr(self, "_"+attr)
+        if isinstance(history, HistoryBuffer):
+            history.append(value)
+        else:
+            setattr(self, "_"+attr, history+[value])
+        self.clear_derived_values()
+
+    def preallocate_history(self, horizon):
+        """Moves the dynamic risk factor and default treatment histories to preallocated buffers that can hold
+           horizon more waves without any allocation, eg horizon can be the number of years a population will be advanced."""
+        for attr in self._dynamicRiskFactors + self._defaultTreatments:
+            history = getattr(self, "_"+attr)
+            setattr(self, "_"+attr, HistoryBuffer(history, len(history)+horizon))
 
     def get_next_treatment(self, treatment, treatmentRepository):
         model = treatmentRepository.get_model(treatment)
@@ -149,6 +247,7 @@ class Person:
         """Makes predictionr for the treatment strategies 1 year to the future and updates the risk factors based
            on the effect of those treatment strategies."""      
         #choice of words: get_next returns the final/next wave quantity, update modifies that quantity in place
+        self.start_random_substream(RandomStreams.treatmentStrategySubstreams)
         for tsType in TreatmentStrategiesType:
             ts = treatmentStrategies._repository[tsType.value] if treatmentStrategies is not None else None
             #treatment status must be updated even when there is no treatment strategy for the year
@@ -163,6 +262,7 @@ class Person:
         for treatment in self._defaultTreatments:
             if treatment in updatedTreatments.keys():
                 getattr(self, "_"+treatment)[-1] = updatedTreatments[treatment]
+        self.clear_derived_values()
 
     def update_risk_factors(self, treatmentStrategy):
         """Updates the person's risk factors due to the effect of applying the treatment strategy."""
@@ -170,12 +270,14 @@ class Person:
         for rf in self._dynamicRiskFactors:
             if rf in updatedRiskFactors.keys():
                 getattr(self, "_"+rf)[-1] = updatedRiskFactors[rf]
+        self.clear_derived_values()
 
     def update_treatment_strategy_status(self, treatmentStrategy, treatmentStrategyType):
         """The treatment strategy status holds information about whether the strategy is just now being applied on the person
         simply continuous, or ends. The status is important because it dictates, at least for some strategies, what the effect
         on risk factors is. This function decides what the status is based on the current status and whether or not
         the strategy continues to be applied."""
+        self.clear_derived_values()
         if treatmentStrategy is not None:
             if self._treatmentStrategies[treatmentStrategyType.value]["status"] is None:
                 if treatmentStrategy.status==TreatmentStrategyStatus.BEGIN:
@@ -234,6 +336,7 @@ class Person:
         #With outcomes the situation is complex, because the loop needs to go over the outcomes in a specific order
         #which means I cannot just use the keys of a dictionary, the outcomes will need to be set in a list
         for outcomeType in self.get_outcomes_in_order():
+            self.start_random_substream(RandomStreams.outcomeSubstreams + list(OutcomeType).index(outcomeType))
             outcome = outcomeModelRepository._repository[outcomeType].select_outcome_model_for_person(self).get_next_outcome(self)
             self.add_outcome(outcome)
 
@@ -248,7 +351,17 @@ class Person:
     def add_outcome(self, outcome):
         """Adds the outcome to the person object."""
         if outcome is not None:
+            outcomeIndex = self.get_outcome_index(outcome.type)
             self._outcomes[outcome.type].append((self._current_age, outcome))
+            outcomeIndex.add(self._current_age, outcome)
+
+    def get_outcome_index(self, outcomeType):
+        """Returns the OutcomeEventIndex-instance of outcomeType, a new one if the outcome list was changed without add_outcome."""
+        outcomes = self._outcomes[outcomeType]
+        outcomeIndex = self._outcomeIndex.get(outcomeType)
+        if (outcomeIndex is None) or (not outcomeIndex.is_index_of(outcomes)):
+            outcomeIndex = self._outcomeIndex[outcomeType] = OutcomeEventIndex(outcomes)
+        return outcomeIndex
 
     def has_outcome_at_current_age(self, outcome):
         ageAtLastOutcome = self.get_age_at_last_outcome(outcome)
@@ -265,8 +378,9 @@ class Person:
     
     @property
     def is_in_bp_treatment(self):
-        return ( (self._treatmentStrategies[TreatmentStrategiesType.BP.value]["status"]==TreatmentStrategyStatus.BEGIN) |
-                 (self._treatmentStrategies[TreatmentStrategiesType.BP.value]["status"]==TreatmentStrategyStatus.MAINTAIN) )
+        return self.get_derived_value("is_in_bp_treatment", lambda x: 
+            ( (x._treatmentStrategies[TreatmentStrategiesType.BP.value]["status"]==TreatmentStrategyStatus.BEGIN) |
+              (x._treatmentStrategies[TreatmentStrategiesType.BP.value]["status"]==TreatmentStrategyStatus.MAINTAIN) ))
 
     def _antiHypertensiveCountPlusBPMedsAdded(self):
         antiHypertensiveCount = getattr(self, "_"+DefaultTreatmentsType.ANTI_HYPERTENSIVE_COUNT.value)[-1]
@@ -282,7 +396,7 @@ class Person:
 
     @property 
     def _any_antiHypertensive(self):
-        return self._antiHypertensiveCount[-1] > 0
+        return self.get_derived_value("_any_antiHypertensive", lambda x: x._antiHypertensiveCount[-1] > 0)
 
     @property
     def _current_age(self):
@@ -346,7 +460,12 @@ class Person:
         if ageTarget < self._age[0] or ageTarget > self._age[-1]:
             raise RuntimeError(f'Age:: {ageTarget} out of range {self._age[0]}-{self._age[-1]}')
         else:
-            return self._age.index(ageTarget)
+            #age increases by 1 every wave, so the wave is almost always the difference from the first age
+            wave = int(ageTarget - self._age[0])
+            if (wave < len(self._age)) and (self._age[wave] == ageTarget) and ((wave == 0) or (self._age[wave-1] != ageTarget)):
+                return wave
+            #the age history may be a list or, during a ColumnarPopulation advance, a numpy array
+            return list(self._age).index(ageTarget)
 
     def get_age_for_wave(self, wave):
         if not self.valid_wave(wave):
@@ -386,16 +505,20 @@ class Person:
 
     @property
     def _current_smoker(self):
-        return self._smokingStatus == SmokingStatus.CURRENT
+        return self.get_derived_value("_current_smoker", lambda x: x._smokingStatus == SmokingStatus.CURRENT)
 
     @property
     def _current_diabetes(self):
-        return self.has_diabetes()
+        return self.get_derived_value("_current_diabetes", lambda x: x.has_diabetes())
 
     # Q: should we make GFR a dynamic risk factor or outcome or leave it as is?
     @property
     def _gfr(self):
-        return GFREquation().get_gfr_for_person(self)
+        return self.get_derived_value("_gfr", lambda x: GFREquation().get_gfr_for_person(x))
+
+    @property
+    def _totCholHdlRatio(self):
+        return self.get_derived_value("_totCholHdlRatio", lambda x: x._totChol[-1] / x._hdl[-1])
 
     @property
     def _current_ckd(self):
@@ -433,7 +556,7 @@ class Person:
 
     @property
     def _black(self):
-        return self._raceEthnicity == RaceEthnicity.NON_HISPANIC_BLACK
+        return self.get_derived_value("_black", lambda x: x._raceEthnicity == RaceEthnicity.NON_HISPANIC_BLACK)
 
     @property
     def _white(self):
@@ -496,16 +619,10 @@ class Person:
         return not self.dead_by_wave(wave)
 
     def has_outcome_prior_to_simulation(self, outcomeType):
-        if len(self._outcomes[outcomeType])>0:
-           return any([outcome.priorToSim for _, outcome in self._outcomes[outcomeType]])
-        else:
-           return False
+        return self.get_outcome_index(outcomeType).anyPriorToSim
 
     def has_outcome_during_simulation(self, outcomeType):
-        if len(self._outcomes[outcomeType])>0:
-           return any([outcome.priorToSim == False for _, outcome in self._outcomes[outcomeType]])
-        else:
-           return False
+        return self.get_outcome_index(outcomeType).anyInSim
 
     def get_outcomes_during_simulation(self, outcomeType):
         return list(filter(lambda x: not x[1].priorToSim, self._outcomes[outcomeType]))
@@ -522,7 +639,7 @@ class Person:
             return False
 
     def has_outcome(self, outcomeType, inSim=True):
-        return len(self.get_outcomes_during_simulation(outcomeType))>0 if inSim else len(self._outcomes[outcomeType])>0
+        return self.get_outcome_index(outcomeType).anyInSim if inSim else len(self._outcomes[outcomeType])>0
 
     def has_any_outcome(self, outcomeTypeList, inSim=True):
         return any( [self.has_outcome(outcomeType, inSim=inSim) for outcomeType in outcomeTypeList] )
@@ -591,16 +708,11 @@ class Person:
             return len(self._outcomes[outcomeType]) != 0 and self.has_outcome_by_age(outcomeType, self._age[wave])
 
     def has_outcome_at_age(self, outcomeType, age):
-        for outcome_tuple in self._outcomes[outcomeType]:
-            if outcome_tuple[0] == age:
-                return True
-        return False
+        return self.get_outcome_index(outcomeType).has_age(age)
     
     def has_outcome_by_age(self, outcomeType, age, inSim=True):
-        for outcome_tuple in self._outcomes[outcomeType]:
-            if (outcome_tuple[0]<=age) & (not outcome_tuple[1].priorToSim):
-                return True
-        return False
+        minAgeInSim = self.get_outcome_index(outcomeType).minAgeInSim
+        return (minAgeInSim is not None) and (minAgeInSim<=age)
 
     def has_any_outcome_by_end_of_wave(self, outcomesTypeList=[OutcomeType.STROKE], wave=0):
         minWave = self.get_min_wave_of_first_outcomes(outcomesTypeList)
@@ -610,10 +722,8 @@ class Person:
             return True if minWave<=wave else False
 
     def get_age_at_first_outcome(self, outcomeType, inSim=True):
-        if len(self.get_outcomes(outcomeType, inSim=inSim))>0:
-            return self.get_outcomes(outcomeType, inSim=inSim)[0][0]
-        else:
-            return None
+        outcomeIndex = self.get_outcome_index(outcomeType)
+        return outcomeIndex.firstAgeInSim if inSim else outcomeIndex.firstAge
 
     def get_min_age_of_first_outcomes(self, outcomeTypeList, inSim=True):
         firstAgeList = list(map(lambda x: self.get_age_at_first_outcome(x, inSim=inSim), outcomeTypeList))
@@ -633,7 +743,7 @@ class Person:
 
     def get_age_at_last_outcome(self, outcomeType):
         #TO DO: need to include the selfReported argument to the MI phenotype as I did for the stroke outcome
-        return self._outcomes[outcomeType][-1][0] if (len(self._outcomes[outcomeType]) > 0) else None
+        return self.get_outcome_index(outcomeType).lastAge
 
     #def get_age_at_first_outcome_in_sim(self, outcomeType):
     #    for outcome_tuple in self._outcomes[outcomeType]:
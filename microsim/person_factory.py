@@ -20,6 +20,8 @@ from microsim.alcohol_model import AlcoholPrevalenceModel
 from microsim.population_type import PopulationType
 from microsim.modality_model import ModalityPrevalenceModel
 from microsim.wmh_model_repository import WMHModelRepository
+from microsim.model_registry import ModelRegistry
+from microsim.random_streams import RandomStreams
 
 class PersonFactory:
     """A class used to obtain Person-objects using data from a variety of sources."""
@@ -63,6 +65,9 @@ class PersonFactory:
                     DynamicRiskFactorsType.BMI.value: "BMI",
                     DefaultTreatmentsType.ANTI_HYPERTENSIVE_COUNT.value: "N_AntiHTNperYR"}
 
+    #the models used to initialize the risk factors the data sources do not have, see initialization_model_repository
+    _initializationModelRepository = None
+
     @staticmethod
     def get_person(x, popType=PopulationType.NHANES.value):
         if popType==PopulationType.NHANES.value:
@@ -72,11 +77,21 @@ class PersonFactory:
         else:
             raise RuntimeError("Unrecognized population type in PersonFactory.get_person.")
 
+    @staticmethod
+    def get_people(df, popType=PopulationType.NHANES.value, streams=None):
+        if popType==PopulationType.NHANES.value:
+            return PersonFactory.get_nhanes_people(df, streams=streams)
+        elif popType==PopulationType.KAISER.value:
+            return PersonFactory.get_kaiser_people(df, streams=streams)
+        else:
+            raise RuntimeError("Unrecognized population type in PersonFactory.get_people.")
+
     @staticmethod
     def get_nhanes_person_init_information(x):
         """Takes all Person-instance-related data via x and and organizes it."""
 
-        rng = np.random.default_rng()
+        #no np.random.Generator is created unless a draw is needed, see RandomStreams
+        rng = RandomStreams.get_default().get_rng()
 
         name = x.name
    
@@ -88,7 +103,7 @@ class PersonFactory:
                             StaticRiskFactorsType.MODALITY.value: None}
    
         #use this to get the bounds imposed on the risk factors in a bit
-        rfRepository = RiskModelRepository()
+        rfRepository = ModelRegistry.get_model(RiskModelRepository)
 
         #TO DO: find a way to include everything here, including the rfs that need initialization
         #the PVD model would be easy to implement, eg with an estimate_next_risk_for_patient_characteristics function
@@ -160,19 +175,208 @@ class PersonFactory:
         person._pvd = [imr[DynamicRiskFactorsType.PVD.value].estimate_next_risk(person)]
         person._afib = [imr[DynamicRiskFactorsType.AFIB.value].estimate_next_risk(person)]
         person._modality = imr[StaticRiskFactorsType.MODALITY.value].estimate_next_risk(person)
+        person.release_random_numbers()
+        return person
+
+    @staticmethod
+    def get_nhanes_people(df, streams=None):
+        """Returns a Pandas Series with the Person-instances get_nhanes_person returns for every row of df, with the same index as df.
+           The enum conversions, the bounds and the initialization models are evaluated for all rows at once with array operations,
+           the random draws are still made from the rng of every person, in the same order, so the people are the same.
+           streams: if not None, the streams the rngs of the people are taken from, eg RandomStreams.get_initialization_streams(seed),
+                    so that the initialization draws, and not only the draws of the simulation (see Population.seed_people), depend on the seed."""
+        if df.shape[0]==0:
+            return pd.Series(dtype=object, index=df.index)
+        columns = PersonFactory.get_columns_for_population(df)
+        columns[StaticRiskFactorsType.EDUCATION.value] = PersonFactory.get_enums_for_population(Education, df[StaticRiskFactorsType.EDUCATION.value])
+        columns[DynamicRiskFactorsType.ALCOHOL_PER_WEEK.value] = PersonFactory.get_enums_for_population(AlcoholCategory,
+                                                                                                       df[DynamicRiskFactorsType.ALCOHOL_PER_WEEK.value],
+                                                                                                       toInt=False)
+        columns[DynamicRiskFactorsType.WAIST.value] = PersonFactory.get_bounded_values(df, DynamicRiskFactorsType.WAIST.value)
+        columns[DynamicRiskFactorsType.PVD.value] = np.full(df.shape[0], None, dtype=object)
+        columns[DynamicRiskFactorsType.AFIB.value] = np.full(df.shape[0], None, dtype=object)
+        columns[StaticRiskFactorsType.MODALITY.value] = np.full(df.shape[0], None, dtype=object)
+
+        age = columns[DynamicRiskFactorsType.AGE.value]
+        #the prior to simulation outcomes, a missing age or an age of 1 or less means no outcome, the age at the outcome is at most the current age
+        strokeAge = PersonFactory.get_prior_outcome_ages(df, "selfReportStrokeAge")
+        miAge = PersonFactory.get_prior_outcome_ages(df, "selfReportMIAge")
+
+        #the risk factors are in the order of get_nhanes_person_init_information, the risk factors of a person are advanced in this order
+        staticColumns = PersonFactory.get_ordered_columns(columns, [StaticRiskFactorsType.RACE_ETHNICITY, StaticRiskFactorsType.EDUCATION,
+                                                                    StaticRiskFactorsType.GENDER, StaticRiskFactorsType.SMOKING_STATUS,
+                                                                    StaticRiskFactorsType.MODALITY])
+        dynamicColumns = PersonFactory.get_ordered_columns(columns, [rfd for rfd in DynamicRiskFactorsType
+                                                                     if rfd not in [DynamicRiskFactorsType.PVD, DynamicRiskFactorsType.AFIB]] +
+                                                                    [DynamicRiskFactorsType.AFIB, DynamicRiskFactorsType.PVD])
+
+        seeded = streams is not None
+        streams = streams if seeded else RandomStreams.get_default()
+        people = list()
+        for i, name in enumerate(df.index):
+            #as in get_nhanes_person_init_information, every person first gets an rng for the initialization draws and then the rng of the person
+            rng = streams.get_rng()
+            personOutcomes = dict(zip([outcome for outcome in OutcomeType],
+                                      [list() for outcome in range(len(OutcomeType))]))
+            if strokeAge is not None and strokeAge[i] > 1:
+                personOutcomes[OutcomeType.STROKE].append((strokeAge[i] if strokeAge[i] <= age[i] else age[i],
+                                                           StrokeOutcome(False, None, None, None, priorToSim=True)))
+            if miAge is not None:
+                selfReportMIAge = rng.integers(18, age[i]) if miAge[i] == 99999 else miAge[i]
+                if selfReportMIAge > 1:
+                    personOutcomes[OutcomeType.MI].append((selfReportMIAge if selfReportMIAge <= age[i] else age[i],
+                                                           Outcome(OutcomeType.MI, False, priorToSim=True)))
+            people.append(PersonFactory.get_person_from_columns(name, i, staticColumns, dynamicColumns, columns, personOutcomes,
+                                                                rng=streams.get_rng() if seeded else None))
+
+        #the pvd and afib models draw the first and second uniform of every person
+        uniforms, normals = PersonFactory.get_initialization_draws(people, 2, 0)
+        imr = PersonFactory.initialization_model_repository()
+        pvd = imr[DynamicRiskFactorsType.PVD.value].estimate_next_risk_for_population(columns, uniforms[:,0])
+        afib = imr[DynamicRiskFactorsType.AFIB.value].estimate_next_risk_for_population(columns, uniforms[:,1])
+        #the modality model does not draw (see ModalityPrevalenceModel), as in get_nhanes_person no number is taken for it,
+        #the pvd column passed to it only gives it the number of people
+        modality = imr[StaticRiskFactorsType.MODALITY.value].estimate_next_risk_for_population(columns, uniforms[:,0])
+        for person, personPVD, personAFib, personModality in zip(people, pvd, afib, modality):
+            person._pvd = [personPVD]
+            person._afib = [personAFib]
+            person._modality = personModality
+        return pd.Series(people, index=df.index, dtype=object)
+
+    @staticmethod
+    def get_kaiser_people(df, streams=None):
+        """Returns a Pandas Series with the Person-instances get_kaiser_person returns for every row of df, with the same index as df.
+           The enum conversions, the bounds, the initialization models and the WMH outcome are evaluated for all rows at once with array operations,
+           the random draws are still made from the rng of every person, in the same order, so the people are the same.
+           streams: as in get_nhanes_people."""
+        if df.shape[0]==0:
+            return pd.Series(dtype=object, index=df.index)
+        columns = PersonFactory.get_columns_for_population(df)
+        columns[StaticRiskFactorsType.MODALITY.value] = df[StaticRiskFactorsType.MODALITY.value].to_numpy()
+        columns[StaticRiskFactorsType.EDUCATION.value] = np.full(df.shape[0], None, dtype=object)
+        columns[DynamicRiskFactorsType.ALCOHOL_PER_WEEK.value] = np.full(df.shape[0], None, dtype=object)
+        columns[DynamicRiskFactorsType.WAIST.value] = np.full(df.shape[0], None, dtype=object)
+        for rf in [DynamicRiskFactorsType.AFIB.value, DynamicRiskFactorsType.PVD.value]:
+            columns[rf] = PersonFactory.get_bounded_values(df, rf)
+
+        #the risk factors are in the order of get_kaiser_person_init_information
+        staticColumns = PersonFactory.get_ordered_columns(columns, [StaticRiskFactorsType.MODALITY, StaticRiskFactorsType.RACE_ETHNICITY,
+                                                                    StaticRiskFactorsType.EDUCATION, StaticRiskFactorsType.GENDER,
+                                                                    StaticRiskFactorsType.SMOKING_STATUS])
+        dynamicColumns = PersonFactory.get_ordered_columns(columns, [rfd for rfd in DynamicRiskFactorsType if rfd!=DynamicRiskFactorsType.WAIST] +
+                                                                    [DynamicRiskFactorsType.WAIST])
+        people = list(map(lambda name, i: PersonFactory.get_person_from_columns(name, i, staticColumns, dynamicColumns, columns, None,
+                                                                                rng=None if streams is None else streams.get_rng()),
+                          df["name"].to_numpy(), range(df.shape[0])))
+
+        #the waist model draws the first normal, the alcohol and education models the first two uniforms and the WMH models the next three,
+        #the WMH severity uniform is used only for people with a known severity (see WMHModel.generate_next_outcomes_for_population)
+        uniforms, normals = PersonFactory.get_initialization_draws(people, 5, 1)
+        imr = PersonFactory.initialization_model_repository()
+        columns[DynamicRiskFactorsType.WAIST.value] = imr[DynamicRiskFactorsType.WAIST.value].estimate_next_risk_for_population(columns, normals[:,0])
+        columns[DynamicRiskFactorsType.ALCOHOL_PER_WEEK.value] = imr[DynamicRiskFactorsType.ALCOHOL_PER_WEEK.value].estimate_next_risk_for_population(columns,
+                                                                                                                                                uniforms[:,0])
+        columns[StaticRiskFactorsType.EDUCATION.value] = imr[StaticRiskFactorsType.EDUCATION.value].estimate_next_risk_for_population(columns, uniforms[:,1])
+        outcomes = ModelRegistry.get_model(WMHModelRepository).get_initial_outcomes_for_population(columns, uniforms[:,2:])
+        for i, person in enumerate(people):
+            person._waist = [columns[DynamicRiskFactorsType.WAIST.value][i]]
+            person._alcoholPerWeek = [columns[DynamicRiskFactorsType.ALCOHOL_PER_WEEK.value][i]]
+            person._education = columns[StaticRiskFactorsType.EDUCATION.value][i]
+            person.add_outcome(outcomes[i])
+        return pd.Series(people, index=df.index, dtype=object)
+
+    @staticmethod
+    def get_columns_for_population(df):
+        """Returns the columns the NHANES and Kaiser people have in common, with the enums and the bounds of the init information functions,
+           as a dictionary with one array per person attribute, like the columns the population versions of the models take (see CurrentValueColumns)."""
+        columns = {StaticRiskFactorsType.RACE_ETHNICITY.value: PersonFactory.get_enums_for_population(RaceEthnicity, df.raceEthnicity),
+                   StaticRiskFactorsType.GENDER.value: PersonFactory.get_enums_for_population(NHANESGender, df.gender),
+                   StaticRiskFactorsType.SMOKING_STATUS.value: PersonFactory.get_enums_for_population(SmokingStatus, df.smokingStatus)}
+        for rfd in DynamicRiskFactorsType:
+            if rfd not in [DynamicRiskFactorsType.ALCOHOL_PER_WEEK, DynamicRiskFactorsType.PVD, DynamicRiskFactorsType.AFIB, DynamicRiskFactorsType.WAIST]:
+                columns[rfd.value] = PersonFactory.get_bounded_values(df, rfd.value)
+        columns[DefaultTreatmentsType.STATIN.value] = df.statin.to_numpy().astype(bool)
+        columns[DefaultTreatmentsType.ANTI_HYPERTENSIVE_COUNT.value] = df.antiHypertensiveCount.to_numpy()
+        return columns
+
+    @staticmethod
+    def get_enums_for_population(enumClass, values, toInt=True):
+        """Returns an object array with enumClass(int(x)), or enumClass(x), for every x in values, every distinct value is converted only once."""
+        codes, uniques = pd.factorize(np.asarray(values, dtype=object), use_na_sentinel=False)
+        members = np.empty(len(uniques), dtype=object)
+        members[:] = [enumClass(int(x)) if toInt else enumClass(x) for x in uniques]
+        return members[codes]
+
+    @staticmethod
+    def get_bounded_values(df, rf):
+        return ModelRegistry.get_model(RiskModelRepository).apply_bounds_for_population(rf, df[rf].to_numpy())
+
+    @staticmethod
+    def get_prior_outcome_ages(df, column):
+        """Returns the ages in column as a float array, with the missing ages as nan, or None if df does not have the column,
+           eg when df was drawn from the NHANES distributions."""
+        if column not in df.columns:
+            return None
+        return df[column].astype(float).to_numpy()
+
+    @staticmethod
+    def get_ordered_columns(columns, riskFactors):
+        """Returns the columns of riskFactors, in the order of riskFactors, the order of the risk factors of a person is the order
+           they are advanced in, so it must be the same as in the init information functions."""
+        return {rf.value: columns[rf.value] for rf in riskFactors}
+
+    @staticmethod
+    def get_person_from_columns(name, i, staticColumns, dynamicColumns, columns, personOutcomes, rng=None):
+        """Returns the Person-instance with the values of row i of the columns, the outcomes are empty if personOutcomes is None.
+           rng: if not None, the rng of the person instead of a stream of the default streams."""
+        personStaticRiskFactors = {rf: values[i] for rf, values in staticColumns.items()}
+        personDynamicRiskFactors = {rf: values[i] for rf, values in dynamicColumns.items()}
+        personDefaultTreatments = {DefaultTreatmentsType.STATIN.value: bool(columns[DefaultTreatmentsType.STATIN.value][i]),
+                                   DefaultTreatmentsType.ANTI_HYPERTENSIVE_COUNT.value: columns[DefaultTreatmentsType.ANTI_HYPERTENSIVE_COUNT.value][i]}
+        personTreatmentStrategies = dict(zip([strategy.value for strategy in TreatmentStrategiesType],
+                                              [{"status": None} for strategy in range(len(TreatmentStrategiesType))]))
+        if personOutcomes is None:
+            personOutcomes = dict(zip([outcome for outcome in OutcomeType],
+                                      [list() for outcome in range(len(OutcomeType))]))
+        person = Person(name,
+                        personStaticRiskFactors,
+                        personDynamicRiskFactors,
+                        personDefaultTreatments,
+                        personTreatmentStrategies,
+                        personOutcomes)
+        if rng is not None:
+            person._rng = rng
         return person
 
+    @staticmethod
+    def get_initialization_draws(people, nUniform, nNormal):
+        """Returns the first nUniform uniform and nNormal standard normal draws the initialization models of every person make,
+           as arrays with one row per person, and releases the random numbers of the people.
+           These are the numbers the models would take, one after the other, from the rng of the person, see RandomBlock."""
+        uniforms = np.zeros((len(people), nUniform))
+        normals = np.zeros((len(people), nNormal))
+        for i, person in enumerate(people):
+            uniforms[i] = person._rng.uniform(size=nUniform)
+            if nNormal>0:
+                normals[i] = person._rng.standard_normal(size=nNormal)
+            person.release_random_numbers()
+        return uniforms, normals
+
     @staticmethod
     def initialization_model_repository():
         """Returns the repository needed in order to initialize a Person object.
            This is due to the fact that some risk factors that are needed in Microsim simulations
-           are not included in the data we use to construct persons but we have models for these risk factors. """
-        return {DynamicRiskFactorsType.AFIB.value: AFibPrevalenceModel(),
+           are not included in the data we use to construct persons but we have models for these risk factors.
+           The repository is built once and shared by all Person objects, the models must not be modified."""
+        if PersonFactory._initializationModelRepository is None:
+            PersonFactory._initializationModelRepository = {
+                DynamicRiskFactorsType.AFIB.value: AFibPrevalenceModel(),
                 DynamicRiskFactorsType.PVD.value: PVDPrevalenceModel(),
                 DynamicRiskFactorsType.WAIST.value: WaistPrevalenceModel(),
                 StaticRiskFactorsType.EDUCATION.value: EducationPrevalenceModel(),
                 DynamicRiskFactorsType.ALCOHOL_PER_WEEK.value: AlcoholPrevalenceModel(),
                 StaticRiskFactorsType.MODALITY.value: ModalityPrevalenceModel()}
+        return PersonFactory._initializationModelRepository
 
     @staticmethod
     def get_kaiser_person_init_information(x):
@@ -184,7 +388,7 @@ class PersonFactory:
                             StaticRiskFactorsType.GENDER.value: NHANESGender(int(x.gender)),
                             StaticRiskFactorsType.SMOKING_STATUS.value: SmokingStatus(int(x.smokingStatus))}
     
-        rfRepository = RiskModelRepository()
+        rfRepository = ModelRegistry.get_model(RiskModelRepository)
     
         personDynamicRiskFactors = dict()
         for rfd in DynamicRiskFactorsType:
@@ -231,8 +435,9 @@ class PersonFactory:
 
         #originally this outcome was obtained along with the rest of the outcomes, however treatment strategies need the CV risk, some of them at least,
         #the CV risks requires knowledge of wmh severity and the rest of the wmh parameters, so I am adding this outcome here... 
-        outcome = WMHModelRepository().select_outcome_model_for_person(person).get_next_outcome(person)
+        outcome = ModelRegistry.get_model(WMHModelRepository).select_outcome_model_for_person(person).get_next_outcome(person)
         person.add_outcome(outcome)
+        person.release_random_numbers()
         
         return person
 
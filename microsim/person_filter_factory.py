@@ -2,6 +2,7 @@ from microsim.person_filter import PersonFilter
 from microsim.risk_factor import DynamicRiskFactorsType, StaticRiskFactorsType
 from microsim.treatment import DefaultTreatmentsType
 from microsim.cv_model_repository import CVModelRepository
+from microsim.model_registry import ModelRegistry
 
 class PersonFilterFactory:
 
@@ -13,7 +14,7 @@ class PersonFilterFactory:
             pf.add_filter("df", "lowDBPLimit", lambda x: x[DynamicRiskFactorsType.DBP.value]>85)
             pf.add_filter("df", "highAntiHypertensivesLimit", lambda x: x[DefaultTreatmentsType.ANTI_HYPERTENSIVE_COUNT.value]<=3)
             pf.add_filter("person", "highDemAndCVLimit", 
-                                    lambda x: (CVModelRepository().select_outcome_model_for_person(x).get_risk_for_person(x)< (0.00477) ))
+                                    lambda x: (ModelRegistry.get_model(CVModelRepository, wmhSpecific=True).select_outcome_model_for_person(x).get_risk_for_person(x)< (0.00477) ))
             #self.add_filter("person", "highDemAndCVLimit", 
         #                    lambda x: ((DementiaModelRepository().select_outcome_model_for_person(x).get_risk_for_person(x, years=1)< (9.3*10**(-5)) ) &
             #                           CVModelRepository().select_outcome_model_for_person(x).get_risk_for_person(x)< (0.00477) ))
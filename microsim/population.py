@@ -1,6 +1,8 @@
 import copy
 import logging
 import multiprocessing as mp
+import time
+import weakref
 import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
@@ -18,6 +20,7 @@ from microsim.data_loader import (get_absolute_datafile_path,
 from microsim.gender import NHANESGender
 from microsim.gfr_equation import GFREquation
 from microsim.initialization_repository import InitializationRepository
+from microsim.model_registry import ModelRegistry
 from microsim.nhanes_risk_model_repository import NHANESRiskModelRepository
 from microsim.outcome import Outcome, OutcomeType
 from microsim.outcome_model_repository import OutcomeModelRepository
@@ -34,6 +37,8 @@ from microsim.risk_factor import DynamicRiskFactorsType, StaticRiskFactorsType,
 #from microsim.pvd_model import PVDPrevalenceModel
 from microsim.treatment import DefaultTreatmentsType, TreatmentStrategiesType, CategoricalDefaultTreatmentsType, ContinuousDefaultTreatmentsType, ContinuousTreatmentStrategiesType, CategoricalTreatmentStrategiesType
 from microsim.population_model_repository import PopulationRepositoryType, PopulationModelRepository
+from microsim.population_executor import PopulationExecutor
+from microsim.random_streams import RandomStreams
 from microsim.standardized_population import StandardizedPopulation
 from microsim.risk_model_repository import RiskModelRepository
 from microsim.wmh_severity import WMHSeverity
@@ -59,6 +64,19 @@ class Population:
        _n: population size
        _rng: the random number generator for the Population-instance, used only for Population-level methods as all Person-instances
              have their own rng.
+       _seed: if not None, the root seed of the Population-instance. Every Person-instance gets the random stream of the seed
+              that is keyed by the person index (see seed_people), so the same seed gives the same trajectories
+              no matter how many workers are used to advance the population.
+       _aliveIndices: the positions in _people of the Person-instances that are alive, kept compact by removing people
+                      as soon as they die, so that advancing the population and alive-only reporting only touch living people.
+       _horizon: if not None, the number of years the population is expected to be advanced. The histories of the Person-instances
+                 are then kept in preallocated buffers (see Person.preallocate_history) that can hold that many waves.
+       _executor: if not None, a PopulationExecutor with worker processes that hold the people of the population in shards,
+                  as left by advance_parallel with gather=False. _people is a property that calls gather_people, so reading the
+                  people while the shards are resident brings them back first.
+       _executorFinalizer: the weakref.finalize that closes the workers of _executor if the Population-instance is discarded, or the
+                           interpreter exits, before the people are gathered, eg if a trial raises between its two advance calls.
+       _chunkTimings: after advance_parallel_chunks, a list with the index, size, alive count and seconds spent on every chunk.
        Each instance will have two attributes for each PopulationRepositoryType item: the repository itself, and a list of the keys.
        For example, self._dynamicRiskFactorsRepository is the attribute that holds the repository with all models for predicting the risk factors
        and self._dynamicRiskFactors is a list that holds all those risk factors.
@@ -72,13 +90,34 @@ class Population:
     turn into an abstract class...
     """
    
-    def __init__(self, people, popModelRepository):
+    def __init__(self, people, popModelRepository, horizon=None, seed=None):
 
         self._waveCompleted = -1
+        self._executor = None
+        self._executorFinalizer = None
         self._people = people
         self._n = self._people.shape[0]
-        self._rng = np.random.default_rng() 
+        self._seed = seed
+        self._rng = np.random.default_rng(seed)
+        if seed is not None:
+            Population.seed_people(self._people, seed)
         self._modelRepository = popModelRepository._repository
+        self._horizon = horizon
+        if horizon is not None:
+            list(map(lambda x: x.preallocate_history(horizon), self._people))
+        self._aliveIndices = np.flatnonzero(np.array(list(map(lambda x: x.is_alive, self._people)), dtype=bool))
+        self._chunkTimings = []
+
+    @property
+    def _people(self):
+        """The people are brought back from the workers of the executor first, if they are held there (see advance_parallel),
+           so every method that reads the people sees them as they are after the last advance."""
+        self.gather_people()
+        return self._peopleSeries
+
+    @_people.setter
+    def _people(self, people):
+        self._peopleSeries = people
 
     @property
     def _staticRiskFactors(self):
@@ -92,39 +131,125 @@ class Population:
     def _defaultTreatments(self):
         return list(self._modelRepository[PopulationRepositoryType.DEFAULT_TREATMENTS.value]._repository.keys())
 
-    def advance(self, years, treatmentStrategies=None, nWorkers=1):
+    def advance(self, years, treatmentStrategies=None, nWorkers=1, gather=True, nChunks=None):
+        """With nWorkers>1 the people are advanced in chunks with dynamic scheduling (see advance_parallel_chunks) when they are gathered
+           after the advance, which is the default. The resident shards of advance_parallel are used when the people need to stay
+           in the workers (gather=False) and for the advance that follows, eg the second advance call of the treated population in Trial.run."""
         if nWorkers==1:
+            self.gather_people()
             self.advance_serial(years, treatmentStrategies=treatmentStrategies)
+        elif (nWorkers>1) & (nChunks is not None):
+            self.advance_parallel_chunks(years, treatmentStrategies=treatmentStrategies, nWorkers=nWorkers, nChunks=nChunks)
+        elif (nWorkers>1) & gather & ((self._executor is None) or (self._executor.nWorkers!=nWorkers)):
+            self.advance_parallel_chunks(years, treatmentStrategies=treatmentStrategies, nWorkers=nWorkers)
         elif nWorkers>1:
-            self.advance_parallel(years, treatmentStrategies=treatmentStrategies, nWorkers=nWorkers)
+            self.advance_parallel(years, treatmentStrategies=treatmentStrategies, nWorkers=nWorkers, gather=gather)
         else:
             print(f"Invalid nWorkers={nWorkers} argument provided.")
 
     def advance_serial(self, years, treatmentStrategies=None):
-        list(map(lambda x: x.advance(years, 
-                                     self._modelRepository[PopulationRepositoryType.DYNAMIC_RISK_FACTORS.value],
-                                     self._modelRepository[PopulationRepositoryType.DEFAULT_TREATMENTS.value],
-                                     self._modelRepository[PopulationRepositoryType.OUTCOMES.value],
-                                     treatmentStrategies),
-                 self._people))
+        #people are independent of each other, so advancing everyone one year at a time is the same as advancing each person
+        #all years at once, but this way people that died in a year are not visited again in the following years
+        for year in range(years):
+            alivePeople = self.get_alive_people()
+            list(map(lambda x: x.advance(1, 
+                                         self._modelRepository[PopulationRepositoryType.DYNAMIC_RISK_FACTORS.value],
+                                         self._modelRepository[PopulationRepositoryType.DEFAULT_TREATMENTS.value],
+                                         self._modelRepository[PopulationRepositoryType.OUTCOMES.value],
+                                         treatmentStrategies),
+                     alivePeople))
+            self.remove_dead_from_alive_indices(alivePeople)
         #note: need to remember that each Person-instance will have their own _waveCompleted attribute, which may be different than the
         #      Population-level _waveCompleted attribute
         self._waveCompleted += years
 
-    #Q: I think I need this for starmap
-    def worker_advance(self, subPopulation, years, treatmentStrategies):
+    def worker_advance(self, years, treatmentStrategies=None):
+        """Advances a sub-population in a PopulationExecutor worker and returns the summary the parent needs,
+           the size and alive indices of the sub-population."""
+        self.advance_serial(years, treatmentStrategies)
+        return {"n": self._n, "aliveIndices": self._aliveIndices}
+
+    def worker_gather(self):
+        """Returns the people of a sub-population held by a PopulationExecutor worker."""
+        return self._people
+
+    def advance_parallel(self, years, treatmentStrategies=None, nWorkers=2, gather=True):
+        """Advances the population in nWorkers worker processes of a PopulationExecutor. The people are sent to the workers
+           only the first time, the shards then stay resident in the workers so that consecutive advance_parallel calls,
+           eg the two advance calls of the treated population in Trial.run, only send the treatment strategies to the workers.
+           If gather is True the people are brought back to _people (and the workers are closed) after the advance,
+           otherwise the people stay in the workers until gather_people is called."""
+        if (self._executor is not None) and (self._executor.nWorkers!=nWorkers):
+            self.gather_people()
+        if self._executor is None:
+            #we do not need to divide the pop in nWorkers parts, could be a different number but
+            #the assumption is that all sub populations take about the same amount of time to advance
+            self._executor = PopulationExecutor(self.get_sub_populations(nWorkers))
+            self._executorFinalizer = weakref.finalize(self, self._executor.close)
+        summaries = self._executor.advance(years, treatmentStrategies)
+        offsets = np.cumsum([0] + [summary["n"] for summary in summaries[:-1]])
+        self._aliveIndices = np.concatenate([summary["aliveIndices"] + offset for summary, offset in zip(summaries, offsets)])
+        self._waveCompleted += years
+        if gather:
+            self.gather_people()
+
+    @staticmethod
+    def worker_advance_chunk(chunkIndex, subPopulation, years, treatmentStrategies):
+        """Advances one chunk in a worker of advance_parallel_chunks, returns the chunk with its index and timing."""
+        start = time.perf_counter()
         subPopulation.advance_serial(years, treatmentStrategies)
-        return subPopulation
+        return chunkIndex, subPopulation, time.perf_counter() - start
 
-    def advance_parallel(self, years, treatmentStrategies=None, nWorkers=2):
+    @staticmethod
+    def worker_advance_chunk_args(args):
+        return Population.worker_advance_chunk(*args)
+
+    def advance_parallel_chunks(self, years, treatmentStrategies=None, nWorkers=2, nChunks=None):
+        """Advances the population in nChunks small chunks that are handed out to nWorkers workers as they become available,
+           instead of one equal-size sub population per worker. The time needed to advance a sub population depends a lot
+           on who is in it, eg older people and people with a stroke history are much slower, so with dynamic scheduling
+           workers do not sit idle waiting for the slowest sub population.
+           The chunks are returned in the order they complete and are then put back in the original order of the people.
+           nChunks: defaults to 4 chunks per worker.
+           The timing of every chunk is kept in _chunkTimings, see get_chunk_timings."""
+        self.gather_people()
+        nChunks = 4*nWorkers if nChunks is None else nChunks
+        subPopulations = self.get_sub_populations(min(nChunks, self._n))
+        chunks = [None] * len(subPopulations)
+        self._chunkTimings = []
         with mp.Pool(nWorkers) as myPool:
-            #we do not need to divide the pop in nWorkers parts, could be a different number but
-            #the assumption is that all sub populations take about the same amount of time to advance
-            subPopulations = self.get_sub_populations(nWorkers)
-            subPopulations = myPool.starmap(self.worker_advance, [(sp, years, treatmentStrategies) for sp in subPopulations])
-        self._people = pd.concat([sp._people for sp in subPopulations])
+            for chunkIndex, subPopulation, seconds in myPool.imap_unordered(Population.worker_advance_chunk_args,
+                                                                             [(i, sp, years, treatmentStrategies) for i, sp in enumerate(subPopulations)]):
+                chunks[chunkIndex] = subPopulation
+                self._chunkTimings.append({"chunk": chunkIndex, "n": subPopulation._n,
+                                           "alive": subPopulation._aliveIndices.shape[0], "seconds": seconds})
+        self._people = pd.concat([sp._people for sp in chunks])
+        offsets = np.cumsum([0] + [sp._n for sp in chunks[:-1]])
+        self._aliveIndices = np.concatenate([sp._aliveIndices + offset for sp, offset in zip(chunks, offsets)])
         self._waveCompleted += years
 
+    def get_chunk_timings(self):
+        """Returns a dataframe with the timing of every chunk of the last advance_parallel_chunks, in chunk order."""
+        return pd.DataFrame(self._chunkTimings, columns=["chunk", "n", "alive", "seconds"]).sort_values("chunk").reset_index(drop=True)
+
+    def gather_people(self):
+        """Brings the people held by the workers of the executor back to _people and closes the executor."""
+        if self._executor is not None:
+            executor = self._executor
+            self._executor = None
+            self._executorFinalizer.detach()
+            self._people = pd.concat(executor.gather())
+            executor.close()
+
+    def get_alive_people(self):
+        """Returns an array with the Person-instances that are alive, without visiting the people that have died."""
+        return self._people.values[self._aliveIndices]
+
+    def remove_dead_from_alive_indices(self, alivePeople):
+        """Compacts the alive indices after a wave: alivePeople are the people at _aliveIndices before the wave,
+           the ones with a death outcome in that wave are removed."""
+        self._aliveIndices = self._aliveIndices[np.array(list(map(lambda x: x.is_alive, alivePeople)), dtype=bool)]
+
     def get_sub_populations(self, nPieces):
         """Divides the _people attribute of a single Population instance in nPieces and creates smaller Population instances
         with the same population model repository. This is a strategy in order to avoid passing the entire _people 
@@ -137,10 +262,11 @@ class Population:
         return [Population(people, modelRepository) for people, modelRepository in zip(peopleParts, modelRepositoryParts)]
 
     def copy(self):
+        self.gather_people()
         #people = self.get_people_copy()
         people = Population.get_people_copy(self._people)
         popModelRepository = self.get_pop_model_repository_copy()
-        selfCopy = Population(people, popModelRepository)
+        selfCopy = Population(people, popModelRepository, horizon=self._horizon, seed=self._seed)
         return selfCopy 
 
     def get_pop_model_repository_copy(self):
@@ -150,6 +276,18 @@ class Population:
                                     self._modelRepository[PopulationRepositoryType.OUTCOMES.value],
                                     self._modelRepository[PopulationRepositoryType.DYNAMIC_RISK_FACTORS.value])
 
+    @staticmethod
+    def seed_people(people, seed):
+        """Gives every Person-instance the stream of RandomStreams(seed) that has the person index as its key
+           (the position in people is used for people without an index).
+           The stream of a person therefore depends only on the root seed and the person index, not on the order of the people
+           or on how the people are divided among workers.
+           PopulationFactory makes the initialization draws of the people of a seeded population from the initialization streams
+           of the same seed (see RandomStreams.get_initialization_streams), which do not overlap with these."""
+        streams = RandomStreams(seed)
+        for i, person in enumerate(people):
+            person._rng = streams.get_rng(i if person._index is None else person._index)
+
     @staticmethod
     def get_people_copy(people):
         """The Person __deepcopy__ function assumes that the Person object has not been advanced to the future at all."""
@@ -656,7 +794,7 @@ class Population:
             tsVariables = self._people.iloc[0]._treatmentStrategies[ts].keys()
             for tsv in tsVariables:
                 if (tsv in [ctst.value for ctst in CategoricalTreatmentStrategiesType]) & (tsv!="status"):
-                    alivePeople = filter(lambda x: x.is_alive, self._people)
+                    alivePeople = self.get_alive_people()
                     tsvList = list(map(lambda x: x._treatmentStrategies[ts][tsv], alivePeople))
                     print(f"{tsv:>23}")
                     tsvValueCounts = Counter(tsvList)
@@ -665,18 +803,18 @@ class Population:
 
     def print_lastyear_treatment_strategy_distributions_by_risk(self, wmhSpecific=True):
         ''''''
-        popAlive = filter(lambda x: x.is_alive, self._people)
+        popAlive = self.get_alive_people()
         ts = TreatmentStrategiesType.BP.value
         tsv = "bpMedsAdded"
         bpMedsAddedList = list(map(lambda x: x._treatmentStrategies[ts][tsv], popAlive))
     
-        popAlive = filter(lambda x: x.is_alive, self._people)
+        popAlive = self.get_alive_people()
         ts = TreatmentStrategiesType.STATIN.value
         tsv = "statinsAdded"
         statinsAddedList = list(map(lambda x: x._treatmentStrategies[ts][tsv], popAlive))
     
-        cvModelRepository = CVModelRepository(wmhSpecific=wmhSpecific)
-        popAlive = filter(lambda x: x.is_alive, self._people)
+        cvModelRepository = ModelRegistry.get_model(CVModelRepository, wmhSpecific=wmhSpecific)
+        popAlive = self.get_alive_people()
         cvRiskList = list(map(lambda x: cvModelRepository.select_outcome_model_for_person(x).get_risk_for_person(x, years=10), popAlive))
         cvRiskBoundaries = np.quantile(cvRiskList, np.linspace(0, 1, 6))
         cvRiskQuintiles = np.digitize(cvRiskList, cvRiskBoundaries, right=False)
@@ -748,7 +886,7 @@ class Population:
             plt.clf()
             print("exported results as PNG figures")
         ageOutcome = list(map(lambda y: (y._age[-1], len(y._outcomes[outcomeType])>0),
-                               list(filter(lambda x: x.is_alive, self._people))))
+                               self.get_alive_people()))
         nAlive = len(ageOutcome)
         ageOutcome = list(filter(lambda x: x[1]==True, ageOutcome))
         ageOutcome = [int(x[0]) for x in ageOutcome]
@@ -799,12 +937,12 @@ class Population:
     def print_scd_cv_risk_proportions_table(self):
         '''Prints a table of proportions where the columns are CV risks without taking into account SCD specific information, such as WMH, SBI,
         and the rows are CV risks that include SCD specific information.'''
-        alive = filter(lambda x: x.is_alive, self._people) #just an iterator
-        cvNonScdSpecificRiskList = list(map(lambda x: CVModelRepository(wmhSpecific=False).select_outcome_model_for_person(x).get_risk_for_person(x, years=10),
+        alive = self.get_alive_people()
+        cvNonScdSpecificRiskList = list(map(lambda x: ModelRegistry.get_model(CVModelRepository, wmhSpecific=False).select_outcome_model_for_person(x).get_risk_for_person(x, years=10),
                                             alive))
     
-        alive = filter(lambda x: x.is_alive, self._people) #iterator again
-        cvRiskList = list(map(lambda x: CVModelRepository().select_outcome_model_for_person(x).get_risk_for_person(x, years=10), alive))    
+        alive = self.get_alive_people()
+        cvRiskList = list(map(lambda x: ModelRegistry.get_model(CVModelRepository, wmhSpecific=True).select_outcome_model_for_person(x).get_risk_for_person(x, years=10), alive))    
     
         binEdges = np.array([0.   , 0.05 , 0.075, 0.1  , 0.125, 0.15 , 1.001]) #use meaningful bins
         personCounts, xEdgesActual, yEdgesActual = np.histogram2d(cvRiskList, cvNonScdSpecificRiskList,  bins=[binEdges,binEdges])
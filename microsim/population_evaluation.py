@@ -0,0 +1,61 @@
+import inspect
+
+import numpy as np
+import pandas as pd
+
+class PopulationEvaluation:
+    """Evaluates the hand-written scalar models, eg the calc_linear_predictor_for_patient_characteristics functions of the
+       prevalence and WMH models, for a whole population with array operations.
+       These functions branch on their categorical arguments (if gender==NHANESGender.FEMALE: ...) so they cannot be called
+       with arrays directly, but everything they do with the continuous arguments is arithmetic. The population is split into the groups
+       of people with the same categorical values and the function is called once for every group, with the categorical values of the group
+       and arrays with the continuous values of its members, so every person gets exactly the same floating point operations
+       as when the function is called with the values of that person."""
+
+    @staticmethod
+    def apply_by_categories(function, columns, categorical):
+        """Returns function evaluated for every person in columns, an array, or a tuple of arrays if function returns a tuple.
+           function: its parameters are named after the person attributes, eg age or raceEthnicity, and are looked up in columns.
+           columns: a dictionary with an array of the current value of every person attribute, see CurrentValueColumns.
+           categorical: the names of the parameters function branches on."""
+        arguments = {name: np.asarray(columns[name]) for name in inspect.signature(function).parameters.keys()}
+        n = len(next(iter(arguments.values())))
+        groupCodes = np.zeros(n, dtype=np.int64)
+        for name in categorical:
+            codes, uniques = pd.factorize(arguments[name].astype(object), use_na_sentinel=False)
+            groupCodes = groupCodes * len(uniques) + codes
+        order = np.argsort(groupCodes, kind="stable")
+        starts = np.flatnonzero(np.diff(groupCodes[order], prepend=-1))
+        results = None
+        for positions in (np.split(order, starts[1:]) if n>0 else []):
+            groupArguments = {name: values[positions[0]] if name in categorical else values[positions] for name, values in arguments.items()}
+            groupResults = function(**groupArguments)
+            if results is None:
+                results = [np.empty(n) for i in range(len(groupResults))] if isinstance(groupResults, tuple) else np.empty(n)
+            if isinstance(groupResults, tuple):
+                for result, groupResult in zip(results, groupResults):
+                    result[positions] = groupResult
+            else:
+                results[positions] = groupResults
+        if results is None:
+            return np.empty(0)
+        return tuple(results) if isinstance(results, list) else results
+
+    @staticmethod
+    def inverse_logit(lp):
+        """Same as the inverse_logit methods of the models, including the limits that avoid over/under-flow, for an array."""
+        with np.errstate(over="ignore"):
+            risk = 1/(1+np.exp(-lp))
+        return np.where(lp<-10, 0., np.where(lp>10., 1., risk))
+
+    @staticmethod
+    def select_category(draws, cumulativeProbabilities, categories, modelName, inclusiveLast=False):
+        """Returns the categories of an ordered logistic model: the first category whose cumulative probability is larger than the draw,
+           or the last category if the draw is smaller than 1 (or equal to 1 if inclusiveLast)."""
+        conditions = [draws<cp for cp in cumulativeProbabilities] + [(draws<=1.) if inclusiveLast else (draws<1.)]
+        index = np.select(conditions, list(range(len(categories))), default=-1)
+        if (index==-1).any():
+            raise RuntimeError(f"Draw not consistent with cumulative probabilities in {modelName}.")
+        choices = np.empty(len(categories), dtype=object)
+        choices[:] = categories
+        return choices[index]
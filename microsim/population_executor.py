@@ -0,0 +1,80 @@
+import multiprocessing as mp
+import traceback
+
+class PopulationExecutor:
+    """Long-lived worker processes, each one holding one sub-population (shard) of a Population-instance.
+       The shards are sent to the workers once, when the executor is created, and then stay resident in the workers
+       across advance calls. Only the advance arguments (years and the treatment strategies) are sent to the workers
+       and only what the worker_advance method of the shard returns, eg the size and alive indices for a Population-instance,
+       is sent back after an advance.
+       The Person-instances are sent back to the parent process only when gather is called.
+       _processes: the worker processes, one per shard.
+       _connections: the parent ends of the pipes to the workers, in the shard order."""
+
+    def __init__(self, subPopulations):
+        self._processes = []
+        self._connections = []
+        for subPopulation in subPopulations:
+            parentConnection, workerConnection = mp.Pipe()
+            process = mp.Process(target=PopulationExecutor.worker_loop, args=(workerConnection, subPopulation), daemon=True)
+            process.start()
+            workerConnection.close()
+            self._processes.append(process)
+            self._connections.append(parentConnection)
+
+    @property
+    def nWorkers(self):
+        return len(self._processes)
+
+    @property
+    def is_open(self):
+        return len(self._connections)>0
+
+    @staticmethod
+    def worker_loop(connection, subPopulation):
+        """The loop run by each worker: waits for a command from the parent, runs it on the resident shard and sends back the result."""
+        while True:
+            command, args = connection.recv()
+            if command=="close":
+                connection.close()
+                break
+            try:
+                if command=="advance":
+                    result = subPopulation.worker_advance(*args)
+                elif command=="gather":
+                    result = subPopulation.worker_gather()
+                else:
+                    raise RuntimeError(f"Unknown PopulationExecutor command {command}.")
+                connection.send(("ok", result))
+            except Exception:
+                connection.send(("error", traceback.format_exc()))
+
+    def run(self, command, args=()):
+        """Sends the command to all workers first, so that the shards are processed in parallel, and then collects
+           the results in the shard order."""
+        if not self.is_open:
+            raise RuntimeError("Cannot run a command on a PopulationExecutor that has been closed.")
+        for connection in self._connections:
+            connection.send((command, args))
+        replies = [connection.recv() for connection in self._connections]
+        errors = [result for status, result in replies if status=="error"]
+        if len(errors)>0:
+            raise RuntimeError(f"PopulationExecutor worker failed during {command}:\n{errors[0]}")
+        return [result for status, result in replies]
+
+    def advance(self, years, treatmentStrategies=None):
+        """Advances all resident shards, returns a list with the worker_advance result of each shard."""
+        return self.run("advance", (years, treatmentStrategies))
+
+    def gather(self):
+        """Returns a list with the worker_gather result of each shard, eg the people of a Population-instance, in the shard order."""
+        return self.run("gather")
+
+    def close(self):
+        for connection in self._connections:
+            connection.send(("close", ()))
+            connection.close()
+        for process in self._processes:
+            process.join()
+        self._connections = []
+        self._processes = []
@@ -1,12 +1,13 @@
 import pandas as pd
 import numpy as np
-from itertools import product
+from itertools import product, chain
 from scipy.stats import multivariate_normal
 from enum import Enum
 
 from microsim.person_factory import PersonFactory
 from microsim.person_filter_factory import PersonFilterFactory
 from microsim.population import Population
+from microsim.columnar_population import ColumnarPopulation
 from microsim.risk_factor import DynamicRiskFactorsType, StaticRiskFactorsType
 from microsim.population_model_repository import PopulationModelRepository, PopulationRepositoryType
 from microsim.outcome_model_repository import OutcomeModelRepository
@@ -24,6 +25,8 @@ from microsim.variable_type import VariableType
 from microsim.outcome import OutcomeType
 from microsim.population_type import PopulationType
 from microsim.modality import Modality
+from microsim.columnar_cache import ColumnarCache
+from microsim.random_streams import RandomStreams
 
 class PopulationFactory:
     nhanes_pop_attributes = {PopulationRepositoryType.STATIC_RISK_FACTORS.value: 
@@ -110,6 +113,13 @@ class PopulationFactory:
                                                      DynamicRiskFactorsType.BMI.value, 
                                                      DefaultTreatmentsType.ANTI_HYPERTENSIVE_COUNT.value]}
 
+    #the version of read_nhanesDf, the cached NHANES df is used only if it was built with the current version, see get_nhanesDf
+    nhanesDfVersion = 1
+    #the version of read_kaiser_distributions, see get_kaiser_distributions
+    kaiserDistributionsVersion = 1
+    #the maximum number of rounds of draws get_kaiser_people makes to replace the people the person filters rejected
+    kaiserMaxRounds = 100
+
     @staticmethod
     def variable_types(varType=VariableType.CATEGORICAL.value, popType=PopulationType.NHANES.value):
         if popType==PopulationType.NHANES.value:
@@ -163,9 +173,18 @@ class PopulationFactory:
 
     @staticmethod
     def get_nhanesDf():
+        """Returns a Pandas df with the NHANES information as exists in Microsim, see read_nhanesDf.
+           The df is read from a columnar cache of the .dta file, that is built the first time and again when the .dta file changes."""
+        return ColumnarCache.load("microsim/data/fullyImputedDataset.dta",
+                                  PopulationFactory.read_nhanesDf,
+                                  "nhanes",
+                                  version=PopulationFactory.nhanesDfVersion)
+
+    @staticmethod
+    def read_nhanesDf(dtaFile):
         """Reads and modifies the NHANES dataframe so that it is ready to be used in the simulation.
-           Returns a Pandas df with the NHANES information as exists in Microsim."""
-        nhanesDf = pd.read_stata("microsim/data/fullyImputedDataset.dta")
+           Any change here must be accompanied by an increase of nhanesDfVersion, otherwise the cached df will continue to be used."""
+        nhanesDf = pd.read_stata(dtaFile)
         #in Person-objects, the attribute name is used
         nhanesDf = nhanesDf.rename(columns={"level_0":"name"})
         #rename the columns that have different column names than the ones that appear in Microsim
@@ -173,8 +192,8 @@ class PopulationFactory:
         #convert the integers to booleans because in the simulation we always use bool for this rf
         nhanesDf[DynamicRiskFactorsType.ANY_PHYSICAL_ACTIVITY.value] = nhanesDf[DynamicRiskFactorsType.ANY_PHYSICAL_ACTIVITY.value].astype(bool)
         #convert drinks per week to category
-        nhanesDf[DynamicRiskFactorsType.ALCOHOL_PER_WEEK.value] = nhanesDf.apply(lambda x:
-                                                                                 AlcoholCategory.get_category_for_consumption(x[DynamicRiskFactorsType.ALCOHOL_PER_WEEK.value]), axis=1)
+        nhanesDf[DynamicRiskFactorsType.ALCOHOL_PER_WEEK.value] = AlcoholCategory.get_categories_for_consumption(
+                                                                                 nhanesDf[DynamicRiskFactorsType.ALCOHOL_PER_WEEK.value].to_numpy())
         return nhanesDf
 
     @staticmethod
@@ -216,13 +235,16 @@ class PopulationFactory:
         return df
 
     @staticmethod
-    def get_nhanes_people(n=None, year=None, personFilters=None, nhanesWeights=False, distributions=False, customWeights=None):
+    def get_nhanes_people(n=None, year=None, personFilters=None, nhanesWeights=False, distributions=False, customWeights=None, seed=None):
         '''Returns a Pandas Series object with Person-Objects of all persons included in NHANES for year 
            with or without sampling. Filters are applied prior to sampling in order to maximize efficiency and minimize
            memory utilization. This does not affect the distribution of the relative percentages of groups 
            represented in people.
            The flag distributions controls if the Person-objects will come directly from the NHANES data or
-           if Gaussian distributions will first be fit to the NHANES data and then draws are obtained from the distributions.'''
+           if Gaussian distributions will first be fit to the NHANES data and then draws are obtained from the distributions.
+           seed: if not None, the people are sampled with the sampling rng of seed (see RandomStreams.get_sampling_rng) and
+           their initialization draws are made from the initialization streams of seed (see RandomStreams.get_initialization_streams),
+           so the same seed gives the same people. Without a seed, the sampling uses the numpy global random state.'''
 
         if year not in [2011, 2015, 2007, 2003, 2009, 2001, 2005, 1999, 2013, 2017]:
             raise RuntimeError(f"NHANES data for year {year} is not available") 
@@ -232,6 +254,7 @@ class PopulationFactory:
         if year is not None:
             nhanesDf = nhanesDf.loc[nhanesDf.year == year]
         nhanesDf = PopulationFactory.apply_person_filters_on_df(personFilters, nhanesDf)        
+        rng = None if seed is None else RandomStreams.get_sampling_rng(seed)
  
         #if we want to draw from the NHANES distributions, then we fit the NHANES data first, draw, convert the draws to 
         #a Pandas dataframe, bring in the NHANES weights (because I do not keep those when I do the fits)
@@ -239,7 +262,7 @@ class PopulationFactory:
         if distributions:
             dfForGroups = PopulationFactory.get_partitioned_nhanes_people(year=year)
             distributions = PopulationFactory.get_distributions(dfForGroups)
-            drawsForGroups, namesForGroups = PopulationFactory.draw_from_distributions(distributions)
+            drawsForGroups, namesForGroups = PopulationFactory.draw_from_distributions(distributions, rng=rng)
             df = PopulationFactory.get_df_from_draws(drawsForGroups, namesForGroups, popType=PopulationType.NHANES.value)
             df = df.merge(nhanesDf[["name","WTINT2YR"]], on="name", how="inner").copy()
             nhanesDf = df
@@ -254,18 +277,20 @@ class PopulationFactory:
                                     to occur the sampling size is needed.""")
             else:
                 weights = nhanesDf.WTINT2YR
-                nhanesDfForPeople = nhanesDf.sample(n, weights=weights, replace=True)
+                nhanesDfForPeople = nhanesDf.sample(n, weights=weights, replace=True, random_state=rng)
         elif customWeights is not None:
-            nhanesDfForPeople = nhanesDf.sample(n, weights=customWeights, replace=True)
+            nhanesDfForPeople = nhanesDf.sample(n, weights=customWeights, replace=True, random_state=rng)
         else:
             nhanesDfForPeople = nhanesDf
 
-        people = pd.DataFrame.apply(nhanesDfForPeople, PersonFactory.get_nhanes_person, axis="columns")
+        streams = None if seed is None else RandomStreams.get_initialization_streams(seed)
+        people = PersonFactory.get_nhanes_people(nhanesDfForPeople, streams=streams)
 
         people = PopulationFactory.apply_person_filters_on_people(personFilters, people)
 
         if nhanesWeights:
-            people = PopulationFactory.bring_people_to_target_n(n, people, nhanesDf, personFilters, popType=PopulationType.NHANES.value)
+            people = PopulationFactory.bring_people_to_target_n(n, people, nhanesDf, personFilters, popType=PopulationType.NHANES.value,
+                                                                streams=streams, rng=rng)
             
         PopulationFactory.set_index_in_people(people)
         return people
@@ -287,18 +312,31 @@ class PopulationFactory:
                                          CohortStaticRiskFactorModelRepository())
 
     @staticmethod    
-    def get_nhanes_population(n=None, year=None, personFilters=None, nhanesWeights=False, distributions=False, customWeights=None):
+    def get_nhanes_population(n=None, year=None, personFilters=None, nhanesWeights=False, distributions=False, customWeights=None, horizon=None, seed=None,
+                              columnar=False):
         '''Returns a Population-object with Person-objects being all NHANES persons with or without sampling.
-           Person attributes can originate either from the NHANES dataset directly or from distributions fit to the NHANES dataset.'''
-        people = PopulationFactory.get_nhanes_people(n=n, year=year, personFilters=personFilters, nhanesWeights=nhanesWeights, distributions=distributions,customWeights=customWeights)
+           Person attributes can originate either from the NHANES dataset directly or from distributions fit to the NHANES dataset.
+           horizon: if the number of years the population will be advanced is known, the Person histories are preallocated for it.
+           seed: the root seed of the sampling of the people and their initialization draws (see get_nhanes_people) and of the simulation (see Population.seed_people).
+           columnar: if True a ColumnarPopulation is returned, the people are then advanced over columns instead of Person-objects.'''
+        people = PopulationFactory.get_nhanes_people(n=n, year=year, personFilters=personFilters, nhanesWeights=nhanesWeights, distributions=distributions,
+                                                     customWeights=customWeights, seed=seed)
         popModelRepository = PopulationFactory.get_nhanes_population_model_repo()
-        return Population(people, popModelRepository)
+        return PopulationFactory.get_population(people, popModelRepository, horizon=horizon, seed=seed, columnar=columnar)
 
     @staticmethod
-    def get_kaiser_population(n=1000, personFilters=None, wmhSpecific=True):
-        people = PopulationFactory.get_kaiser_people(n=n, personFilters=personFilters)
+    def get_kaiser_population(n=1000, personFilters=None, wmhSpecific=True, horizon=None, seed=None, columnar=False):
+        people = PopulationFactory.get_kaiser_people(n=n, personFilters=personFilters, seed=seed)
         popModelRepository = PopulationFactory.get_kaiser_population_model_repo(wmhSpecific=wmhSpecific)
-        return Population(people, popModelRepository)
+        return PopulationFactory.get_population(people, popModelRepository, horizon=horizon, seed=seed, columnar=columnar)
+
+    @staticmethod
+    def get_population(people, popModelRepository, horizon=None, seed=None, columnar=False):
+        '''Returns a Population, or a ColumnarPopulation if columnar is True, of people.'''
+        if columnar:
+            return ColumnarPopulation(people, popModelRepository, horizon=0 if horizon is None else horizon, seed=seed)
+        else:
+            return Population(people, popModelRepository, horizon=horizon, seed=seed)
 
     @staticmethod
     def get_partitioned_nhanes_people(year=None):
@@ -368,77 +406,60 @@ class PopulationFactory:
 
     @staticmethod
     def get_kaiser_distributions():
-        meanForGroups = dict()
-        covForGroups = dict()
-        minForGroups = dict()
-        maxForGroups = dict()
-        singularForGroups = dict()
-        sizeForGroups = dict()
-        namesForGroups = dict()
-        
+        """Returns the distributions of the Kaiser groups, in the same format as get_distributions.
+           The distributions are built from the Kaiser csv files only once, they are cached on disk with the checksums of the csv files
+           so later calls, also in other processes, only read the cache (see ColumnarCache).
+           The names of the people in each group are not cached, they are created here."""
+        fileDir = "microsim/data/kaiser"
+        csvFiles = ['/kaiserMin.csv', '/kaiserMax.csv', '/kaiserMean.csv', '/kaiserCovariance.csv', '/kaiserWeight.csv']
+        distributions = ColumnarCache.load_object([fileDir+y for y in csvFiles], PopulationFactory.read_kaiser_distributions,
+                                                  "kaiserDistributions", version=PopulationFactory.kaiserDistributionsVersion)
+        distributions["names"] = {key: [f"{index}kaiserPerson{i}" for i in range(size)]
+                                  for index, (key, size) in enumerate(distributions["size"].items())}
+        return distributions
+
+    @staticmethod
+    def read_kaiser_distributions(csvPaths):
+        """Reads the min, max, mean, covariance and weight Kaiser csv files (in that order) and returns the distributions without names.
+           The groups are the combinations of the categorical variables in the min file, in the order of that file.
+           Every file is indexed by the categorical variables once, the rows of each group are then found with a single join.
+           Any change here must be accompanied by an increase of kaiserDistributionsVersion, otherwise the cached distributions will continue to be used."""
         #kaiser population size
         popSize = 315142
 
-        fileDir = "microsim/data/kaiser"
-        csvFiles = ['/kaiserMin.csv', '/kaiserMax.csv', '/kaiserMean.csv', '/kaiserCovariance.csv', '/kaiserWeight.csv']        
-        (minDf, maxDf, meanDf, covDf, weightDf) = list(map(lambda x: PopulationFactory.get_kaiserDf(x), [fileDir+y for y in csvFiles]))
-        
+        (minDf, maxDf, meanDf, covDf, weightDf) = list(map(lambda x: PopulationFactory.get_kaiserDf(x), csvPaths))
+
         catVariables = PopulationFactory.kaiser_variable_types[VariableType.CATEGORICAL.value]
         conVariables = PopulationFactory.kaiser_variable_types[VariableType.CONTINUOUS.value]
-        
-        for index, key in minDf[catVariables].iterrows():
-            key = tuple(key.tolist())
-            meanForGroups[key] = meanDf.loc[
-                                (meanDf["modality"]==key[0]) &
-                                (meanDf["gender"]==key[1]) &
-                                (meanDf["raceEthnicity"]==key[2]) &
-                                (meanDf["smokingStatus"]==key[3]) &
-                                (meanDf["afib"]==key[4]) &
-                                (meanDf["pvd"]==key[5]) &
-                                (meanDf["statin"]==key[6]) &
-                                (meanDf["anyPhysicalActivity"]==key[7]), conVariables].to_numpy()[0]
-            covForGroups[key] = covDf.loc[
-                                (covDf["modality"]==key[0]) & 
-                                (covDf["gender"]==key[1]) &
-                                (covDf["raceEthnicity"]==key[2]) &
-                                (covDf["smokingStatus"]==key[3]) &
-                                (covDf["afib"]==key[4]) &
-                                (covDf["pvd"]==key[5]) &
-                                (covDf["statin"]==key[6]) &
-                                (covDf["anyPhysicalActivity"]==key[7]), conVariables].to_numpy()
-            singularForGroups[key] = PopulationFactory.is_singular(covForGroups[key])
-            minForGroups[key] = minDf.loc[
-                                (minDf["modality"]==key[0]) &
-                                (minDf["gender"]==key[1]) &
-                                (minDf["raceEthnicity"]==key[2]) &
-                                (minDf["smokingStatus"]==key[3]) &
-                                (minDf["afib"]==key[4]) &
-                                (minDf["pvd"]==key[5]) &
-                                (minDf["statin"]==key[6]) &
-                                (minDf["anyPhysicalActivity"]==key[7]), conVariables].to_numpy()[0]
-            maxForGroups[key] = maxDf.loc[
-                                (maxDf["modality"]==key[0]) &
-                                (maxDf["gender"]==key[1]) &
-                                (maxDf["raceEthnicity"]==key[2]) &
-                                (maxDf["smokingStatus"]==key[3]) &
-                                (maxDf["afib"]==key[4]) &
-                                (maxDf["pvd"]==key[5]) &
-                                (maxDf["statin"]==key[6]) &
-                                (maxDf["anyPhysicalActivity"]==key[7]), conVariables].to_numpy()[0]
-            sizeForGroups[key] = int(
-                                 popSize * 
-                                 weightDf.loc[
-                                (weightDf["modality"]==key[0]) &
-                                (weightDf["gender"]==key[1]) &
-                                (weightDf["raceEthnicity"]==key[2]) &
-                                (weightDf["smokingStatus"]==key[3]) &
-                                (weightDf["afib"]==key[4]) &
-                                (weightDf["pvd"]==key[5]) &
-                                (weightDf["statin"]==key[6]) &
-                                (weightDf["anyPhysicalActivity"]==key[7]), "weight"].to_numpy()[0])
-            namesForGroups[key] = [f"{index}kaiserPerson{i}" for i in range(sizeForGroups[key])]
-        distributions = {"mean": meanForGroups, "cov": covForGroups, "min": minForGroups, "max": maxForGroups, 
-                         "singular": singularForGroups, "size": sizeForGroups, "names": namesForGroups}
+
+        groups = pd.MultiIndex.from_frame(minDf[catVariables])
+        keys = list(map(tuple, minDf[catVariables].astype(object).to_numpy().tolist()))
+
+        def get_rows(df, columns):
+            #the first row of every group, like the original one-group-at-a-time search
+            df = df.drop_duplicates(catVariables).set_index(catVariables)
+            positions = df.index.get_indexer(groups)
+            if (positions==-1).any():
+                raise RuntimeError(f"Kaiser groups missing from a Kaiser csv file: {list(groups[positions==-1])}")
+            return df[columns].to_numpy()[positions]
+
+        (mins, maxs, means) = list(map(lambda x: get_rows(x, conVariables), [minDf, maxDf, meanDf]))
+        sizes = (popSize * get_rows(weightDf, "weight")).astype(int).tolist()
+
+        #the covariance file has one row for each continuous variable of each group
+        covPositions = groups.get_indexer(pd.MultiIndex.from_frame(covDf[catVariables]))
+        counts = np.bincount(covPositions[covPositions>=0], minlength=len(groups))
+        if (counts!=len(conVariables)).any():
+            raise RuntimeError(f"Kaiser covariance file does not have {len(conVariables)} rows for every group.")
+        order = np.argsort(np.where(covPositions>=0, covPositions, len(groups)), kind="stable")[:len(groups)*len(conVariables)]
+        covs = covDf[conVariables].to_numpy()[order].reshape((len(groups), len(conVariables), len(conVariables)))
+
+        distributions = {"mean": dict(zip(keys, means)),
+                         "cov": dict(zip(keys, covs)),
+                         "min": dict(zip(keys, mins)),
+                         "max": dict(zip(keys, maxs)),
+                         "singular": dict(zip(keys, map(PopulationFactory.is_singular, covs))),
+                         "size": dict(zip(keys, sizes))}
         distributions = PopulationFactory.get_alt_groups(distributions)
         return distributions
 
@@ -448,93 +469,139 @@ class PopulationFactory:
         with a non-singular covariance matrix.
         The term 'similar' can be defined in many different ways..."""
         altForSingular = dict()
-        for key in distributions["singular"].keys():
-            if distributions["singular"][key]:
-                altKeys = list()
-                altProbs = list()
-                meanOfSingular = distributions["mean"][key]
-                for altKey in distributions["singular"].keys():
-                    if not distributions["singular"][altKey]:
-                       altProbability = multivariate_normal(distributions["mean"][altKey],
-                                                            distributions["cov"][altKey], allow_singular=False).pdf(meanOfSingular)
-                       altKeys += [altKey]
-                       altProbs += [altProbability]
-                #using the max probability means we are using both the mean and the sd of the alternative distribution
-                altForSingular[key] = altKeys[altProbs.index(max(altProbs))]
+        singularKeys = [key for key in distributions["singular"].keys() if distributions["singular"][key]]
+        altKeys = [key for key in distributions["singular"].keys() if not distributions["singular"][key]]
+        if len(singularKeys)>0:
+            meansOfSingular = np.array([distributions["mean"][key] for key in singularKeys])
+            #one distribution for every alternative, evaluated at the means of all singular groups at once
+            altProbs = np.array([multivariate_normal(distributions["mean"][altKey],
+                                                     distributions["cov"][altKey], allow_singular=False).pdf(meansOfSingular).reshape(-1)
+                                 for altKey in altKeys])
+            #using the max probability means we are using both the mean and the sd of the alternative distribution
+            for key, altIndex in zip(singularKeys, np.argmax(altProbs, axis=0)):
+                altForSingular[key] = altKeys[altIndex]
         distributions["alt"] = altForSingular
         return distributions
 
     @staticmethod
-    def draw_from_distributions(distributions):
+    def get_sample_sizes(distributions, n, rng=None):
+        """Allocates n people to the groups of the distributions in proportion to the size of the groups (multinomial).
+           Returns a dictionary with the number of people of every group that has at least one person, in the order of the distributions.
+           rng: the np.random.Generator of the multinomial draw, the numpy global random state if None."""
+        rng = np.random if rng is None else rng
+        keys = list(distributions["size"].keys())
+        sizes = np.array(list(distributions["size"].values()), dtype=float)
+        counts = rng.multinomial(n, sizes/sizes.sum())
+        return {key: int(count) for key, count in zip(keys, counts) if count>0}
+
+    @staticmethod
+    def draw_from_distributions(distributions, sizes=None, rng=None):
         """Draws from the multivariate normal distributions for each combination of categorical variables (group).
-        If a draw includes a continuous variable value outside the bounds, it re-draws.
+        If a draw includes a continuous variable value outside the bounds, it re-draws (see draw_from_truncated_normals).
         For each group, the number of draws from the distribution is equal to the number of people in that group in 
-        the original NHANES dataframe (as contained in dfForGroups).""" 
-        drawsForGroups = dict()
+        the original NHANES dataframe (as contained in dfForGroups).
+        sizes: if not None, a dictionary with the number of draws for each group (see get_sample_sizes), only these groups are drawn
+               and the names of the people in a group are reused if there are more draws than people in the group.
+        rng: the np.random.Generator of the draws, the numpy global random state if None.""" 
         namesForGroups = dict()
         #just use the "mean" for the keys
-        for key in distributions["mean"].keys():
+        keys = list(distributions["mean"].keys() if sizes is None else sizes.keys())
+        drawSizes = list()
+        means = list()
+        choleskyFactors = list()
+        lowerBounds = list()
+        upperBounds = list()
+        #the Cholesky factor of a distribution is computed only once, alternative distributions are shared by many groups
+        choleskyForDistributions = dict()
+        for key in keys:
             size = distributions["size"][key]
-            namesForGroups[key] = distributions["names"][key]
+            if sizes is None:
+                drawSizes.append(size)
+                namesForGroups[key] = distributions["names"][key]
+            else:
+                drawSizes.append(sizes[key])
+                names = distributions["names"][key]
+                namesForGroups[key] = [names[i % len(names)] for i in range(sizes[key])]
             #use either the original distribution or the alternative if the cov matrix is singular
             distKey = key if not distributions["singular"][key] else distributions["alt"][key]
-            distMean = distributions["mean"][distKey]
-            distCov = distributions["cov"][distKey]
-            dist = multivariate_normal(distMean, distCov, allow_singular=False)
+            if distKey not in choleskyForDistributions:
+                choleskyForDistributions[distKey] = np.linalg.cholesky(distributions["cov"][distKey])
+            means.append(distributions["mean"][distKey])
+            choleskyFactors.append(choleskyForDistributions[distKey])
             #this determines which bounds we use if the cov matrix is singular...the original ones or the ones from the alternative distribution
-            if distributions["singular"][key] & (size>4):
-                distMin = distributions["min"][key]
-                distMax = distributions["max"][key]
-            else:
-                distMin = distributions["min"][distKey]
-                distMax = distributions["max"][distKey]
-
-            nhanesContinuousVariables = PopulationFactory.nhanes_variable_types[VariableType.CONTINUOUS.value]
-            drawsNeeded = size
-            draws = None
-            #the logic about when to reshape can be improved probably...
-            while drawsNeeded>0:
-                if draws is None:
-                    draws = dist.rvs(size=drawsNeeded)
-                else:
-                    if len(draws.shape)==1:
-                        draws = draws.reshape((1, len(nhanesContinuousVariables)))
-                    if (drawsNeeded==1):
-                        draws = np.concatenate( (draws, dist.rvs(size=drawsNeeded).reshape((1,distMean.shape[0]))), axis=0 )
-                    else:
-                        draws = np.concatenate( (draws, dist.rvs(size=drawsNeeded)), axis=0 )
-                if size==1:
-                    draws = draws.reshape((1, distMean.shape[0]))
- 
-                #find which draws contain one or more continuous variables that is outside of the bounds
-                rowsOutOfBounds = np.array([False]*size)
-                for i, bound in enumerate(distMin):
-                    rowsOutOfBounds = rowsOutOfBounds | (draws[:,i]<0.9*bound)
-                for i, bound in enumerate(distMax):
-                    rowsOutOfBounds = rowsOutOfBounds | (draws[:,i]>1.1*bound)
-                #how many more draws we need in the next iteration
-                drawsNeeded = size - np.sum(~rowsOutOfBounds)
-                #keep the draws that have all continuous variables within the bounds
-                draws = draws[~rowsOutOfBounds,:] 
-            drawsForGroups[key] = draws
+            boundsKey = key if (distributions["singular"][key] & (size>4)) else distKey
+            lowerBounds.append(0.9*distributions["min"][boundsKey])
+            upperBounds.append(1.1*distributions["max"][boundsKey])
+        draws = PopulationFactory.draw_from_truncated_normals(np.array(drawSizes, dtype=int), means, choleskyFactors,
+                                                              np.array(lowerBounds), np.array(upperBounds), rng=rng)
+        drawsForGroups = dict(zip(keys, draws))
         return drawsForGroups, namesForGroups
 
+    @staticmethod
+    def draw_from_truncated_normals(drawSizes, means, choleskyFactors, lowerBounds, upperBounds, oversampling=1.1, rng=None):
+        """Returns a list with drawSizes[i] draws from the multivariate normal with mean means[i] and covariance
+        choleskyFactors[i] @ choleskyFactors[i].T, with every continuous variable within lowerBounds[i] and upperBounds[i], for every group i.
+        The standard normals of all groups are drawn in one block from rng, or from the numpy global random state if rng is None
+        (a seed set with np.random.seed then gives the same draws), and transformed with the Cholesky factor of each group.
+        Draws outside of the bounds are rejected, and every group draws as many more as its acceptance rate so far says it needs,
+        so that few groups need to draw again.
+        Note: the order of the draws is not the order of the one group at a time draws of earlier versions, so a population
+        drawn with a given np.random.seed is not the same as the population drawn with that seed before this change.
+        The factors are stacked and gathered for every draw, so the transform is one einsum over a block of draws,
+        blocks bound the memory of the gathered factors (blockSize x nVariables x nVariables)."""
+        nGroups = len(drawSizes)
+        nVariables = lowerBounds.shape[1] if nGroups>0 else 0
+        meansForGroups = np.array(means, dtype=float).reshape((nGroups, nVariables))
+        factorsForGroups = np.array(choleskyFactors, dtype=float).reshape((nGroups, nVariables, nVariables))
+        blockSize = 2**14
+        rng = np.random if rng is None else rng
+        remaining = drawSizes.copy()
+        acceptance = np.ones(nGroups)
+        accepted = [[] for i in range(nGroups)]
+        while remaining.sum()>0:
+            nDraws = np.where(remaining>0, np.ceil(remaining/acceptance*oversampling).astype(int), 0)
+            groups = np.repeat(np.arange(nGroups), nDraws)
+            draws = rng.standard_normal((nDraws.sum(), nVariables))
+            for start in range(0, draws.shape[0], blockSize):
+                block = slice(start, start+blockSize)
+                draws[block] = meansForGroups[groups[block]] + np.einsum("nij,nj->ni", factorsForGroups[groups[block]], draws[block])
+            inBounds = np.flatnonzero(((draws>=lowerBounds[groups]) & (draws<=upperBounds[groups])).all(axis=1))
+            #keep the first draws in bounds of each group, up to the number of draws it still needs
+            inBoundsGroups = groups[inBounds]
+            nInBounds = np.bincount(inBoundsGroups, minlength=nGroups)
+            rank = np.arange(inBounds.shape[0]) - np.searchsorted(inBoundsGroups, inBoundsGroups)
+            keep = inBounds[rank<remaining[inBoundsGroups]]
+            nKeep = np.minimum(nInBounds, remaining)
+            for i, groupDraws in zip(np.flatnonzero(nKeep), np.split(draws[keep], np.cumsum(nKeep[nKeep>0])[:-1])):
+                accepted[i].append(groupDraws)
+            drawn = nDraws>0
+            acceptance[drawn] = np.maximum(nInBounds[drawn]/nDraws[drawn], 0.01)
+            remaining = remaining - nKeep
+        return [np.concatenate(groupDraws) if len(groupDraws)>0 else np.empty((0, nVariables)) for groupDraws in accepted]
+
     @staticmethod
     def get_df_from_draws(drawsForGroups, namesForGroups, popType=PopulationType.NHANES.value):
-        """Converts the draws from the distributions to a Pandas df."""
+        """Converts the draws from the distributions to a Pandas df.
+           The columns are filled in one pass: the draws of all groups are stacked once, the categorical columns repeat
+           the key of every group as many times as the group has draws and the names are concatenated once.
+           As before, the categorical columns hold the values of the keys (object columns) and the index restarts at 0 for every group."""
         catVariables = PopulationFactory.variable_types(VariableType.CATEGORICAL.value, popType=popType)
         conVariables = PopulationFactory.variable_types(VariableType.CONTINUOUS.value, popType=popType)
-        df = pd.DataFrame(data=None, columns= ["name"]+catVariables+conVariables)
-        for key in drawsForGroups.keys():
-            #names = dfForGroups[key]["name"].tolist()
-            names = namesForGroups[key]
-            size = drawsForGroups[key].shape[0]
-            dfCont = pd.DataFrame(drawsForGroups[key])
-            dfCont.columns = conVariables
-            dfCat = pd.concat([pd.DataFrame(key).T]*size, ignore_index=True)
-            dfCat.columns = catVariables
-            dfForGroup = pd.concat( [pd.Series(names), dfCat, dfCont], axis=1).rename(columns={0:"name"})
-            df = pd.concat([df,dfForGroup]) if not df.empty else dfForGroup
+        keys = list(drawsForGroups.keys())
+        sizes = np.array([drawsForGroups[key].shape[0] for key in keys], dtype=int)
+        keyValues = np.empty((len(keys), len(catVariables)), dtype=object)
+        for i, key in enumerate(keys):
+            keyValues[i, :] = key
+        catValues = np.repeat(keyValues, sizes, axis=0)
+        conValues = (np.concatenate([drawsForGroups[key].reshape((-1, len(conVariables))) for key in keys]) if len(keys)>0 
+                     else np.empty((0, len(conVariables))))
+        names = np.empty(sizes.sum(), dtype=object)
+        names[:] = list(chain.from_iterable(namesForGroups[key] for key in keys))
+        data = {"name": names}
+        data.update({variable: catValues[:, i] for i, variable in enumerate(catVariables)})
+        data.update({variable: conValues[:, i] for i, variable in enumerate(conVariables)})
+        index = np.arange(sizes.sum()) - np.repeat(np.cumsum(sizes)-sizes, sizes)
+        df = pd.DataFrame(data, index=index)
         df[DynamicRiskFactorsType.AGE.value] = round(df[DynamicRiskFactorsType.AGE.value]).astype('int')
         return df
 
@@ -569,74 +636,65 @@ class PopulationFactory:
         return people
 
     @staticmethod
-    def bring_people_to_target_n(n, people, df, personFilters, popType=PopulationType.NHANES.value):
+    def bring_people_to_target_n(n, people, df, personFilters, popType=PopulationType.NHANES.value, streams=None, rng=None):
         nRemaining = n - people.shape[0]
         while nRemaining>0:
-            dfForPeople = df.sample(nRemaining, replace=True)
-            peopleRemaining = pd.DataFrame.apply(dfForPeople, PersonFactory.get_person, popType=popType, axis="columns")
+            dfForPeople = df.sample(nRemaining, replace=True, random_state=rng)
+            peopleRemaining = PersonFactory.get_people(dfForPeople, popType=popType, streams=streams)
             peopleRemaining = PopulationFactory.apply_person_filters_on_people(personFilters, peopleRemaining)
             people = pd.concat([people, peopleRemaining])
             nRemaining = n - people.shape[0]
         return people
 
     @staticmethod
-    def get_kaiser_people(n=1000, personFilters=None, wmhSpecific=None):
+    def get_kaiser_people(n=1000, personFilters=None, wmhSpecific=None, fullPopulation=False, seed=None):
         '''The wmhSpecific variable is not needed in the function but it is passed on to the function from the trial.py
         because the NHANES get_nhanes_people function needs to get arguments from the trial.py.
-        Creating Kaiser people is a time consuming process, in part due to the time needed to get the distributions.
-        That is why we do that step only once and create a pandas dataframe only once.
+        By default only the n people needed are drawn: n is allocated to the groups in proportion to their size (multinomial)
+        and only that many people are drawn from the distribution of each group. If filters reject some people,
+        more people are drawn in the same way, as many as needed given the share of people the filters kept, until there are n people.
+        A RuntimeError is raised if the filters reject all people of the first round or if there are still not n people after kaiserMaxRounds rounds.
+        With fullPopulation=True, the entire Kaiser population (about 315,000 people) is drawn from the distributions and people
+        are sampled from it with replacement, this is a time consuming process.
         Since we need to plan for the possibility of using filters, and sometimes filters can be fairly restrictive,
         we need to use sampling with replacement from the dataframe. 
         It is unclear what memory needs we would have in order to create always a much larger sample than the one we need in
-        simulations in order to avoid sampling with replacement.'''
+        simulations in order to avoid sampling with replacement.
+        seed: as in get_nhanes_people.'''
         distributions = PopulationFactory.get_kaiser_distributions()
-        drawsForGroups, namesForGroups = PopulationFactory.draw_from_distributions(distributions)
-        df = PopulationFactory.get_df_from_draws(drawsForGroups, namesForGroups, popType=PopulationType.KAISER.value)
-        df = PopulationFactory.apply_person_filters_on_df(personFilters, df)
-        dfForPeople = df.sample(n, weights=None, replace=True)
-        people = pd.DataFrame.apply(dfForPeople, PersonFactory.get_kaiser_person, axis="columns")
-        people = PopulationFactory.apply_person_filters_on_people(personFilters, people)
-        people = PopulationFactory.bring_people_to_target_n(n, people, df, personFilters, popType=PopulationType.KAISER.value)   
+        streams = None if seed is None else RandomStreams.get_initialization_streams(seed)
+        rng = None if seed is None else RandomStreams.get_sampling_rng(seed)
+        if fullPopulation:
+            drawsForGroups, namesForGroups = PopulationFactory.draw_from_distributions(distributions, rng=rng)
+            df = PopulationFactory.get_df_from_draws(drawsForGroups, namesForGroups, popType=PopulationType.KAISER.value)
+            df = PopulationFactory.apply_person_filters_on_df(personFilters, df)
+            dfForPeople = df.sample(n, weights=None, replace=True, random_state=rng)
+            people = PersonFactory.get_kaiser_people(dfForPeople, streams=streams)
+            people = PopulationFactory.apply_person_filters_on_people(personFilters, people)
+            people = PopulationFactory.bring_people_to_target_n(n, people, df, personFilters, popType=PopulationType.KAISER.value, streams=streams, rng=rng)
+        else:
+            people = pd.Series(dtype=object)
+            rounds = 0
+            nDrawn = 0
+            while people.shape[0]<n:
+                if rounds==PopulationFactory.kaiserMaxRounds:
+                    raise RuntimeError(f"Only {people.shape[0]} of the {n} Kaiser people passed the person filters after {rounds} rounds of draws.")
+                rounds += 1
+                nRemaining = n - people.shape[0]
+                #after the first round, enough people are drawn for the remaining ones given the share of people the filters kept so far
+                nDraw = nRemaining if nDrawn==0 else int(np.ceil(1.2 * nRemaining * nDrawn / people.shape[0]))
+                nDrawn += nDraw
+                sizes = PopulationFactory.get_sample_sizes(distributions, nDraw, rng=rng)
+                drawsForGroups, namesForGroups = PopulationFactory.draw_from_distributions(distributions, sizes=sizes, rng=rng)
+                df = PopulationFactory.get_df_from_draws(drawsForGroups, namesForGroups, popType=PopulationType.KAISER.value)
+                #the draws are ordered by group, people in a population are not
+                df = df.sample(frac=1, random_state=rng)
+                df = PopulationFactory.apply_person_filters_on_df(personFilters, df)
+                peopleRemaining = PersonFactory.get_kaiser_people(df, streams=streams)
+                peopleRemaining = PopulationFactory.apply_person_filters_on_people(personFilters, peopleRemaining)
+                if people.shape[0] + peopleRemaining.shape[0]==0:
+                    raise RuntimeError(f"The person filters rejected all {nDraw} Kaiser people drawn in the first round, the filters may exclude everyone.")
+                #the people are in random order, so the ones not needed can be dropped from the end
+                people = pd.concat([people, peopleRemaining.iloc[:nRemaining]])
         PopulationFactory.set_index_in_people(people)
         return people
-
-
-
-
-
-
-
-
-
-
-
-            
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-                       
-
-
-
-
-
-
-
-
-
-
-
-
@@ -2,6 +2,7 @@ import numpy as np
 from microsim.smoking_status import SmokingStatus
 from microsim.race_ethnicity import RaceEthnicity
 from microsim.gender import NHANESGender
+from microsim.population_evaluation import PopulationEvaluation
 
 # based on the publication: https://doi.org/10.1097%2FMD.0000000000003454
 # the models, both prevalence and incidence, produce results quantitatively different from, but qualitatively similar to, the GBD data
@@ -67,6 +68,12 @@ class PVDPrevalenceModel:
 
         return person._rng.uniform()<risk if boolean else risk
 
+    def estimate_next_risk_for_population(self, columns, draws):
+        """Population version of estimate_next_risk, draws are the uniform draws of the people in columns."""
+        lp = PopulationEvaluation.apply_by_categories(self.calc_linear_predictor_for_patient_characteristics, columns,
+                                                      ["gender", "smokingStatus", "raceEthnicity"])
+        return draws<PopulationEvaluation.inverse_logit(lp)
+
 # developed using the PVD prevalence model above, see pvdModelDevelopment notebooks for details
 class PVDIncidenceModel:
     def  __init__(self):
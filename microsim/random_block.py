@@ -0,0 +1,75 @@
+import numpy as np
+
+class RandomBlock:
+    """A Person-instance rng that draws the random numbers of a wave in blocks instead of one scalar at a time.
+       At the start of every wave (see Person.start_wave_random_numbers) a block of standard uniforms and a block of standard normals
+       are drawn with one call each, the models then consume them by index through the same methods they use on a np.random.Generator,
+       eg person._rng.uniform(size=1) or rng.normal(0.38, 6.99). A scalar call on a np.random.Generator costs a few microseconds,
+       taking the next number from a block is several times cheaper, and a person-wave needs dozens of draws.
+       uniform and normal use the same transformations as np.random.Generator (low+(high-low)*u and loc+scale*z), so the draws
+       follow exactly the same distributions. If a wave needs more numbers than a block holds, another block is drawn.
+       Every number is used only once, so the draws of different models remain independent, and since the blocks are drawn
+       from the bit generator in a fixed order the draws are reproducible for a given seed.
+       Methods that are not implemented here, eg integers or choice, are taken from the underlying np.random.Generator.
+       nUniform, nNormal: the size of the uniform and normal blocks."""
+
+    __slots__ = ("_generator", "_nUniform", "_nNormal", "_uniforms", "_normals", "_uniformIndex", "_normalIndex")
+
+    def __init__(self, bitGenerator, nUniform=32, nNormal=32):
+        self._generator = np.random.Generator(bitGenerator)
+        self._nUniform = nUniform
+        self._nNormal = nNormal
+        self.start_wave()
+
+    def draw(self, method, *args, **kwargs):
+        """Calls method on the generator the blocks are drawn from."""
+        return getattr(self._generator, method)(*args, **kwargs)
+
+    def start_wave(self, wave=None):
+        """Draws the blocks for a new wave, numbers left over from the previous wave are discarded."""
+        self._uniforms = self.draw("random", self._nUniform)
+        self._normals = self.draw("standard_normal", self._nNormal)
+        self._uniformIndex = 0
+        self._normalIndex = 0
+
+    def take_uniforms(self, n):
+        if self._uniformIndex + n > self._uniforms.shape[0]:
+            self._uniforms = np.concatenate([self._uniforms[self._uniformIndex:], self.draw("random", max(n, self._nUniform))])
+            self._uniformIndex = 0
+        uniforms = self._uniforms[self._uniformIndex:self._uniformIndex+n]
+        self._uniformIndex += n
+        return uniforms
+
+    def take_normals(self, n):
+        if self._normalIndex + n > self._normals.shape[0]:
+            self._normals = np.concatenate([self._normals[self._normalIndex:], self.draw("standard_normal", max(n, self._nNormal))])
+            self._normalIndex = 0
+        normals = self._normals[self._normalIndex:self._normalIndex+n]
+        self._normalIndex += n
+        return normals
+
+    @staticmethod
+    def get_count(size):
+        return size if isinstance(size, int) else int(np.prod(size))
+
+    def random(self, size=None):
+        return self.uniform(size=size)
+
+    def uniform(self, low=0.0, high=1.0, size=None):
+        if size is None:
+            return low + (high - low) * self.take_uniforms(1)[0]
+        return low + (high - low) * self.take_uniforms(RandomBlock.get_count(size)).reshape(size)
+
+    def standard_normal(self, size=None):
+        return self.normal(size=size)
+
+    def normal(self, loc=0.0, scale=1.0, size=None):
+        if size is None:
+            return loc + scale * self.take_normals(1)[0]
+        return loc + scale * self.take_normals(RandomBlock.get_count(size)).reshape(size)
+
+    def __getattr__(self, name):
+        #only called for attributes that are not found on the instance, eg integers
+        if name.startswith("__") or name.startswith("_"):
+            raise AttributeError(name)
+        return lambda *args, **kwargs: self.draw(name, *args, **kwargs)
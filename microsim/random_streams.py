@@ -0,0 +1,176 @@
+import os
+
+import numpy as np
+
+from microsim.random_block import RandomBlock
+
+class RandomStreams:
+    """Counter-based random streams for a set of Person-instances, built on a single shared Philox generator.
+       A stream is identified by a small integer key, eg the person index, and every draw of a stream is addressed by
+       (key, wave, phase, position): the Philox key holds the root key (derived from the seed with np.random.SeedSequence)
+       and the stream key, the Philox counter holds the position, phase and wave. Positioning the shared generator at any
+       address is a state assignment, so people do not need to carry their own np.random.Generator.
+       The draws of a wave depend only on the seed, the stream key and the wave, not on the draws made in earlier waves.
+       phase: 0 for the draws made during a wave, 1 for the draws made outside of a wave, eg during the initialization of a person,
+              2+substream for the draws of a substream.
+       substreams: if True, every model of a wave draws from its own substream of the person stream (see Person.start_random_substream),
+                   so the draws of a model for a person and wave do not depend on how many numbers the models before it used.
+                   This is what makes common random numbers across trial arms possible: two copies of a person with the same stream key
+                   get exactly the same draws from every model, even when a treatment changes the events of one of them.
+       Streams without a seed, eg the default streams of the Person-instances that are not seeded, take the key of every new stream
+       from OS entropy, so every unseeded person gets a stream of its own, as with a np.random.default_rng() for every person, also
+       in worker processes that were forked after the streams were created. Streams with a seed hand out keys from a counter instead,
+       so the people they are given to are reproducible.
+       The shared generator is positioned once for every block of draws (see RandomStreamBlock), so a RandomStreams-instance
+       must not be used from several threads at the same time, worker processes have their own copy.
+       _nextKey: the next key handed out by next_key, for people that are not given a key explicitly, if the streams have a seed.
+       _entropyKeys: True if the streams do not have a seed, new keys are then taken from OS entropy."""
+
+    _default = None
+    #substream offsets of the model groups of a wave, the model index is added to them
+    riskFactorSubstreams = 0
+    treatmentSubstreams = 100
+    treatmentStrategySubstreams = 200
+    outcomeSubstreams = 300
+    #substreams need fewer numbers than a whole wave
+    substreamBlockSize = 4
+    #the first key of the initialization streams, see get_initialization_streams
+    initializationKeys = 2**62
+
+    def __init__(self, seed=None, substreams=False):
+        self._rootKey = int(np.random.SeedSequence(seed).generate_state(1, dtype=np.uint64)[0])
+        self._bitGenerator = np.random.Philox()
+        self._generator = np.random.Generator(self._bitGenerator)
+        self._nextKey = 0
+        self._entropyKeys = seed is None
+        self.substreams = substreams
+
+    @staticmethod
+    def get_default():
+        """Returns the process-wide streams, without a seed, used for Person-instances that are not seeded."""
+        if RandomStreams._default is None:
+            RandomStreams._default = RandomStreams()
+        return RandomStreams._default
+
+    @staticmethod
+    def get_initialization_streams(seed):
+        """Returns the streams of seed for the initialization draws of seeded people, eg PersonFactory.get_people with streams.
+           Their keys start at initializationKeys, so they never overlap with the streams keyed by the person index that
+           the same people get for the simulation (see Population.seed_people)."""
+        streams = RandomStreams(seed)
+        streams._nextKey = RandomStreams.initializationKeys
+        return streams
+
+    @staticmethod
+    def get_sampling_rng(seed):
+        """Returns the np.random.Generator of seed for the sampling of the people of a seeded population, eg the sample sizes,
+           the draws from the distributions and the rows sampled from the data (see PopulationFactory).
+           It is spawned from the np.random.SeedSequence of seed, so it is independent of the streams of the same seed."""
+        return np.random.default_rng(np.random.SeedSequence(seed).spawn(1)[0])
+
+    def next_key(self):
+        if self._entropyKeys:
+            return int.from_bytes(os.urandom(8), "little")
+        key = self._nextKey
+        self._nextKey += 1
+        return key
+
+    def draw(self, streamKey, wave, phase, position, method, *args, **kwargs):
+        """Positions the shared generator at (streamKey, wave, phase, position), calls method on it and returns the
+           result and the position of the next draw of the stream."""
+        self._bitGenerator.state = {"bit_generator": "Philox",
+                                    "state": {"counter": np.array([position, 0, phase, wave], dtype=np.uint64),
+                                              "key": np.array([self._rootKey, streamKey], dtype=np.uint64)},
+                                    "buffer": np.zeros(4, dtype=np.uint64),
+                                    "buffer_pos": 4,
+                                    "has_uint32": 0,
+                                    "uinteger": 0}
+        values = getattr(self._generator, method)(*args, **kwargs)
+        return values, int(self._bitGenerator.state["state"]["counter"][0])
+
+    def get_rng(self, streamKey=None):
+        """Returns the rng of a Person-instance for the stream streamKey, or for a new stream if streamKey is None."""
+        return RandomStreamBlock(self, self.next_key() if streamKey is None else streamKey)
+
+    def __getstate__(self):
+        #the Philox state is set before every draw, so only the root key and the key counter need to be pickled
+        return {"_rootKey": self._rootKey, "_nextKey": self._nextKey, "_entropyKeys": self._entropyKeys, "substreams": self.substreams}
+
+    def __setstate__(self, state):
+        self._rootKey = state["_rootKey"]
+        self._nextKey = state["_nextKey"]
+        self._entropyKeys = state["_entropyKeys"]
+        self.substreams = state["substreams"]
+        self._bitGenerator = np.random.Philox()
+        self._generator = np.random.Generator(self._bitGenerator)
+
+class RandomStreamBlock(RandomBlock):
+    """The rng of a Person-instance that uses a stream of a RandomStreams-instance. It works like a RandomBlock, but the blocks
+       of a wave are drawn from the (key, wave) position of the stream instead of from a generator owned by the person,
+       and the blocks are released at the end of the wave (see Person.release_random_numbers). Between waves the rng holds
+       only a reference to the shared streams, the stream key and the wave.
+       _streams: the shared RandomStreams-instance.
+       _streamKey: the key of the stream.
+       _wave: the wave the draws are made for.
+       _phase: 0 if the blocks were started for a wave, 1 if they were started for draws outside of a wave, 2+substream for a substream.
+       _position: the position of the next draw in the stream."""
+
+    __slots__ = ("_streams", "_streamKey", "_wave", "_phase", "_position")
+
+    def __init__(self, streams, streamKey, nUniform=32, nNormal=32):
+        self._streams = streams
+        self._streamKey = streamKey
+        self._nUniform = nUniform
+        self._nNormal = nNormal
+        self._wave = 0
+        self._phase = 1
+        self.clear_blocks()
+
+    def draw(self, method, *args, **kwargs):
+        if self._uniforms is None:
+            #draws outside of a wave, eg in the initialization of a person
+            self.start_blocks(self._wave, 1)
+        values, self._position = self._streams.draw(self._streamKey, self._wave, self._phase, self._position, method, *args, **kwargs)
+        return values
+
+    def start_wave(self, wave=None):
+        self.start_blocks(self._wave if wave is None else wave, 0)
+
+    def start_substream(self, substream):
+        """Starts the substream of the current wave, if the streams use substreams."""
+        if self._streams.substreams:
+            self.start_blocks(self._wave, 2+substream, RandomStreams.substreamBlockSize)
+
+    def start_blocks(self, wave, phase, blockSize=None):
+        self._wave = wave
+        self._phase = phase
+        self._position = 0
+        #the blocks must not be None when they are drawn, otherwise draw would start them again
+        self._uniforms = self._normals = np.zeros(0)
+        self._uniforms = self.draw("random", self._nUniform if blockSize is None else blockSize)
+        self._normals = self.draw("standard_normal", self._nNormal if blockSize is None else blockSize)
+        self._uniformIndex = 0
+        self._normalIndex = 0
+
+    def release(self):
+        """Drops the blocks at the end of a wave, draws made before the next wave starts use phase 1 of the next wave."""
+        if (self._uniforms is not None) and (self._phase!=1):
+            self._wave += 1
+        self.clear_blocks()
+
+    def clear_blocks(self):
+        self._uniforms = None
+        self._normals = None
+        self._uniformIndex = 0
+        self._normalIndex = 0
+        self._position = 0
+
+    def take_uniforms(self, n):
+        if self._uniforms is None:
+            self.start_blocks(self._wave, 1)
+        return super().take_uniforms(n)
+
+    def take_normals(self, n):
+        if self._uniforms is None:
+            self.start_blocks(self._wave, 1)
+        return super().take_normals(n)
@@ -9,8 +9,9 @@ class RegressionModel:
         residual_mean,
         residual_standard_deviation,
     ):
-        self._coefficients = coefficients
-        self._coefficient_standard_errors = coefficient_standard_errors
+        #the specs of load_model_spec are read-only and shared, every model gets its own dictionaries
+        self._coefficients = dict(coefficients)
+        self._coefficient_standard_errors = dict(coefficient_standard_errors)
         self._residual_mean = residual_mean
         self._residual_standard_deviation = residual_standard_deviation
 
@@ -1,3 +1,5 @@
+import numpy as np
+
 from microsim.statsmodel_linear_risk_factor_model import StatsModelLinearRiskFactorModel
 from microsim.stats_model_linear_probability_risk_factor_model import StatsModelLinearProbabilityRiskFactorModel
 from microsim.stats_model_rounded_linear_risk_factor_model import StatsModelRoundedLinearRiskFactorModel
@@ -47,6 +49,16 @@ class RiskModelRepository:
             varValue = varValue if varValue > lowerBound else lowerBound
         return varValue
 
+    def apply_bounds_for_population(self, varName, varValues):
+        """Same as apply_bounds but for an array of values."""
+        if varName in self._upperBounds:
+            upperBound = self._upperBounds[varName]
+            varValues = np.where(varValues < upperBound, varValues, upperBound)
+        if varName in self._lowerBounds:
+            lowerBound = self._lowerBounds[varName]
+            varValues = np.where(varValues > lowerBound, varValues, lowerBound)
+        return varValues
+
     def get_model(self, name):
         return self._repository[name]
 
@@ -0,0 +1,64 @@
+import numpy as np
+
+class RunningMean:
+    """Incremental mean of a growing history, eg person._sbp, that gives exactly the same result as np.array(history).mean().
+       NumPy sums float arrays with pairwise summation: up to 8 values are added one after the other, up to 128 values
+       are added into 8 partial sums, one for each position in a block of 8 consecutive values, the partial sums are combined
+       pairwise and the values that do not fill a last block are added to the result one after the other.
+       A RunningMean-instance keeps the 8 partial sums of the complete blocks and the values of the incomplete block, so adding a
+       value and computing the mean are O(1) and the floating point operations are the same as the ones NumPy performs.
+       Longer histories are split recursively by NumPy, for those the mean is computed with NumPy.
+       _partialSums: the 8 partial sums of the complete blocks, None until there is a complete block.
+       _block: the values of the incomplete block.
+       _n: the number of values added."""
+
+    blockSize = 8
+    maxPairwiseSize = 128
+
+    def __init__(self):
+        self._partialSums = None
+        self._block = []
+        self._n = 0
+
+    def get_count(self):
+        return self._n
+
+    def add(self, value):
+        self._block.append(float(value))
+        self._n += 1
+        if len(self._block)==RunningMean.blockSize:
+            if self._partialSums is None:
+                self._partialSums = self._block
+            else:
+                self._partialSums = list(map(lambda x, y: x + y, self._partialSums, self._block))
+            self._block = []
+
+    def get_sum(self, lastValue):
+        """Returns the sum of the values added and lastValue, that has not been added, in the NumPy summation order."""
+        block = self._block + [float(lastValue)]
+        if self._partialSums is None:
+            partialSums = block if len(block)==RunningMean.blockSize else None
+            block = [] if len(block)==RunningMean.blockSize else block
+        elif len(block)==RunningMean.blockSize:
+            partialSums = list(map(lambda x, y: x + y, self._partialSums, block))
+            block = []
+        else:
+            partialSums = self._partialSums
+        if partialSums is None:
+            result = 0.
+        else:
+            result = (((partialSums[0] + partialSums[1]) + (partialSums[2] + partialSums[3])) +
+                      ((partialSums[4] + partialSums[5]) + (partialSums[6] + partialSums[7])))
+        for value in block:
+            result += value
+        return result
+
+    def get_mean(self, history, start=0):
+        """Returns np.array(history[start:]).mean(). The values of history, except the last one, are added if they have not been added
+           already, the last value is not added because it may still be updated in place, eg by a treatment strategy."""
+        n = len(history) - start
+        if (n<=0) | (n>RunningMean.maxPairwiseSize):
+            return np.array(history[start:]).mean()
+        for value in history[start+self._n:len(history)-1]:
+            self.add(value)
+        return np.float64(self.get_sum(history[-1]) / n)
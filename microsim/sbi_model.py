@@ -3,6 +3,7 @@ import numpy as np
 from microsim.race_ethnicity import RaceEthnicity
 from microsim.gender import NHANESGender
 from microsim.smoking_status import SmokingStatus
+from microsim.population_evaluation import PopulationEvaluation
 
 class SBIModel:
     """Silent brain infarct."""
@@ -112,6 +113,12 @@ class SBIModel:
 
         return True if person._rng.uniform()<self.inverse_logit(lp) else False
 
+    def estimate_next_risk_for_population(self, columns, draws):
+        """Population version of estimate_next_risk, draws are the uniform draws of the people in columns."""
+        lp = PopulationEvaluation.apply_by_categories(self.calc_linear_predictor_for_patient_characteristics, columns,
+                                                      ["gender", "raceEthnicity", "smokingStatus", "statin", "afib", "pvd", "anyPhysicalActivity"])
+        return draws<PopulationEvaluation.inverse_logit(lp)
+
 
 
 
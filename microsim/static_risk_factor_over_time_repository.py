@@ -33,4 +33,7 @@ class DoNothingModel:
 
     def estimate_next_risk(self, person):
         return getattr(person, f"_{self.name}")[-1]
+
+    def estimate_next_risk_for_population(self, columns, rngs=None):
+        return columns[self.name]
     
@@ -13,6 +13,13 @@ class StatsModelLinearProbabilityRiskFactorModel(StatsModelLinearRiskFactorModel
         riskWithResidual = linearRisk + self.draw_from_residual_distribution(person._rng)
         return riskWithResidual > 0.5
 
+    def estimate_next_risk_for_population(self, columns, rngs=None):
+        linearRisk = super(StatsModelLinearProbabilityRiskFactorModel, self).estimate_next_risk_for_population(
+            columns
+        )
+        riskWithResidual = linearRisk + self.draw_from_residual_distribution_for_population(rngs)
+        return riskWithResidual > 0.5
+
     def estimate_next_risk_vectorized(self, x, rng=None):
         #rng = np.random.default_rng(rng)
         linearRisk = super(
@@ -12,6 +12,13 @@ class StatsModelRoundedLinearRiskFactorModel(StatsModelLinearRiskFactorModel):
         riskWithResidual = round(linearRisk + self.draw_from_residual_distribution(person._rng))
         return riskWithResidual if riskWithResidual > 0 else 0
 
+    def estimate_next_risk_for_population(self, columns, rngs=None):
+        linearRisk = super(StatsModelRoundedLinearRiskFactorModel, self).estimate_next_risk_for_population(
+            columns
+        )
+        riskWithResidual = np.round(linearRisk + self.draw_from_residual_distribution_for_population(rngs))
+        return np.where(riskWithResidual > 0, riskWithResidual, 0)
+
     def estimate_next_risk_vectorized(self, x, rng=None):
         #rng = np.random.default_rng(rng)
         linearRisk = super(
@@ -1,6 +1,8 @@
 from functools import reduce
+from types import MappingProxyType
+from typing import Mapping, NamedTuple, Tuple
 import numpy as np
-from microsim.model_argument_transform import get_all_argument_transforms
+from microsim.model_argument_transform import CompiledArgument, compile_argument
 
 # TODO: this class needs to be renamed. its no longer interfacing with statsmodel
 # conceptually, what it does now is bridge the regression model and the person
@@ -8,6 +10,31 @@ from microsim.model_argument_transform import get_all_argument_transforms
 INTERACTION_INDICATOR = "#"
 
 
+class CoefficientPlan(NamedTuple):
+    """Immutable, precompiled form of the non intercept parameters of a model.
+       names: the parameter names, in the order of the model parameters.
+       arguments: the distinct model arguments the parameters need, each one compiled once.
+       argumentsByName: the same arguments, looked up by name.
+       interactions: for every parameter, the indices in arguments of the terms that are multiplied together
+                     (a single index for parameters without interactions).
+       coefficients: read-only array with the coefficient of every parameter."""
+
+    names: Tuple[str, ...]
+    arguments: Tuple[CompiledArgument, ...]
+    argumentsByName: Mapping[str, CompiledArgument]
+    interactions: Tuple[Tuple[int, ...], ...]
+    coefficients: np.ndarray
+
+    def __reduce__(self):
+        #mapping proxies cannot be pickled, eg when models are sent to multiprocessing workers, so pickle the plain fields
+        return (CoefficientPlan.from_fields, (self.names, self.arguments, self.interactions, np.array(self.coefficients)))
+
+    @staticmethod
+    def from_fields(names, arguments, interactions, coefficients):
+        coefficients.setflags(write=False)
+        return CoefficientPlan(names, arguments, MappingProxyType({x.name: x for x in arguments}), interactions, coefficients)
+
+
 class StatsModelLinearRiskFactorModel:
     def __init__(self, regression_model, log_transform=False):
         self.standard_errors = regression_model._coefficient_standard_errors
@@ -20,10 +47,21 @@ class StatsModelLinearRiskFactorModel:
 
         self.parameters = {**(regression_model._coefficients)}
         self.non_intercept_params = {k: v for k, v in self.parameters.items() if k != "Intercept"}
-        self.argument_transforms = get_all_argument_transforms(self.get_keys_for_transforms())
-        self.argument_transforms_vectorized = get_all_argument_transforms(
-            self.get_keys_for_transforms(), True
-        )
+        self.coefficient_plan = self.compile_coefficient_plan()
+        self.non_intercept_coefficients = self.coefficient_plan.coefficients
+
+    def compile_coefficient_plan(self):
+        argumentIndices = dict()
+        interactions = []
+        for coeff_name in self.non_intercept_params.keys():
+            terms = self.get_interactions(coeff_name) if self.contains_interaction(coeff_name) else [coeff_name]
+            for term in terms:
+                if term not in argumentIndices:
+                    argumentIndices[term] = len(argumentIndices)
+            interactions.append(tuple(argumentIndices[term] for term in terms))
+        arguments = tuple(compile_argument(term) for term in argumentIndices.keys())
+        coefficients = np.array(list(self.non_intercept_params.values()), dtype=float)
+        return CoefficientPlan.from_fields(tuple(self.non_intercept_params.keys()), arguments, tuple(interactions), coefficients)
 
     # method to be overriden by models that want to, in addition to the risks estimated by
     # the regression coefficients loaded from a model, also be able to apply some manual parameters.
@@ -50,21 +88,16 @@ class StatsModelLinearRiskFactorModel:
             loc=self.residual_mean, scale=self.residual_standard_deviation, size=1
         )[0]
 
+    def draw_from_residual_distribution_for_population(self, rngs):
+        """Draws one residual per person, each one from the random number generator of that person,
+        so that every person gets the same residual as with draw_from_residual_distribution."""
+        return np.array([self.draw_from_residual_distribution(rng) for rng in rngs])
+
     def get_intercept(self):
         return self.parameters["Intercept"]
 
     def get_model_argument_for_coeff_name(self, coeff_name, person):
-        if coeff_name not in self.argument_transforms:
-            model_argument = getattr(person, f"_{coeff_name}")
-        else:
-            prop_name, transforms = self.argument_transforms[coeff_name]
-            prop_value = getattr(person, f"_{prop_name}")
-            if isinstance(prop_value, list) or isinstance(prop_value, np.ndarray):
-                prop_value = prop_value[-1]
-            model_argument = reduce(lambda v, t: t.apply(v), transforms, prop_value)
-        if isinstance(model_argument, list) or isinstance(model_argument, np.ndarray):
-            model_argument = model_argument[-1]
-        return model_argument
+        return self.coefficient_plan.argumentsByName[coeff_name].get_value(person)
 
     def contains_interaction(self, coeff_name):
         return INTERACTION_INDICATOR in coeff_name
@@ -84,16 +117,9 @@ class StatsModelLinearRiskFactorModel:
         # TODO: think about what to do with teh hard-coded strings for parameters and prefixes
         linearPredictor = self.get_intercept()
 
-        for coeff_name, coeff_val in self.non_intercept_params.items():
-            if self.contains_interaction(coeff_name):
-                interactions = []
-                for interact in self.get_interactions(coeff_name):
-                    interactions.append(self.get_model_argument_for_coeff_name(interact, person))
-                model_argument = reduce(lambda x, y: x * y, interactions, 1)
-            else:
-                model_argument = self.get_model_argument_for_coeff_name(coeff_name, person)
-
-            linearPredictor += coeff_val * model_argument
+        arguments = [x.get_value(person) for x in self.coefficient_plan.arguments]
+        for coeff_val, terms in zip(self.non_intercept_params.values(), self.coefficient_plan.interactions):
+            linearPredictor += coeff_val * self.get_model_argument_for_terms(terms, arguments)
 
         for coeff_name, manual_tuple in self.get_manual_parameters().items():
             # the tuple gives one item as the regression coefficent and the second item as a method
@@ -110,18 +136,9 @@ class StatsModelLinearRiskFactorModel:
         # TODO: think about what to do with teh hard-coded strings for parameters and prefixes
         linearPredictor = self.get_intercept()
 
-        for coeff_name, coeff_val in self.non_intercept_params.items():
-            if self.contains_interaction(coeff_name):
-                interactions = []
-                for interact in self.get_interactions(coeff_name):
-                    interactions.append(
-                        self.get_model_argument_for_coeff_name_vectorized(interact, x)
-                    )
-                model_argument = reduce(lambda x, y: x * y, interactions, 1)
-            else:
-                model_argument = self.get_model_argument_for_coeff_name_vectorized(coeff_name, x)
-
-            linearPredictor += coeff_val * model_argument
+        arguments = [a.get_value_vectorized(x) for a in self.coefficient_plan.arguments]
+        for coeff_val, terms in zip(self.non_intercept_params.values(), self.coefficient_plan.interactions):
+            linearPredictor += coeff_val * self.get_model_argument_for_terms(terms, arguments)
 
         for coeff_name, manual_tuple in self.get_manual_parameters(True).items():
             # the tuple gives one item as the regression coefficent and the second item as a method
@@ -134,11 +151,38 @@ class StatsModelLinearRiskFactorModel:
         return linearPredictor+self.draw_from_residual_distribution(rng=rng) if withResidual else linearPredictor
 
     def get_model_argument_for_coeff_name_vectorized(self, coeff_name, x):
-        if coeff_name not in self.argument_transforms_vectorized:
-            model_argument = x[coeff_name]
-        else:
-            prop_name, transforms = self.argument_transforms_vectorized[coeff_name]
-            for transform in list(transforms):
-                transform.prop_name = prop_name
-            model_argument = reduce(lambda v, t: t.apply(v), transforms, x)
-        return model_argument
+        return self.coefficient_plan.argumentsByName[coeff_name].get_value_vectorized(x)
+
+    def get_model_argument_for_coeff_name_for_population(self, coeff_name, columns):
+        return self.coefficient_plan.argumentsByName[coeff_name].get_column(columns)
+
+    @staticmethod
+    def get_model_argument_for_terms(terms, arguments):
+        """Returns the model argument of a parameter from the values of its (compiled) terms."""
+        if len(terms) == 1:
+            return arguments[terms[0]]
+        return reduce(lambda x, y: x * y, [arguments[i] for i in terms], 1)
+
+    def get_design_matrix(self, columns):
+        """Returns the design matrix of the model for a population: one row per person and one column per
+        non intercept parameter, in the order of self.non_intercept_params.
+        columns: a dictionary, or any mapping, of person attribute names (without the leading underscore) to arrays
+        with the current value of that attribute for every person, eg columns["sbp"][i] is person._sbp[-1] of person i.
+        Categorical ([T.x]) indicators and interaction (#) terms are built as column operations."""
+        arguments = [x.get_column(columns) for x in self.coefficient_plan.arguments]
+        return np.column_stack([self.get_model_argument_for_terms(terms, arguments) for terms in self.coefficient_plan.interactions])
+
+    def estimate_linear_predictor_for_population(self, columns):
+        """Returns the linear predictor of every person in columns with a single matrix-vector product."""
+        if len(self.get_manual_parameters()) > 0:
+            raise RuntimeError(f"{type(self).__name__} has manual parameters and cannot be evaluated for a population.")
+        return self.get_intercept() + self.get_design_matrix(columns) @ self.non_intercept_coefficients
+
+    def estimate_next_risk_for_population(self, columns, rngs=None, withResidual=False):
+        """Population version of estimate_next_risk, rngs are the random number generators of the people in columns."""
+        linearPredictor = self.estimate_linear_predictor_for_population(columns)
+
+        if self.log_transform:
+            linearPredictor = np.exp(linearPredictor)
+
+        return linearPredictor+self.draw_from_residual_distribution_for_population(rngs) if withResidual else linearPredictor
@@ -20,7 +20,15 @@ class StatsModelLogisticRiskFactorModel(StatsModelLinearRiskFactorModel):
             risk = 1/(1+np.exp(-linearRisk))
         return risk
 
+    def logit_for_population(self, linearRisk):
+        with np.errstate(over="ignore"):
+            risk = 1/(1+np.exp(-linearRisk))
+        return np.where(linearRisk<-10, 0., np.where(linearRisk>10., 1., risk))
+
     # apply inverse logit to the linear predictor
     def estimate_next_risk(self, person):
         return self.logit(self.estimate_linear_predictor(person))
 
+    def estimate_next_risk_for_population(self, columns, rngs=None):
+        return self.logit_for_population(self.estimate_linear_predictor_for_population(columns))
+
@@ -1,11 +1,13 @@
 from microsim.statsmodel_linear_risk_factor_model import StatsModelLinearRiskFactorModel
 from microsim.regression_model import RegressionModel
 from microsim.data_loader import load_model_spec
+from microsim.model_registry import ModelRegistry
 from microsim.outcome import OutcomeType, Outcome
 from microsim.outcome_details.stroke_details import StrokeSubtypeModelRepository, StrokeNihssModel, StrokeTypeModel
 from microsim.stroke_outcome import StrokeOutcome, StrokeSubtype, StrokeType, Localization
 from microsim.treatment import TreatmentStrategiesType
 
+import numpy as np
 import scipy.special as scipySpecial
 
 # there are 2 approaches that can be taken with partition models
@@ -22,7 +24,7 @@ class StrokePartitionModel(StatsModelLinearRiskFactorModel):
         model_spec = load_model_spec("StrokeMIPartitionModel")
         #the assumption for the subclasses of this class is that the intercept with 0 bpMedsAdded is -2.3109730587083006
         if intercept is not None:
-            model_spec["coefficients"]["Intercept"] = intercept
+            model_spec = {**model_spec, "coefficients": {**model_spec["coefficients"], "Intercept": intercept}}
         super().__init__(RegressionModel(**model_spec))
         self._stroke_case_fatality = 0.15
         self._stroke_secondary_case_fatality = 0.15
@@ -56,11 +58,15 @@ class StrokePartitionModel(StatsModelLinearRiskFactorModel):
         strokeProbability = scipySpecial.expit( super().estimate_next_risk(person) + self.get_intercept_change(person) )
         return strokeProbability
     
+    def get_next_stroke_probability_for_population(self, people, columns):
+        interceptChange = np.array(list(map(lambda x: self.get_intercept_change(x), people)), dtype=float)
+        return scipySpecial.expit( self.estimate_linear_predictor_for_population(columns) + interceptChange )
+
     def generate_next_outcome(self, person):
         fatal = self.will_have_fatal_stroke(person)
-        nihss = StrokeNihssModel().estimate_next_risk(person)
-        strokeSubtype = StrokeSubtypeModelRepository().get_stroke_subtype(person)
-        strokeType = StrokeTypeModel().get_stroke_type(person)
+        nihss = ModelRegistry.get_model(StrokeNihssModel).estimate_next_risk(person)
+        strokeSubtype = ModelRegistry.get_model(StrokeSubtypeModelRepository).get_stroke_subtype(person)
+        strokeType = ModelRegistry.get_model(StrokeTypeModel).get_stroke_type(person)
         #localization = Localization.LEFT_HEMISPHERE
         #disability = 3 
         #return StrokeOutcome(fatal, nihss, strokeType, strokeSubtype, localization, disability)
@@ -79,6 +85,22 @@ class StrokePartitionModel(StatsModelLinearRiskFactorModel):
             else: 
                 return None
 
+    def get_next_outcomes_for_population(self, people, columns):
+        """Population version of get_next_outcome: the stroke probability is obtained for all people with a CV outcome
+           in the current wave at once, the stroke phenotypes are then generated for the people that had a stroke."""
+        outcomes = [None] * len(people)
+        positions = np.flatnonzero(np.array(list(map(lambda x: x.has_outcome_at_current_age(OutcomeType.CARDIOVASCULAR), people)), dtype=bool))
+        if len(positions)>0:
+            cvPeople = people[positions]
+            strokeProbabilities = self.get_next_stroke_probability_for_population(cvPeople, columns.get_subset(positions))
+            draws = np.array(list(map(lambda x: x._rng.uniform(size=1)[0], cvPeople)))
+            for position, person, hasStroke in zip(positions, cvPeople, draws < strokeProbabilities):
+                if hasStroke:
+                    strokeOutcome = self.generate_next_outcome(person)
+                    self.update_cv_outcome(person, strokeOutcome.fatal)
+                    outcomes[position] = strokeOutcome
+        return outcomes
+
 
 
 
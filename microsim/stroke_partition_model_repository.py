@@ -21,6 +21,9 @@ class StrokePartitionModelRepository:
     def select_outcome_model_for_person(self, person):
         return self._model
 
+    def get_next_outcomes_for_population(self, people, columns):
+        return self._model.get_next_outcomes_for_population(people, columns)
+
     #def select_outcome_model_for_person(self, person):
     #    tst = TreatmentStrategiesType.BP.value
     #    if "bpMedsAdded" in person._treatmentStrategies[tst]:
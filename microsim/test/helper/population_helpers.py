@@ -0,0 +1,56 @@
+import copy
+
+import numpy as np
+import pandas as pd
+
+from microsim.alcohol_category import AlcoholCategory
+from microsim.cohort_risk_model_repository import (CohortDynamicRiskFactorModelRepository,
+                                                   CohortStaticRiskFactorModelRepository,
+                                                   CohortDefaultTreatmentModelRepository)
+from microsim.education import Education
+from microsim.outcome_model_repository import OutcomeModelRepository
+from microsim.person_factory import PersonFactory
+from microsim.population import Population
+from microsim.population_model_repository import PopulationModelRepository
+from microsim.risk_factor import DynamicRiskFactorsType, StaticRiskFactorsType
+from microsim.smoking_status import SmokingStatus
+from microsim.treatment import DefaultTreatmentsType
+
+def get_test_people(n, seed=1234):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({DynamicRiskFactorsType.AGE.value: rng.integers(45, 85, n).astype(float),
+                       StaticRiskFactorsType.GENDER.value: rng.integers(1, 3, n),
+                       StaticRiskFactorsType.RACE_ETHNICITY.value: rng.integers(1, 6, n),
+                       DynamicRiskFactorsType.SBP.value: rng.normal(140, 15, n),
+                       DynamicRiskFactorsType.DBP.value: rng.normal(80, 10, n),
+                       DynamicRiskFactorsType.A1C.value: rng.normal(5.8, 0.8, n),
+                       DynamicRiskFactorsType.HDL.value: rng.normal(50, 12, n),
+                       DynamicRiskFactorsType.TOT_CHOL.value: rng.normal(190, 30, n),
+                       DynamicRiskFactorsType.BMI.value: rng.normal(28, 5, n),
+                       DynamicRiskFactorsType.LDL.value: rng.normal(110, 30, n),
+                       DynamicRiskFactorsType.TRIG.value: rng.normal(140, 50, n),
+                       DynamicRiskFactorsType.WAIST.value: rng.normal(95, 12, n),
+                       DynamicRiskFactorsType.ANY_PHYSICAL_ACTIVITY.value: rng.integers(0, 2, n),
+                       StaticRiskFactorsType.EDUCATION.value: Education.COLLEGEGRADUATE.value,
+                       StaticRiskFactorsType.SMOKING_STATUS.value: SmokingStatus.NEVER.value,
+                       DynamicRiskFactorsType.ALCOHOL_PER_WEEK.value: AlcoholCategory.NONE.value,
+                       DefaultTreatmentsType.ANTI_HYPERTENSIVE_COUNT.value: rng.integers(0, 3, n),
+                       DefaultTreatmentsType.STATIN.value: rng.integers(0, 2, n),
+                       DynamicRiskFactorsType.CREATININE.value: rng.normal(0.9, 0.2, n),
+                       "name": [f"person{i}" for i in range(n)]})
+    people = pd.Series([PersonFactory.get_nhanes_person(df.iloc[i]) for i in range(n)])
+    for i, person in enumerate(people):
+        person._index = i
+    return people
+
+def get_test_pop_model_repository():
+    return PopulationModelRepository(CohortDynamicRiskFactorModelRepository(),
+                                     CohortDefaultTreatmentModelRepository(),
+                                     OutcomeModelRepository(),
+                                     CohortStaticRiskFactorModelRepository())
+
+def get_people_with_same_rng(people):
+    peopleCopy = Population.get_people_copy(people)
+    for person, personCopy in zip(people, peopleCopy):
+        personCopy._rng = copy.deepcopy(person._rng)
+    return peopleCopy
@@ -2,6 +2,7 @@ import unittest
 import numpy as np
 import pandas as pd
 from microsim.person import Person
+from microsim.gfr_equation import GFREquation
 from microsim.education import Education
 from microsim.gender import NHANESGender
 from microsim.smoking_status import SmokingStatus
@@ -140,6 +141,19 @@ class TestCKDEquation(unittest.TestCase):
         )
         self.assertAlmostEqual(whiteMaleLowCr, self._white_male_low_cr._gfr)
 
+    def testPopulationGFRsAgree(self):
+        people = [self._black_female_high_cr, self._black_female_low_cr, self._white_male_high_cr, self._white_male_low_cr]
+        gfr = GFREquation.get_gfr_for_population([x._gender for x in people], [x._raceEthnicity for x in people],
+                                                 [x._creatinine[-1] for x in people], [x._age[-1] for x in people])
+        np.testing.assert_allclose([x._gfr for x in people], gfr, rtol=1e-12)
+        rng = np.random.default_rng(5)
+        gender = rng.choice([NHANESGender.MALE, NHANESGender.FEMALE], 1000)
+        raceEthnicity = rng.choice(list(RaceEthnicity), 1000)
+        creatinine = rng.uniform(0.3, 3., 1000)
+        age = rng.integers(18, 95, 1000).astype(float)
+        gfr = GFREquation.get_gfr_for_population(gender, raceEthnicity, creatinine, age)
+        np.testing.assert_allclose([GFREquation().get_gfr_for_person_attributes(*x) for x in zip(gender, raceEthnicity, creatinine, age)], gfr, rtol=1e-12)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,80 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+from microsim.alcohol_category import AlcoholCategory
+from microsim.columnar_cache import ColumnarCache
+
+class TestColumnarCache(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.cacheDirectory = os.path.join(self.directory.name, "cache")
+        environ = mock.patch.dict(os.environ, {ColumnarCache.cacheDirectoryVariable: self.cacheDirectory})
+        environ.start()
+        self.addCleanup(environ.stop)
+        self.sourcePath = os.path.join(self.directory.name, "source.dta")
+        pd.DataFrame({"sbp": [120.5, 141., 133.2],
+                      "alcohol": [0., 4., 20.],
+                      "name": ["a", "b", "c"]}).to_stata(self.sourcePath, write_index=False)
+        self.builds = 0
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def build(self, sourcePath):
+        self.builds += 1
+        df = pd.read_stata(sourcePath)
+        df["alcohol"] = AlcoholCategory.get_categories_for_consumption(df["alcohol"].to_numpy())
+        df["active"] = df["sbp"] > 130
+        df["group"] = pd.Categorical(np.where(df["active"], "high", "low"))
+        return df
+
+    def load(self, version=1):
+        return ColumnarCache.load(self.sourcePath, self.build, "test", version=version)
+
+    def test_cached_df_is_the_built_df(self):
+        df = self.load()
+        cachedDf = self.load()
+        self.assertEqual(1, self.builds)
+        pd.testing.assert_frame_equal(df, cachedDf)
+        self.assertEqual(AlcoholCategory.FOURTEENORMORE, cachedDf["alcohol"].iloc[2])
+        #the numeric columns are views of the memory mapped files, not copies
+        self.assertFalse(cachedDf["sbp"].to_numpy().flags.owndata)
+
+    def test_cache_is_in_the_cache_directory(self):
+        self.load()
+        #nothing is written next to the source file
+        self.assertEqual(["cache", "source.dta"], sorted(os.listdir(self.directory.name)))
+        self.assertEqual(1, len(os.listdir(self.cacheDirectory)))
+        with mock.patch.dict(os.environ, {ColumnarCache.cacheDirectoryVariable: "", "XDG_CACHE_HOME": self.directory.name}):
+            self.assertEqual(os.path.join(self.directory.name, "microsim"), ColumnarCache.get_cache_directory())
+
+    def test_cache_is_rebuilt_when_source_or_version_change(self):
+        self.load()
+        self.load(version=2)
+        self.assertEqual(2, self.builds)
+        pd.DataFrame({"sbp": [150.], "alcohol": [0.], "name": ["d"]}).to_stata(self.sourcePath, write_index=False)
+        self.assertEqual([150.], list(self.load()["sbp"]))
+        self.assertEqual(3, self.builds)
+
+    def test_cached_object_is_the_built_object(self):
+        otherPath = os.path.join(self.directory.name, "other.txt")
+        with open(otherPath, "w") as f:
+            f.write("1")
+        build = lambda sourcePaths: {"sizes": [self.build(sourcePaths[0]).shape[0]], "mean": np.array([1.5, 2.])}
+        obj = ColumnarCache.load_object([self.sourcePath, otherPath], build, "test")
+        cachedObj = ColumnarCache.load_object([self.sourcePath, otherPath], build, "test")
+        self.assertEqual(1, self.builds)
+        self.assertEqual([3], cachedObj["sizes"])
+        self.assertTrue(np.array_equal(obj["mean"], cachedObj["mean"]))
+        with open(otherPath, "w") as f:
+            f.write("22")
+        ColumnarCache.load_object([self.sourcePath, otherPath], build, "test")
+        self.assertEqual(2, self.builds)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,129 @@
+import gc
+import unittest
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from microsim.columnar_population import ColumnarPopulation, PopulationColumns, CurrentValueColumns
+from microsim.outcome_model_repository import OutcomeModelRepository
+from microsim.population import Population
+from microsim.risk_factor import DynamicRiskFactorsType, StaticRiskFactorsType
+from microsim.test.helper.population_helpers import get_test_people, get_test_pop_model_repository, get_people_with_same_rng
+
+class TestColumnarPopulation(unittest.TestCase):
+    def setUp(self):
+        self.people = get_test_people(20)
+        self.pop = Population(self.people, get_test_pop_model_repository())
+        self.columnarPop = ColumnarPopulation(get_people_with_same_rng(self.people), get_test_pop_model_repository(), horizon=4)
+
+    def test_columns_hold_baseline_state(self):
+        columns = self.columnarPop._columns
+        self.assertEqual(columns._history[DynamicRiskFactorsType.SBP.value].shape, (20, 5))
+        self.assertEqual(columns._history[DynamicRiskFactorsType.SBP.value].dtype, float)
+        self.assertEqual(columns._history[DynamicRiskFactorsType.ALCOHOL_PER_WEEK.value].dtype, object)
+        for i, person in enumerate(self.people):
+            self.assertEqual(person._sbp[0], columns._history[DynamicRiskFactorsType.SBP.value][i, 0])
+            self.assertEqual(person._gender, columns._static[StaticRiskFactorsType.GENDER.value][i])
+        self.assertTrue(all(columns._nFilled==1))
+
+    def test_same_trajectories_as_person_advance(self):
+        self.pop.advance(2)
+        self.columnarPop.advance(2)
+        self.pop.advance(2)
+        self.columnarPop.advance(2)
+        self.assertEqual(self.pop._waveCompleted, self.columnarPop._waveCompleted)
+        for person, columnarPerson in zip(self.pop._people, self.columnarPop._people):
+            self.assertEqual(person._waveCompleted, columnarPerson._waveCompleted)
+            for attr in person._dynamicRiskFactors + person._defaultTreatments:
+                #population linear predictors are matrix-vector products, so sums may differ in the last digits
+                if attr in PopulationColumns.continuousTypes:
+                    np.testing.assert_allclose(getattr(person, "_"+attr), getattr(columnarPerson, "_"+attr), rtol=1e-10)
+                else:
+                    self.assertEqual(getattr(person, "_"+attr), getattr(columnarPerson, "_"+attr))
+                self.assertIsInstance(getattr(columnarPerson, "_"+attr), list)
+            for outcomeType in person._outcomes.keys():
+                self.assertEqual(person._outcomes[outcomeType], columnarPerson._outcomes[outcomeType])
+            self.assertEqual(person._treatmentStrategies, columnarPerson._treatmentStrategies)
+
+    def test_columns_track_person_state(self):
+        self.columnarPop.advance(3)
+        columns = self.columnarPop._columns
+        for i, person in enumerate(self.columnarPop._people):
+            self.assertEqual(columns._alive[i], person.is_alive)
+            self.assertEqual(columns._nFilled[i], len(person._age))
+            self.assertEqual(columns.get_current(DynamicRiskFactorsType.AGE.value)[i], person._age[-1])
+
+    def test_columns_kept_across_advance_calls(self):
+        columns = self.columnarPop._columns
+        self.columnarPop.advance(2)
+        #past the horizon the same columns get more waves
+        self.columnarPop.advance(4)
+        self.assertIs(columns, self.columnarPop._columns)
+        self.assertEqual(columns._history[DynamicRiskFactorsType.SBP.value].shape[1], columns._nFilled.max())
+        self.pop.advance(6)
+        for person, columnarPerson in zip(self.pop._people, self.columnarPop._people):
+            np.testing.assert_allclose(person._sbp, columnarPerson._sbp, rtol=1e-10)
+            self.assertEqual(person._outcomes, columnarPerson._outcomes)
+
+    def test_shared_memory_advance_parallel(self):
+        self.pop.advance(3)
+        self.columnarPop.advance(2, nWorkers=2)
+        self.columnarPop.advance(1, nWorkers=3)
+        self.assertEqual(list(self.pop._aliveIndices), list(self.columnarPop._aliveIndices))
+        for person, columnarPerson in zip(self.pop._people, self.columnarPop._people):
+            self.assertEqual(person._waveCompleted, columnarPerson._waveCompleted)
+            np.testing.assert_allclose(person._sbp, columnarPerson._sbp, rtol=1e-10)
+            self.assertEqual(person._statin, columnarPerson._statin)
+            self.assertEqual(person._outcomes, columnarPerson._outcomes)
+            self.assertEqual(person._rng.uniform(), columnarPerson._rng.uniform())
+
+    def test_resident_shards_advance_parallel(self):
+        self.pop.advance(6)
+        self.columnarPop.advance(1, nWorkers=2, gather=False)
+        executor = self.columnarPop._executor
+        self.columnarPop.advance(2, nWorkers=2, gather=False)
+        self.assertIs(executor, self.columnarPop._executor)
+        #the columns of the horizon are full, so the shards are gathered and created again
+        self.columnarPop.advance(3, nWorkers=2, gather=False)
+        self.assertIsNot(executor, self.columnarPop._executor)
+        #reading the people gathers the shards
+        np.testing.assert_allclose(self.pop.get_all_person_years_as_df()[DynamicRiskFactorsType.SBP.value],
+                                   self.columnarPop.get_all_person_years_as_df()[DynamicRiskFactorsType.SBP.value], rtol=1e-10)
+        self.assertIsNone(self.columnarPop._executor)
+        self.assertEqual(list(self.pop._aliveIndices), list(self.columnarPop._aliveIndices))
+        for person, columnarPerson in zip(self.pop._people, self.columnarPop._people):
+            self.assertEqual(person._outcomes, columnarPerson._outcomes)
+            self.assertEqual(person._treatmentStrategies, columnarPerson._treatmentStrategies)
+
+    def test_discarded_population_closes_workers_and_shared_columns(self):
+        self.columnarPop.advance(1, nWorkers=2, gather=False)
+        processes = list(self.columnarPop._executor._processes)
+        segmentNames = [name for name, shape, dtype in self.columnarPop._sharedColumns.descriptor.values()]
+        del self.columnarPop
+        gc.collect()
+        self.assertFalse(any(map(lambda x: x.is_alive(), processes)))
+        for name in segmentNames:
+            with self.assertRaises(FileNotFoundError):
+                shared_memory.SharedMemory(name=name)
+
+class TestPopulationOutcomeStage(unittest.TestCase):
+    def test_population_outcome_models_agree_with_person_models(self):
+        people = get_test_people(300)
+        peopleCopy = get_people_with_same_rng(people)
+        outcomeRepository = OutcomeModelRepository()
+        for outcomeType in people[0].get_outcomes_in_order():
+            repository = outcomeRepository._repository[outcomeType]
+            expectedOutcomes = list(map(lambda x: repository.select_outcome_model_for_person(x).get_next_outcome(x), people))
+            if hasattr(repository, "get_next_outcomes_for_population"):
+                columns = CurrentValueColumns(PopulationColumns(peopleCopy), np.arange(len(peopleCopy)), peopleCopy.values)
+                outcomes = repository.get_next_outcomes_for_population(peopleCopy.values, columns)
+            else:
+                outcomes = list(map(lambda x: repository.select_outcome_model_for_person(x).get_next_outcome(x), peopleCopy))
+            self.assertEqual(expectedOutcomes, outcomes)
+            list(map(lambda x, outcome: x.add_outcome(outcome), people, expectedOutcomes))
+            list(map(lambda x, outcome: x.add_outcome(outcome), peopleCopy, outcomes))
+        for person, personCopy in zip(people, peopleCopy):
+            self.assertEqual(person._rng.uniform(), personCopy._rng.uniform())
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,27 @@
+import unittest
+
+from microsim import data_loader
+from microsim.data_loader import load_model_spec
+from microsim.person_factory import PersonFactory
+from microsim.stroke_partition_model import StrokePartitionModel
+
+class TestLoadModelSpec(unittest.TestCase):
+    def test_spec_is_parsed_once_and_read_only(self):
+        spec = load_model_spec("StrokeMIPartitionModel")
+        self.assertIn("StrokeMIPartitionModel", data_loader._model_spec_cache)
+        self.assertIs(spec, load_model_spec("StrokeMIPartitionModel"))
+        with self.assertRaises(TypeError):
+            spec["coefficients"]["Intercept"] = 0.
+
+    def test_modified_intercept_leaves_spec_unchanged(self):
+        intercept = load_model_spec("StrokeMIPartitionModel")["coefficients"]["Intercept"]
+        model = StrokePartitionModel(intercept=intercept + 1.)
+        self.assertEqual(intercept + 1., model.parameters["Intercept"])
+        self.assertEqual(intercept, load_model_spec("StrokeMIPartitionModel")["coefficients"]["Intercept"])
+        self.assertEqual(intercept, StrokePartitionModel().parameters["Intercept"])
+
+    def test_initialization_model_repository_is_shared(self):
+        self.assertIs(PersonFactory.initialization_model_repository(), PersonFactory.initialization_model_repository())
+
+if __name__ == "__main__":
+    unittest.main()
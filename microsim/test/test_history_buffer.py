@@ -0,0 +1,53 @@
+import unittest
+
+import numpy as np
+
+from microsim.history_buffer import HistoryBuffer
+from microsim.population import Population
+from microsim.test.helper.population_helpers import (get_test_people,
+                                                    get_test_pop_model_repository,
+                                                    get_people_with_same_rng)
+
+class TestHistoryBuffer(unittest.TestCase):
+    def test_list_like_access(self):
+        history = HistoryBuffer([120., 130.], capacity=4)
+        history.append(140.)
+        self.assertEqual(3, len(history))
+        self.assertEqual(4, history.capacity)
+        self.assertEqual(120., history[0])
+        self.assertEqual(140., history[-1])
+        self.assertEqual([130., 140.], history[1:])
+        self.assertEqual([120., 130., 140.], history)
+        self.assertEqual(130., np.array(history).mean())
+        self.assertEqual([120., 130., 140., 150.], history+[150.])
+        with self.assertRaises(IndexError):
+            history[3]
+
+    def test_update_last_value_in_place(self):
+        history = HistoryBuffer([True, False])
+        history[-1] = True
+        self.assertEqual([True, True], list(history))
+
+    def test_grows_beyond_capacity(self):
+        history = HistoryBuffer([1], capacity=1)
+        for i in range(2, 6):
+            history.append(i)
+        self.assertEqual([1, 2, 3, 4, 5], history.tolist())
+        self.assertEqual(5, history[-1])
+
+class TestPreallocatedPopulationHistory(unittest.TestCase):
+    def test_same_trajectories_as_list_histories(self):
+        people = get_test_people(15)
+        pop = Population(people, get_test_pop_model_repository())
+        preallocatedPop = Population(get_people_with_same_rng(people), get_test_pop_model_repository(), horizon=3)
+        pop.advance(4)
+        preallocatedPop.advance(4)
+        for person, preallocatedPerson in zip(pop._people, preallocatedPop._people):
+            for attr in person._dynamicRiskFactors + person._defaultTreatments:
+                self.assertIsInstance(getattr(preallocatedPerson, "_"+attr), HistoryBuffer)
+                self.assertEqual(getattr(person, "_"+attr), getattr(preallocatedPerson, "_"+attr).tolist())
+            for outcomeType in person._outcomes.keys():
+                self.assertEqual(person._outcomes[outcomeType], preallocatedPerson._outcomes[outcomeType])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,126 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+from microsim.columnar_cache import ColumnarCache
+from microsim.person_filter import PersonFilter
+from microsim.population_factory import PopulationFactory
+from microsim.population_type import PopulationType
+from microsim.variable_type import VariableType
+
+class TestKaiserDistributions(unittest.TestCase):
+    def setUp(self):
+        cacheDirectory = tempfile.TemporaryDirectory()
+        self.addCleanup(cacheDirectory.cleanup)
+        environ = mock.patch.dict(os.environ, {ColumnarCache.cacheDirectoryVariable: cacheDirectory.name})
+        environ.start()
+        self.addCleanup(environ.stop)
+        fileDir = "microsim/data/kaiser"
+        self.csvPaths = [fileDir+y for y in ['/kaiserMin.csv', '/kaiserMax.csv', '/kaiserMean.csv', '/kaiserCovariance.csv', '/kaiserWeight.csv']]
+        self.distributions = PopulationFactory.read_kaiser_distributions(self.csvPaths)
+
+    def test_groups_same_as_search_of_each_group(self):
+        (minDf, maxDf, meanDf, covDf, weightDf) = list(map(PopulationFactory.get_kaiserDf, self.csvPaths))
+        catVariables = PopulationFactory.kaiser_variable_types[VariableType.CATEGORICAL.value]
+        conVariables = PopulationFactory.kaiser_variable_types[VariableType.CONTINUOUS.value]
+        keys = list(self.distributions["mean"].keys())
+        self.assertEqual(minDf.shape[0], len(keys))
+        for key in keys[::50]:
+            rows = lambda df: df.loc[(df[catVariables]==key).all(axis=1), conVariables].to_numpy()
+            self.assertTrue(np.array_equal(rows(minDf)[0], self.distributions["min"][key]))
+            self.assertTrue(np.array_equal(rows(maxDf)[0], self.distributions["max"][key]))
+            self.assertTrue(np.array_equal(rows(meanDf)[0], self.distributions["mean"][key]))
+            self.assertTrue(np.array_equal(rows(covDf), self.distributions["cov"][key]))
+            self.assertEqual(PopulationFactory.is_singular(rows(covDf)), self.distributions["singular"][key])
+            weight = weightDf.loc[(weightDf[catVariables]==key).all(axis=1), "weight"].to_numpy()[0]
+            self.assertEqual(int(315142*weight), self.distributions["size"][key])
+
+    def test_alt_groups_are_not_singular(self):
+        singularKeys = [key for key, singular in self.distributions["singular"].items() if singular]
+        self.assertEqual(set(singularKeys), set(self.distributions["alt"].keys()))
+        self.assertFalse(any(map(lambda key: self.distributions["singular"][self.distributions["alt"][key]], singularKeys)))
+
+    def test_sample_sizes_allocate_n_to_groups_with_people(self):
+        sizes = PopulationFactory.get_sample_sizes(self.distributions, 5000)
+        self.assertEqual(5000, sum(sizes.values()))
+        self.assertTrue(all(map(lambda key: self.distributions["size"][key]>0, sizes.keys())))
+        keys = list(self.distributions["size"].keys())
+        self.assertEqual(sorted(map(keys.index, sizes.keys())), list(map(keys.index, sizes.keys())))
+
+    def test_kaiser_people_drawn_only_for_n(self):
+        personFilters = PersonFilter()
+        personFilters.add_filter("df", "highSBP", lambda x: x["sbp"]>140)
+        people = PopulationFactory.get_kaiser_people(n=30, personFilters=personFilters)
+        self.assertEqual(30, people.shape[0])
+        self.assertTrue(all(map(lambda x: x._sbp[0]>140, people)))
+        self.assertEqual(list(range(30)), list(map(lambda x: x._index, people)))
+
+    def test_seeded_kaiser_population_is_reproducible(self):
+        populations = list(map(lambda x: PopulationFactory.get_kaiser_population(n=50, seed=x), [1, 1, 2]))
+        list(map(lambda x: x.advance(3), populations))
+        dfs = list(map(lambda x: x.get_all_person_years_as_df(), populations))
+        pd.testing.assert_frame_equal(dfs[0], dfs[1])
+        self.assertFalse(dfs[0].equals(dfs[2]))
+
+    def test_kaiser_people_rounds_are_bounded(self):
+        personFilters = PersonFilter()
+        personFilters.add_filter("df", "noOne", lambda x: x["sbp"]<0)
+        with self.assertRaises(RuntimeError):
+            PopulationFactory.get_kaiser_people(n=30, personFilters=personFilters)
+        personFilters = PersonFilter()
+        personFilters.add_filter("df", "highSBP", lambda x: x["sbp"]>140)
+        with mock.patch.object(PopulationFactory, "kaiserMaxRounds", 1):
+            with self.assertRaises(RuntimeError):
+                PopulationFactory.get_kaiser_people(n=30, personFilters=personFilters)
+
+    def test_truncated_normal_draws_within_bounds_and_reproducible(self):
+        means = [np.array([0., 10.]), np.array([5., -5.])]
+        choleskyFactors = [np.linalg.cholesky(np.array([[1., 0.5], [0.5, 2.]])), np.linalg.cholesky(np.array([[4., -1.], [-1., 1.]]))]
+        lowerBounds = np.array([[-1., 8.], [3., -7.]])
+        upperBounds = np.array([[1., 12.], [9., -4.5]])
+        drawSizes = np.array([20000, 3])
+        np.random.seed(11)
+        draws = PopulationFactory.draw_from_truncated_normals(drawSizes, means, choleskyFactors, lowerBounds, upperBounds)
+        np.random.seed(11)
+        drawsAgain = PopulationFactory.draw_from_truncated_normals(drawSizes, means, choleskyFactors, lowerBounds, upperBounds)
+        self.assertEqual([(20000, 2), (3, 2)], list(map(lambda x: x.shape, draws)))
+        for i in range(2):
+            self.assertTrue(np.array_equal(draws[i], drawsAgain[i]))
+            self.assertTrue(((draws[i]>=lowerBounds[i]) & (draws[i]<=upperBounds[i])).all())
+        #fixed-seed values of the batched draws, these differ from the one group at a time draws of earlier versions
+        np.testing.assert_allclose(draws[0][:2], [[-0.00828462937293584, 9.573025135445155], [-0.53662936223473, 10.148923830632913]], rtol=1e-12)
+        np.testing.assert_allclose(draws[1], [[6.242938933953928, -6.566112580001294], [7.163563743973918, -6.155328952885346],
+                                              [3.847879041573604, -5.214822546673811]], rtol=1e-12)
+        #the first group is truncated symmetrically around its mean
+        self.assertTrue(np.allclose(means[0], draws[0].mean(axis=0), atol=0.03))
+
+    def test_draws_for_every_group_in_order(self):
+        sizes = PopulationFactory.get_sample_sizes(self.distributions, 300)
+        self.distributions["names"] = {key: [f"person{i}" for i in range(size)] for key, size in self.distributions["size"].items()}
+        drawsForGroups, namesForGroups = PopulationFactory.draw_from_distributions(self.distributions, sizes=sizes)
+        self.assertEqual(list(sizes.keys()), list(drawsForGroups.keys()))
+        self.assertEqual(list(sizes.values()), list(map(lambda x: x.shape[0], drawsForGroups.values())))
+        self.assertEqual(list(sizes.values()), list(map(len, namesForGroups.values())))
+
+    def test_df_from_draws_has_one_row_per_draw(self):
+        keys = list(self.distributions["mean"].keys())[:3]
+        drawsForGroups = {keys[0]: np.array([self.distributions["mean"][keys[0]]]*2),
+                          keys[1]: np.empty((0, 11)),
+                          keys[2]: np.array([self.distributions["mean"][keys[2]]]*3)}
+        namesForGroups = {keys[0]: ["a", "b"], keys[1]: [], keys[2]: ["c", "d", "e"]}
+        df = PopulationFactory.get_df_from_draws(drawsForGroups, namesForGroups, popType=PopulationType.KAISER.value)
+        catVariables = PopulationFactory.kaiser_variable_types[VariableType.CATEGORICAL.value]
+        conVariables = PopulationFactory.kaiser_variable_types[VariableType.CONTINUOUS.value]
+        self.assertEqual(["name"]+catVariables+conVariables, list(df.columns))
+        self.assertEqual(["a", "b", "c", "d", "e"], list(df["name"]))
+        self.assertEqual([0, 1, 0, 1, 2], list(df.index))
+        self.assertEqual([keys[0]]*2+[keys[2]]*3, list(map(tuple, df[catVariables].to_numpy().tolist())))
+        self.assertEqual(round(self.distributions["mean"][keys[2]][0]), df["age"].iloc[4])
+        self.assertEqual(self.distributions["mean"][keys[2]][1], df["hdl"].iloc[4])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,17 @@
+import unittest
+
+from microsim.cv_model_repository import CVModelRepository
+from microsim.model_registry import ModelRegistry
+from microsim.outcome_details.stroke_details import StrokeNihssModel
+
+class TestModelRegistry(unittest.TestCase):
+    def test_one_shared_instance_per_variant(self):
+        self.assertIs(ModelRegistry.get_model(StrokeNihssModel), ModelRegistry.get_model(StrokeNihssModel))
+        wmhSpecific = ModelRegistry.get_model(CVModelRepository, wmhSpecific=True)
+        self.assertIs(wmhSpecific, ModelRegistry.get_model(CVModelRepository, wmhSpecific=True))
+        self.assertIsNot(wmhSpecific, ModelRegistry.get_model(CVModelRepository, wmhSpecific=False))
+        self.assertTrue(ModelRegistry.get_model(CVModelRepository, wmhSpecific=True)._models["male"].wmhSpecific)
+        self.assertFalse(ModelRegistry.get_model(CVModelRepository, wmhSpecific=False)._models["male"].wmhSpecific)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,41 @@
+import unittest
+
+from microsim.outcome import Outcome, OutcomeType
+from microsim.test.helper.population_helpers import get_test_people
+
+class TestOutcomeEventIndex(unittest.TestCase):
+    def setUp(self):
+        self.person = get_test_people(1)[0]
+        self.baseAge = self.person._age[0]
+        self.person._outcomes[OutcomeType.STROKE] = [(self.baseAge-5, Outcome(OutcomeType.STROKE, False, priorToSim=True))]
+        for i in range(1, 4):
+            self.person.append_to_history("age", self.baseAge+i)
+        self.person.add_outcome(Outcome(OutcomeType.STROKE, False))
+
+    def test_queries_use_index(self):
+        person = self.person
+        lastAge = self.baseAge+3
+        self.assertIs(person._outcomeIndex[OutcomeType.STROKE], person.get_outcome_index(OutcomeType.STROKE))
+        self.assertEqual(lastAge, person.get_age_at_last_outcome(OutcomeType.STROKE))
+        self.assertEqual(lastAge, person.get_age_at_first_outcome(OutcomeType.STROKE))
+        self.assertEqual(self.baseAge-5, person.get_age_at_first_outcome(OutcomeType.STROKE, inSim=False))
+        self.assertTrue(person.has_outcome_at_current_age(OutcomeType.STROKE))
+        self.assertTrue(person.has_outcome_prior_to_simulation(OutcomeType.STROKE))
+        self.assertTrue(person.has_outcome_during_simulation(OutcomeType.STROKE))
+        self.assertTrue(person.has_outcome_by_age(OutcomeType.STROKE, lastAge))
+        self.assertFalse(person.has_outcome_by_age(OutcomeType.STROKE, lastAge-1))
+        self.assertTrue(person.has_outcome_at_age(OutcomeType.STROKE, self.baseAge-5))
+        self.assertIsNone(person.get_age_at_last_outcome(OutcomeType.MI))
+        self.assertEqual(2, person.get_wave_for_age(self.baseAge+2))
+
+    def test_index_is_rebuilt_when_outcomes_change_directly(self):
+        person = self.person
+        person._outcomes[OutcomeType.STROKE] = []
+        self.assertIsNone(person.get_age_at_last_outcome(OutcomeType.STROKE))
+        self.assertFalse(person.has_outcome_prior_to_simulation(OutcomeType.STROKE))
+        person._outcomes[OutcomeType.STROKE].append((self.baseAge+1, Outcome(OutcomeType.STROKE, True)))
+        self.assertEqual(self.baseAge+1, person.get_age_at_last_outcome(OutcomeType.STROKE))
+        self.assertFalse(person.has_fatal_outcome_at_current_age(OutcomeType.STROKE))
+
+if __name__ == "__main__":
+    unittest.main()
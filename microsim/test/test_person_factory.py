@@ -0,0 +1,84 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from microsim.alcohol_category import AlcoholCategory
+from microsim.modality import Modality
+from microsim.outcome import OutcomeType
+from microsim.person_factory import PersonFactory
+from microsim.population_type import PopulationType
+from microsim.random_streams import RandomStreams
+
+def get_test_df(n, popType, seed=5):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({"age": rng.integers(30, 90, n).astype(float),
+                       "gender": rng.integers(1, 3, n),
+                       "raceEthnicity": rng.integers(1, 7, n),
+                       "smokingStatus": rng.integers(0, 3, n),
+                       "sbp": rng.normal(140, 25, n),
+                       "dbp": rng.normal(80, 15, n),
+                       "a1c": rng.normal(5.8, 0.8, n),
+                       "hdl": rng.normal(50, 12, n),
+                       "totChol": rng.normal(190, 30, n),
+                       "bmi": rng.normal(28, 6, n),
+                       "ldl": rng.normal(110, 30, n),
+                       "trig": rng.normal(140, 50, n),
+                       "creatinine": rng.normal(0.9, 0.3, n),
+                       "anyPhysicalActivity": rng.integers(0, 2, n).astype(bool),
+                       "antiHypertensiveCount": rng.integers(0, 4, n),
+                       "statin": rng.integers(0, 3, n)},
+                      index=rng.permutation(n)+1000)
+    if popType==PopulationType.NHANES.value:
+        df["waist"] = rng.normal(95, 12, n)
+        df["education"] = rng.integers(1, 6, n)
+        df["alcoholPerWeek"] = list(map(AlcoholCategory, rng.integers(0, 4, n)))
+        df["selfReportStrokeAge"] = rng.choice([np.nan, 0, 40, 95], n)
+        df["selfReportMIAge"] = rng.choice([np.nan, 0, 40, 95, 99999], n)
+    else:
+        df["afib"] = rng.integers(0, 2, n).astype(float)
+        df["pvd"] = rng.integers(0, 2, n).astype(float)
+        df["modality"] = rng.choice([Modality.CT.value, Modality.MR.value], n)
+        df["name"] = [f"person{i}" for i in range(n)]
+    return df
+
+def get_person_state(person):
+    state = {key: value for key, value in person.__dict__.items() if key not in ["_rng", "_outcomes", "_outcomeIndex"]}
+    state["_outcomes"] = {outcomeType: [(age, outcome.__dict__) for age, outcome in outcomes]
+                          for outcomeType, outcomes in person._outcomes.items()}
+    state["_rng"] = person._rng._streamKey
+    return repr(state)
+
+class TestPersonFactoryPopulation(unittest.TestCase):
+    def assert_same_people(self, popType, getPerson):
+        df = get_test_df(300, popType)
+        defaultStreams = RandomStreams._default
+        RandomStreams._default = RandomStreams(3)
+        people = pd.DataFrame.apply(df, getPerson, axis="columns")
+        RandomStreams._default = RandomStreams(3)
+        bulkPeople = PersonFactory.get_people(df, popType=popType)
+        RandomStreams._default = defaultStreams
+        self.assertEqual(list(people.index), list(bulkPeople.index))
+        self.assertEqual(list(map(get_person_state, people)), list(map(get_person_state, bulkPeople)))
+        return bulkPeople
+
+    def test_nhanes_people_same_as_nhanes_person(self):
+        people = self.assert_same_people(PopulationType.NHANES.value, PersonFactory.get_nhanes_person)
+        self.assertTrue(any(map(lambda x: x.has_outcome_prior_to_simulation(OutcomeType.MI), people)))
+
+    def test_kaiser_people_same_as_kaiser_person(self):
+        people = self.assert_same_people(PopulationType.KAISER.value, PersonFactory.get_kaiser_person)
+        self.assertTrue(all(map(lambda x: len(x._outcomes[OutcomeType.WMH])==1, people)))
+
+    def test_initialization_draws_use_the_seed(self):
+        for popType in [PopulationType.NHANES.value, PopulationType.KAISER.value]:
+            df = get_test_df(300, popType)
+            people = PersonFactory.get_people(df, popType=popType, streams=RandomStreams.get_initialization_streams(12345))
+            samePeople = PersonFactory.get_people(df, popType=popType, streams=RandomStreams.get_initialization_streams(12345))
+            otherPeople = PersonFactory.get_people(df, popType=popType, streams=RandomStreams.get_initialization_streams(54321))
+            self.assertEqual(list(map(get_person_state, people)), list(map(get_person_state, samePeople)))
+            self.assertNotEqual(list(map(get_person_state, people)), list(map(get_person_state, otherPeople)))
+            self.assertTrue(all(map(lambda x: x._rng._streamKey>=RandomStreams.initializationKeys, people)))
+
+if __name__ == "__main__":
+    unittest.main()
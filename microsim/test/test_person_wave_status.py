@@ -20,6 +20,8 @@ from microsim.cohort_risk_model_repository import (CohortDynamicRiskFactorModelR
                                                    CohortStaticRiskFactorModelRepository,
                                                    CohortDefaultTreatmentModelRepository)
 
+from microsim.test.helper.population_helpers import get_test_people
+
 import unittest
 import numpy as np
 import pandas as pd
@@ -166,5 +168,23 @@ class TestPersonWaveStatus(unittest.TestCase):
         self.assertEqual(True, self.oldJoe.is_dead)
 
 
+class TestPersonDerivedValues(unittest.TestCase):
+    def test_derived_values_are_memoized_only_during_a_wave(self):
+        person = get_test_people(1)[0]
+        gfr = person._gfr
+        self.assertIsNone(person._derived)
+        person.start_derived_values()
+        self.assertEqual(gfr, person._gfr)
+        self.assertIn("_gfr", person._derived)
+        #a risk factor change during the wave clears the memo
+        person.append_to_history(DynamicRiskFactorsType.A1C.value, 7.0)
+        self.assertNotIn("_gfr", person._derived)
+        self.assertTrue(person._current_diabetes)
+        person.append_to_history(DynamicRiskFactorsType.CREATININE.value, person._creatinine[-1] * 2)
+        self.assertNotEqual(gfr, person._gfr)
+        self.assertEqual(person._totCholHdlRatio, person._totChol[-1] / person._hdl[-1])
+        person.stop_derived_values()
+        self.assertIsNone(person._derived)
+
 if __name__ == "__main__":
     unittest.main()
@@ -7,11 +7,14 @@
 #from microsim.alcohol_category import AlcoholCategory
 #from microsim.population_factory import PopulationFactory
 
+import gc
 import unittest
 import pandas as pd
 import numpy as np
 from microsim.outcome import OutcomeType, Outcome
+from microsim.population import Population
 from microsim.population_factory import PopulationFactory
+from microsim.test.helper.population_helpers import get_test_people, get_test_pop_model_repository, get_people_with_same_rng
 
 class TestPopulation(unittest.TestCase):
     def setUp(self):
@@ -57,5 +60,112 @@ class TestPopulationAdvanceOutcomes(unittest.TestCase):
             self.assertEqual(expected_risk_factor_length, len(person._sbp))
 
 
+class TestPopulationAliveIndices(unittest.TestCase):
+    def setUp(self):
+        self.pop = Population(get_test_people(30), get_test_pop_model_repository())
+
+    def test_alive_indices_follow_deaths(self):
+        self.pop.advance(3)
+        isAlive = [x.is_alive for x in self.pop._people]
+        self.assertEqual(list(np.flatnonzero(isAlive)), list(self.pop._aliveIndices))
+        self.assertEqual(sum(isAlive), Population.get_alive_people_count(self.pop.get_alive_people()))
+
+    def test_dead_people_are_removed_after_one_wave(self):
+        self.pop.advance(1)
+        deadPerson = self.pop._people.iloc[0]
+        deadPerson._outcomes[OutcomeType.DEATH] = [(deadPerson._age[-1], Outcome(OutcomeType.DEATH, True))]
+        self.pop.advance(2)
+        self.assertNotIn(0, self.pop._aliveIndices)
+        self.assertNotIn(deadPerson, list(self.pop.get_alive_people()))
+        self.assertEqual(0, deadPerson._waveCompleted)
+        self.assertEqual(1, len(deadPerson._sbp))
+
+class TestPopulationAdvanceParallel(unittest.TestCase):
+    def test_resident_shards_match_serial_advance(self):
+        people = get_test_people(30)
+        pop = Population(people, get_test_pop_model_repository())
+        parallelPop = Population(get_people_with_same_rng(people), get_test_pop_model_repository())
+        pop.advance(2)
+        pop.advance(2)
+        parallelPop.advance(2, nWorkers=2, gather=False)
+        self.assertIsNotNone(parallelPop._executor)
+        parallelPop.advance(2, nWorkers=2)
+        self.assertIsNone(parallelPop._executor)
+        self.assertEqual(pop._waveCompleted, parallelPop._waveCompleted)
+        self.assertEqual(list(pop._aliveIndices), list(parallelPop._aliveIndices))
+        for person, parallelPerson in zip(pop._people, parallelPop._people):
+            self.assertEqual(person._sbp, parallelPerson._sbp)
+            self.assertEqual(person._outcomes, parallelPerson._outcomes)
+
+    def test_discarded_population_closes_workers(self):
+        parallelPop = Population(get_test_people(30), get_test_pop_model_repository())
+        parallelPop.advance(1, nWorkers=2, gather=False)
+        processes = list(parallelPop._executor._processes)
+        del parallelPop
+        gc.collect()
+        self.assertFalse(any(map(lambda x: x.is_alive(), processes)))
+
+    def test_getters_gather_resident_shards(self):
+        people = get_test_people(30)
+        pop = Population(people, get_test_pop_model_repository())
+        parallelPop = Population(get_people_with_same_rng(people), get_test_pop_model_repository())
+        pop.advance(3)
+        parallelPop.advance(3, nWorkers=2, gather=False)
+        self.assertEqual(pop.get_attr("sbp"), parallelPop.get_attr("sbp"))
+        self.assertIsNone(parallelPop._executor)
+        self.assertEqual(pop.has_outcome(OutcomeType.DEATH), parallelPop.has_outcome(OutcomeType.DEATH))
+        self.assertEqual(list(map(lambda x: x._name, pop.get_alive_people())), list(map(lambda x: x._name, parallelPop.get_alive_people())))
+
+    def test_dynamic_chunks_keep_original_order(self):
+        people = get_test_people(30)
+        pop = Population(people, get_test_pop_model_repository())
+        chunkedPop = Population(get_people_with_same_rng(people), get_test_pop_model_repository())
+        pop.advance(3)
+        chunkedPop.advance(3, nWorkers=2, nChunks=7)
+        self.assertEqual(list(range(7)), list(chunkedPop.get_chunk_timings()["chunk"]))
+        self.assertEqual(30, chunkedPop.get_chunk_timings()["n"].sum())
+        self.assertEqual(list(pop._aliveIndices), list(chunkedPop._aliveIndices))
+        for person, chunkedPerson in zip(pop._people, chunkedPop._people):
+            self.assertEqual(person._name, chunkedPerson._name)
+            self.assertEqual(person._sbp, chunkedPerson._sbp)
+            self.assertEqual(person._outcomes, chunkedPerson._outcomes)
+
+    def test_gathered_parallel_advance_uses_chunks(self):
+        people = get_test_people(30)
+        pop = Population(people, get_test_pop_model_repository())
+        parallelPop = Population(get_people_with_same_rng(people), get_test_pop_model_repository())
+        pop.advance(3)
+        parallelPop.advance(3, nWorkers=2)
+        self.assertEqual(list(range(8)), list(parallelPop.get_chunk_timings()["chunk"]))
+        self.assertIsNone(parallelPop._executor)
+        for person, parallelPerson in zip(pop._people, parallelPop._people):
+            self.assertEqual(person._sbp, parallelPerson._sbp)
+            self.assertEqual(person._outcomes, parallelPerson._outcomes)
+
+class TestPopulationSeed(unittest.TestCase):
+    def setUp(self):
+        self.people = get_test_people(20)
+
+    def get_trajectories(self, seed, nWorkers):
+        pop = Population(Population.get_people_copy(self.people), get_test_pop_model_repository(), seed=seed)
+        pop.advance(3, nWorkers=nWorkers)
+        return [(list(x._sbp), x._outcomes) for x in pop._people]
+
+    def test_same_seed_same_trajectories_for_any_number_of_workers(self):
+        serialTrajectories = self.get_trajectories(12345, 1)
+        self.assertEqual(serialTrajectories, self.get_trajectories(12345, 1))
+        self.assertEqual(serialTrajectories, self.get_trajectories(12345, 2))
+        self.assertNotEqual(serialTrajectories, self.get_trajectories(54321, 1))
+
+    def test_person_stream_depends_on_index_only(self):
+        people = get_test_people(5)
+        Population.seed_people(people, 7)
+        reversedPeople = get_test_people(5)[::-1]
+        Population.seed_people(reversedPeople, 7)
+        for person in people:
+            reversedPerson = [x for x in reversedPeople if x._index==person._index][0]
+            self.assertEqual(person._rng.uniform(), reversedPerson._rng.uniform())
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,37 @@
+import unittest
+
+import numpy as np
+
+from microsim.random_block import RandomBlock
+
+class TestRandomBlock(unittest.TestCase):
+    def test_same_transformations_as_generator(self):
+        block = RandomBlock(np.random.PCG64(11), nUniform=4, nNormal=4)
+        generator = np.random.Generator(np.random.PCG64(11))
+        uniforms = generator.random(4)
+        normals = generator.standard_normal(4)
+        self.assertEqual(2. + 3.*uniforms[0], block.uniform(2., 5.))
+        self.assertEqual(list(uniforms[1:3]), list(block.uniform(size=2)))
+        self.assertEqual(0.38 + 6.99*normals[0], block.normal(0.38, 6.99))
+        self.assertEqual((1,), block.uniform(size=1).shape)
+
+    def test_blocks_are_refilled_and_reset_every_wave(self):
+        block = RandomBlock(np.random.PCG64(11), nUniform=2, nNormal=2)
+        draws = [block.uniform() for i in range(5)]
+        self.assertEqual(5, len(set(draws)))
+        block.start_wave()
+        self.assertEqual(0, block._uniformIndex)
+        self.assertNotIn(block.uniform(), draws)
+
+    def test_reproducible(self):
+        firstBlock = RandomBlock(np.random.PCG64(3))
+        secondBlock = RandomBlock(np.random.PCG64(3))
+        for wave in range(3):
+            self.assertEqual(list(firstBlock.uniform(size=40)), list(secondBlock.uniform(size=40)))
+            self.assertEqual(firstBlock.normal(), secondBlock.normal())
+            self.assertEqual(firstBlock.integers(0, 100), secondBlock.integers(0, 100))
+            firstBlock.start_wave()
+            secondBlock.start_wave()
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,161 @@
+import copy
+import multiprocessing as mp
+import pickle
+import unittest
+from unittest import mock
+
+from microsim.bp_treatment_strategies import AddNBPMedsTreatmentStrategy
+from microsim.columnar_population import ColumnarPopulation
+from microsim.population import Population
+from microsim.random_streams import RandomStreams, RandomStreamBlock
+from microsim.treatment import TreatmentStrategiesType, TreatmentStrategyStatus
+from microsim.treatment_strategy_repository import TreatmentStrategyRepository
+from microsim.test.helper.population_helpers import get_test_people, get_test_pop_model_repository
+from microsim.trials.trial import Trial
+from microsim.trials.trial_description import KaiserTrialDescription
+from microsim.trials.trial_outcome_assessor_factory import TrialOutcomeAssessorFactory
+
+def get_unseeded_draws(i):
+    return [x._rng.uniform() for x in get_test_people(5)]
+
+class TestRandomStreams(unittest.TestCase):
+    def test_wave_draws_depend_only_on_key_and_wave(self):
+        streams = RandomStreams(17)
+        rng = streams.get_rng(4)
+        otherRng = RandomStreams(17).get_rng(4)
+        rng.start_wave(0)
+        rng.uniform(size=50)
+        rng.release()
+        rng.start_wave(1)
+        otherRng.start_wave(1)
+        self.assertEqual(list(rng.uniform(size=40)), list(otherRng.uniform(size=40)))
+        self.assertEqual(rng.normal(0.38, 6.99), otherRng.normal(0.38, 6.99))
+        self.assertEqual(rng.integers(0, 1000), otherRng.integers(0, 1000))
+
+    def test_streams_are_distinct(self):
+        streams = RandomStreams(17)
+        firstRng, secondRng = streams.get_rng(0), streams.get_rng(1)
+        firstRng.start_wave(0)
+        secondRng.start_wave(0)
+        self.assertNotEqual(firstRng.uniform(), secondRng.uniform())
+        self.assertNotEqual(firstRng.uniform(), RandomStreams(18).get_rng(0).uniform())
+
+    def test_draws_outside_waves_do_not_repeat_wave_draws(self):
+        rng = RandomStreams(17).get_rng(0)
+        initialization = rng.uniform()
+        rng.release()
+        rng.start_wave(0)
+        wave = rng.uniform()
+        rng.release()
+        self.assertEqual(1, rng._wave)
+        betweenWaves = rng.uniform()
+        self.assertEqual(3, len({initialization, wave, betweenWaves}))
+
+    def test_released_rng_is_compact_and_picklable(self):
+        rng = RandomStreams(17).get_rng(3)
+        rng.start_wave(0)
+        rng.uniform()
+        rng.release()
+        self.assertIsNone(rng._uniforms)
+        self.assertFalse(hasattr(rng, "__dict__"))
+        for rngCopy in [pickle.loads(pickle.dumps(rng)), copy.deepcopy(rng)]:
+            self.assertIsInstance(rngCopy, RandomStreamBlock)
+            rngCopy.start_wave(1)
+            rng.start_wave(1)
+            self.assertEqual(rng.uniform(), rngCopy.uniform())
+
+    def test_default_streams_hand_out_new_keys(self):
+        streams = RandomStreams.get_default()
+        self.assertIs(streams, RandomStreams.get_default())
+        self.assertNotEqual(streams.get_rng()._streamKey, streams.get_rng()._streamKey)
+
+    @unittest.skipUnless("fork" in mp.get_all_start_methods(), "needs forked processes")
+    def test_unseeded_people_differ_across_forks(self):
+        #the forked processes share the default streams of this process
+        RandomStreams.get_default()
+        with mp.get_context("fork").Pool(2, maxtasksperchild=1) as pool:
+            draws = pool.map(get_unseeded_draws, range(2), chunksize=1)
+        self.assertNotEqual(draws[0], draws[1])
+        self.assertNotEqual(draws[0], get_unseeded_draws(0))
+
+    def test_substream_draws_do_not_depend_on_earlier_draws(self):
+        streams = RandomStreams(17, substreams=True)
+        rng, otherRng = streams.get_rng(2), streams.get_rng(2)
+        for x in [rng, otherRng]:
+            x.start_wave(0)
+            x.start_substream(RandomStreams.outcomeSubstreams)
+        rng.uniform(size=10)
+        for x in [rng, otherRng]:
+            x.start_substream(RandomStreams.outcomeSubstreams + 1)
+        self.assertEqual(rng.uniform(), otherRng.uniform())
+
+class TestCommonRandomNumbers(unittest.TestCase):
+    def test_arms_without_treatment_are_identical(self):
+        controlPeople = get_test_people(20)
+        treatedPeople = Population.get_people_copy(controlPeople)
+        Trial.set_common_random_numbers(treatedPeople, controlPeople, seed=3)
+        columnarPeople = Population.get_people_copy(controlPeople)
+        Trial.set_common_random_numbers(columnarPeople, controlPeople, seed=3)
+        controlPop = Population(controlPeople, get_test_pop_model_repository())
+        treatedPop = Population(treatedPeople, get_test_pop_model_repository())
+        columnarPop = ColumnarPopulation(columnarPeople, get_test_pop_model_repository())
+        for pop in [controlPop, treatedPop, columnarPop]:
+            pop.advance(3)
+        for controlPerson, treatedPerson, columnarPerson in zip(controlPeople, treatedPeople, columnarPeople):
+            self.assertEqual(list(controlPerson._sbp), list(treatedPerson._sbp))
+            self.assertEqual(controlPerson._outcomes, treatedPerson._outcomes)
+            self.assertEqual(controlPerson._outcomes, columnarPerson._outcomes)
+
+    @staticmethod
+    def advance_and_record_draws(pop, years, treatmentStrategies=None):
+        """Advances pop as Trial.run advances the treated population and returns the numbers every model took,
+           by (stream key, wave, phase, uniform or normal), the phase identifies the model with substreams."""
+        draws = dict()
+        def record(take, kind):
+            def recorded_take(rng, n):
+                values = take(rng, n)
+                draws.setdefault((rng._streamKey, rng._wave, rng._phase, kind), []).extend(values.tolist())
+                return values
+            return recorded_take
+        with mock.patch.object(RandomStreamBlock, "take_uniforms", record(RandomStreamBlock.take_uniforms, "uniform")), \
+             mock.patch.object(RandomStreamBlock, "take_normals", record(RandomStreamBlock.take_normals, "normal")):
+            pop.advance(1, treatmentStrategies=treatmentStrategies)
+            if treatmentStrategies is not None:
+                treatmentStrategies._repository[TreatmentStrategiesType.BP.value].status = TreatmentStrategyStatus.MAINTAIN
+            pop.advance(years-1, treatmentStrategies=treatmentStrategies)
+        return draws
+
+    def test_model_draws_aligned_when_treated_arm_diverges(self):
+        controlPeople = get_test_people(60)
+        treatedPeople = Population.get_people_copy(controlPeople)
+        Trial.set_common_random_numbers(treatedPeople, controlPeople, seed=3)
+        treatmentStrategies = TreatmentStrategyRepository()
+        treatmentStrategies._repository[TreatmentStrategiesType.BP.value] = AddNBPMedsTreatmentStrategy(4)
+        controlDraws = self.advance_and_record_draws(Population(controlPeople, get_test_pop_model_repository()), 5)
+        treatedDraws = self.advance_and_record_draws(Population(treatedPeople, get_test_pop_model_repository()), 5, treatmentStrategies)
+        #the treatment changes the events of the treated arm
+        self.assertTrue(any(map(lambda x, y: x._outcomes!=y._outcomes, controlPeople, treatedPeople)))
+        #but a model that draws in both arms for a person and wave takes the same numbers in both, one arm may take more
+        sharedKeys = set(controlDraws.keys()) & set(treatedDraws.keys())
+        self.assertTrue(any(map(lambda x: x[2]>=2+RandomStreams.outcomeSubstreams, sharedKeys)))
+        for key in sharedKeys:
+            n = min(len(controlDraws[key]), len(treatedDraws[key]))
+            self.assertEqual(controlDraws[key][:n], treatedDraws[key][:n])
+
+class TestSeededTrial(unittest.TestCase):
+    def get_trial(self):
+        trial = Trial(KaiserTrialDescription(sampleSize=50, duration=2, treatmentStrategies="1bpMedsAdded", seed=7))
+        trial.run_analyze(TrialOutcomeAssessorFactory.get_trial_outcome_assessor())
+        return trial
+
+    def test_seeded_trial_is_reproduced(self):
+        trial, sameTrial = self.get_trial(), self.get_trial()
+        self.assertEqual(trial.results, sameTrial.results)
+        for pop, samePop in [(trial.treatedPop, sameTrial.treatedPop), (trial.controlPop, sameTrial.controlPop)]:
+            self.assertTrue(pop.get_all_person_years_as_df().equals(samePop.get_all_person_years_as_df()))
+        #the arms are sampled with seeds of their own
+        self.assertNotEqual(list(map(lambda x: x._name, trial.treatedPop._people)),
+                            list(map(lambda x: x._name, trial.controlPop._people)))
+
+if __name__ == "__main__":
+    unittest.main()
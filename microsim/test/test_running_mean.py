@@ -0,0 +1,34 @@
+import unittest
+
+import numpy as np
+
+from microsim.running_mean import RunningMean
+from microsim.test.helper.population_helpers import get_test_people
+
+class TestRunningMean(unittest.TestCase):
+    def test_same_as_numpy_mean_as_history_grows(self):
+        rng = np.random.default_rng(3)
+        history = list()
+        runningMean = RunningMean()
+        for i in range(140):
+            history.append(rng.normal(130, 20) * rng.choice([1e-8, 1., 1e8]))
+            self.assertEqual(np.array(history).mean(), runningMean.get_mean(history))
+            #the last value may be updated in place after a mean was computed
+            history[-1] = history[-1] - 5.
+            self.assertEqual(np.array(history).mean(), runningMean.get_mean(history))
+            if len(history)>3:
+                self.assertEqual(np.array(history[3:]).mean(), RunningMean().get_mean(history, 3))
+
+class TestPersonHistoryMean(unittest.TestCase):
+    def test_history_means(self):
+        person = get_test_people(1)[0]
+        for sbp in [150., 141.3, 133.7, 128.9, 137.2]:
+            person.append_to_history("sbp", sbp)
+            self.assertEqual(np.array(person._sbp).mean(), person.get_history_mean("sbp"))
+            if len(person._sbp)>2:
+                self.assertEqual(np.array(person._sbp[2:]).mean(), person.get_history_mean("sbp", start=2))
+        self.assertEqual(np.array(person._sbp[:3]).mean(), person.get_history_mean("sbp", stop=3))
+        self.assertIn(("sbp", 0, 3), person._historyMeans)
+
+if __name__ == "__main__":
+    unittest.main()
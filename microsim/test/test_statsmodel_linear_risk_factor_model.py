@@ -1,3 +1,4 @@
+import pickle
 from microsim.statsmodel_linear_risk_factor_model import StatsModelLinearRiskFactorModel
 from microsim.gender import NHANESGender
 from microsim.race_ethnicity import RaceEthnicity
@@ -252,6 +253,65 @@ class TestStatsModelLinearRiskFactorModel(unittest.TestCase):
 
         self.assertAlmostEqual(expected_model_result, actual_model_result, 5)
 
+    def getColumns(self, people):
+        return {"age": np.array([person._age[-1] for person in people]),
+                "sbp": np.array([person._sbp[-1] for person in people]),
+                "raceEthnicity": np.array([person._raceEthnicity for person in people], dtype=object)}
+
+    def testPopulationLinearPredictorsMatchPersonEstimates(self):
+        columns = self.getColumns(self.people)
+        for modelResult in [self.simpleModelResult, self.meanModelResult, self.logMeanModelResult,
+                            self.raceModelResult, self.meanLagModelResult, self.interactionModel]:
+            model = StatsModelLinearRiskFactorModel(modelResult)
+            expected_model_results = [model.estimate_next_risk(person) for person in self.people]
+
+            actual_model_results = model.estimate_next_risk_for_population(columns)
+
+            self.assertEqual(len(self.people), len(actual_model_results))
+            np.testing.assert_allclose(expected_model_results, actual_model_results, rtol=1e-12)
+
+    def testDesignMatrixWithCategoricalAndInteractionParameters(self):
+        columns = self.getColumns(self.people[:3])
+
+        raceDesignMatrix = StatsModelLinearRiskFactorModel(self.raceModelResult).get_design_matrix(columns)
+        interactionDesignMatrix = StatsModelLinearRiskFactorModel(self.interactionModel).get_design_matrix(columns)
+
+        self.assertEqual((3, len(self.raceModelResult._coefficients)-1), raceDesignMatrix.shape)
+        for i, person in enumerate(self.people[:3]):
+            raceColumn = list(self.raceModelResult._coefficients.keys()).index(f"raceEthnicity[T.{int(person._raceEthnicity)}]")-1
+            self.assertEqual(1, raceDesignMatrix[i, raceColumn])
+            self.assertEqual(person._sbp[-1]*person._age[-1], interactionDesignMatrix[i, 0])
+            self.assertEqual(person._sbp[-1], interactionDesignMatrix[i, 1])
+
+    def testCoefficientPlanIsCompiledOnce(self):
+        model = StatsModelLinearRiskFactorModel(self.interactionModel)
+        plan = model.coefficient_plan
+
+        self.assertEqual(("meanSbp#age", "meanSbp"), plan.names)
+        self.assertEqual(["meanSbp", "age"], [x.name for x in plan.arguments])
+        self.assertEqual(((0, 1), (0,)), plan.interactions)
+        self.assertEqual("sbp", plan.argumentsByName["meanSbp"].propName)
+        self.assertEqual("meanSbp", plan.argumentsByName["meanSbp"].vectorizedKey)
+        with self.assertRaises(ValueError):
+            plan.coefficients[0] = 1.0
+        with self.assertRaises(TypeError):
+            plan.argumentsByName["sbp"] = plan.arguments[0]
+
+        unpickledPlan = pickle.loads(pickle.dumps(plan))
+        self.assertEqual(plan.names, unpickledPlan.names)
+        self.assertEqual(["meanSbp", "age"], list(unpickledPlan.argumentsByName.keys()))
+        with self.assertRaises(ValueError):
+            unpickledPlan.coefficients[0] = 1.0
+
+    def testVectorizedArgumentsUsePlan(self):
+        model = StatsModelLinearRiskFactorModel(self.raceModelResult)
+        testPerson = self.people[21]
+        x = pd.Series({"age": testPerson._age[-1], "raceEthnicity": testPerson._raceEthnicity})
+
+        for coeff_name in model.non_intercept_params.keys():
+            self.assertEqual(model.get_model_argument_for_coeff_name(coeff_name, testPerson),
+                             model.get_model_argument_for_coeff_name_vectorized(coeff_name, x))
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -1,11 +1,12 @@
 from microsim.population_factory import PopulationFactory
 from microsim.trials.trial_type import TrialType
 from microsim.population import Population
+from microsim.random_streams import RandomStreams
 from microsim.treatment import TreatmentStrategiesType, TreatmentStrategyStatus
 from microsim.trials.trial_outcome_assessor import AnalysisType
 
+import numpy as np
 import pandas as pd
-import random
 
 class Trial:
     '''This class stores the trial setup, through the TrialDescription instance, trial populations, and trial results.
@@ -33,8 +34,24 @@ class Trial:
         The People will be obtained according to the TrialType, the PopulationModelRepository is determined 
         based on the PopulationType (eg for NHANES there is only one self-consistent PopulationModelRepository).'''
         treatedPeople, controlPeople = self.get_trial_people()
-        return (Population(treatedPeople, PopulationFactory.get_population_model_repo(self.trialDescription.popType)),
-                Population(controlPeople, PopulationFactory.get_population_model_repo(self.trialDescription.popType)))
+        #the Person index is unique in the trial, so seeding both populations with the trial seed gives every person their own stream
+        treatedPop = Population(treatedPeople, PopulationFactory.get_population_model_repo(self.trialDescription.popType), 
+                                horizon=self.trialDescription.duration, seed=self.trialDescription.seed)
+        controlPop = Population(controlPeople, PopulationFactory.get_population_model_repo(self.trialDescription.popType), 
+                                horizon=self.trialDescription.duration, seed=self.trialDescription.seed)
+        if self.trialDescription.commonRandomNumbers:
+            Trial.set_common_random_numbers(treatedPop._people, controlPop._people, self.trialDescription.seed)
+        return treatedPop, controlPop
+
+    @staticmethod
+    def set_common_random_numbers(treatedPeople, controlPeople, seed=None):
+        '''Gives the treated and control copy of every person the same random stream, with one substream per model and wave
+        (see RandomStreams), so that each model draws exactly the same numbers for a person in both arms of the trial.
+        Treated people are copies of the control people in the same order, see get_trial_people_identical.'''
+        streams = RandomStreams(seed, substreams=True)
+        for key, (treatedPerson, controlPerson) in enumerate(zip(treatedPeople, controlPeople)):
+            treatedPerson._rng = streams.get_rng(key)
+            controlPerson._rng = streams.get_rng(key)
             
     def get_trial_people(self):
         '''Returns treatedPeople and controlPeople based on TrialType.
@@ -57,12 +74,22 @@ class Trial:
     
     def get_trial_people_non_randomized(self):
         '''Returns People without performing any kind of process on them.
-        Sets a unique index on all Person objects of the trial.'''
-        treatedPeople = PopulationFactory.get_people(self.trialDescription.popType, **self.trialDescription.popArgs)
-        controlPeople = PopulationFactory.get_people(self.trialDescription.popType, **self.trialDescription.popArgs)
+        Sets a unique index on all Person objects of the trial.
+        With a trial seed, the treated and control people are sampled with two seeds derived from it, so they are not the same people.'''
+        treatedSeed, controlSeed = Trial.get_people_seeds(self.trialDescription.seed)
+        treatedPeople = PopulationFactory.get_people(self.trialDescription.popType, **{**self.trialDescription.popArgs, "seed": treatedSeed})
+        controlPeople = PopulationFactory.get_people(self.trialDescription.popType, **{**self.trialDescription.popArgs, "seed": controlSeed})
         PopulationFactory.set_index_in_people(controlPeople, start=treatedPeople.shape[0])
         return treatedPeople, controlPeople
     
+    @staticmethod
+    def get_people_seeds(seed):
+        '''Returns the seeds of the treated and control people of a trial that is not a potential outcomes trial,
+        two seeds generated by the np.random.SeedSequence of the trial seed, or None for both if the trial does not have a seed.'''
+        if seed is None:
+            return None, None
+        return tuple(map(int, np.random.SeedSequence(seed).generate_state(2)))
+    
     def get_trial_people_identical(self):
         '''treated and control people are identical.
         Sets a unique index on all Person objects of the trial.'''
@@ -83,7 +110,7 @@ class Trial:
             draws = self.trialDescription._rng.uniform(size=nDraws) 
         elif self.trialDescription.is_completely_randomized():
             draws = [0]*(nDraws//2) + [1]*(nDraws//2) if nDraws%2==0 else [0]*(nDraws//2) + [1]*((nDraws//2)+1)
-            draws = random.sample(draws, len(draws))
+            draws = self.trialDescription._rng.permutation(draws)
         else:
             raise RuntimeError("Unknown TrialType in Trial randomize_people function.")
         controlPeople = pd.Series([p for i,p in enumerate(people) if draws[i]<0.5])
@@ -115,9 +142,11 @@ class Trial:
                                     treatmentStrategies=None, 
                                     nWorkers=self.trialDescription.nWorkers)
             #advance treated population
+            #with nWorkers>1 the treated people stay in the workers between the two advance calls
             self.treatedPop.advance(1, 
                                     treatmentStrategies = self.trialDescription.treatmentStrategies,
-                                    nWorkers=self.trialDescription.nWorkers)
+                                    nWorkers=self.trialDescription.nWorkers,
+                                    gather=False)
             for key in TreatmentStrategiesType:
                 if self.trialDescription.treatmentStrategies._repository[key.value] is not None:
                     self.trialDescription.treatmentStrategies._repository[key.value].status = TreatmentStrategyStatus.MAINTAIN
@@ -152,13 +181,13 @@ class Trial:
         if not self.trialDescription.is_block_randomized():
             print(" "*25, "Printing covariate information for people still alive...")
             print(" "*25,
-                      "self=treated, alive people count= ",  f"{Population.get_alive_people_count(self.treatedPop._people):<8}",
+                      "self=treated, alive people count= ",  f"{Population.get_alive_people_count(self.treatedPop.get_alive_people()):<8}",
                       " "*11,
-                      "other=control, alive people count= ",  f"{Population.get_alive_people_count(self.controlPop._people):<8}")
+                      "other=control, alive people count= ",  f"{Population.get_alive_people_count(self.controlPop.get_alive_people()):<8}")
             print(" "*25, 
-                      "self=treated, unique alive people count= ",  f"{Population.get_unique_alive_people_count(self.treatedPop._people):<8}", 
+                      "self=treated, unique alive people count= ",  f"{Population.get_unique_alive_people_count(self.treatedPop.get_alive_people()):<8}", 
                       " "*4,
-                      "other=control, unique alive people count= ",  f"{Population.get_unique_alive_people_count(self.controlPop._people):<8}")
+                      "other=control, unique alive people count= ",  f"{Population.get_unique_alive_people_count(self.controlPop.get_alive_people()):<8}")
             self.treatedPop.print_lastyear_summary_comparison(self.controlPop)
         else:
             blockFactor = self.trialDescription.blockFactors[0]
@@ -182,8 +211,8 @@ class Trial:
     def print_treatment_strategy_variables_information(self):
         '''Prints various types of information about treatment strategy variables.'''
         print(" "*25, "Printing treatment strategy variable information at the end of the trial...")
-        print(" "*25, "self=treated, alive people count= ",  f"{Population.get_alive_people_count(self.treatedPop._people):<8}")
-        print(" "*25, "self=treated & alive, unique people count= ",  f"{Population.get_unique_alive_people_count(self.treatedPop._people):<8}")
+        print(" "*25, "self=treated, alive people count= ",  f"{Population.get_alive_people_count(self.treatedPop.get_alive_people()):<8}")
+        print(" "*25, "self=treated & alive, unique people count= ",  f"{Population.get_unique_alive_people_count(self.treatedPop.get_alive_people()):<8}")
         self.print_treatment_strategy_variables_distributions()
         self.print_treatment_strategy_variables_distributions_by_risk()    
 
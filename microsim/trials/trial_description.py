@@ -24,6 +24,11 @@ class TrialDescription:
     treatmentStrategies: holds information on how treatment will be applied on the treated population
     nWorkers: number of cores to use when a population advances
     personFilters: filters for inclusion/exclusion in the trial population
+    seed: if not None, the root seed of the trial. It seeds the sampling of the trial people (it is passed to the population factory
+          with popArgs), the randomization of the trial and the rngs of the Person-instances of the trial populations
+          (see Population.seed_people), so that a trial with a seed can be reproduced exactly, with any number of workers.
+    commonRandomNumbers: if True, the treated and control copy of a person draw the same random numbers from every model,
+                         so the two arms differ only because of the treatment. Only meaningful for TrialType.POTENTIAL_OUTCOMES.
     _rng: numpy random number generator for randomization of the trial
     popType: the population type to be used in the trial
     '''
@@ -34,7 +39,9 @@ class TrialDescription:
                  duration=5, 
                  treatmentStrategies=None, 
                  nWorkers=1, 
-                 personFilters=None):
+                 personFilters=None,
+                 seed=None,
+                 commonRandomNumbers=False):
         self.trialType = trialType
         self.blockFactors = blockFactors           
         self.sampleSize = sampleSize
@@ -42,7 +49,9 @@ class TrialDescription:
         self.treatmentStrategies = self.get_treatment_strategy(treatmentStrategies)
         self.nWorkers = nWorkers
         self.personFilters = personFilters
-        self._rng = np.random.default_rng() 
+        self.seed = seed
+        self.commonRandomNumbers = commonRandomNumbers
+        self._rng = np.random.default_rng(seed)
         self.popType = None
         self.is_valid_trial()
         
@@ -98,6 +107,7 @@ class TrialDescription:
         self.assess_sample_size()
         self.assess_duration()
         self.assess_number_of_workers()   
+        self.assess_common_random_numbers()
  
     def is_not_randomized(self):
         return self.trialType==TrialType.NON_RANDOMIZED
@@ -142,6 +152,10 @@ class TrialDescription:
         elif  (self.nWorkers>100):
             raise RuntimeError("Number of workers exceeds the maximum bound.")
             
+    def assess_common_random_numbers(self):
+        if self.commonRandomNumbers & (self.trialType!=TrialType.POTENTIAL_OUTCOMES):
+            raise RuntimeError("Common random numbers can only be used with a TrialType.POTENTIAL_OUTCOMES trial.")
+
     def __str__(self):
         rep = f"Trial Description\n"
         rep += f"\tTrial type: {self.trialType}\n"
@@ -150,6 +164,8 @@ class TrialDescription:
         rep += f"\tDuration: {self.duration}\n"
         rep += f"\tTreatment strategies: {list(self.treatmentStrategies._repository.keys())}\n"
         rep += f"\tNumber of workers: {self.nWorkers}\n"
+        rep += f"\tSeed: {self.seed}\n"
+        rep += f"\tCommon random numbers: {self.commonRandomNumbers}\n"
         rep += f"\tPerson filters: \n\t {self.personFilters}"
         return rep
 
@@ -171,8 +187,11 @@ class NhanesTrialDescription(TrialDescription):
                  personFilters=None,
                  year=1999, 
                  nhanesWeights=False, 
-                 distributions=False):
-        super().__init__(trialType, blockFactors, sampleSize, duration, treatmentStrategies, nWorkers=nWorkers, personFilters=personFilters)
+                 distributions=False,
+                 seed=None,
+                 commonRandomNumbers=False):
+        super().__init__(trialType, blockFactors, sampleSize, duration, treatmentStrategies, nWorkers=nWorkers, personFilters=personFilters, 
+                         seed=seed, commonRandomNumbers=commonRandomNumbers)
         self.year = year
         self.nhanesWeights=nhanesWeights
         self.distributions=distributions
@@ -180,7 +199,8 @@ class NhanesTrialDescription(TrialDescription):
                         "year":self.year,
                         "personFilters":self.personFilters,
                         "nhanesWeights":self.nhanesWeights,
-                        "distributions":self.distributions}
+                        "distributions":self.distributions,
+                        "seed":self.seed}
         self.popType = PopulationType.NHANES
 
     def __str__(self):
@@ -204,12 +224,16 @@ class KaiserTrialDescription(TrialDescription):
                  treatmentStrategies=TreatmentStrategyRepository(),
                  nWorkers=1,
                  personFilters=None,
-                 wmhSpecific=True):
-        super().__init__(trialType, blockFactors, sampleSize, duration, treatmentStrategies, nWorkers=nWorkers, personFilters=personFilters)
+                 wmhSpecific=True,
+                 seed=None,
+                 commonRandomNumbers=False):
+        super().__init__(trialType, blockFactors, sampleSize, duration, treatmentStrategies, nWorkers=nWorkers, personFilters=personFilters, 
+                         seed=seed, commonRandomNumbers=commonRandomNumbers)
         self._wmhSpecific = wmhSpecific
         self.popArgs = {"n":self.sampleSize,
                         "personFilters":self.personFilters,
-                        "wmhSpecific": self._wmhSpecific}
+                        "wmhSpecific": self._wmhSpecific,
+                        "seed": self.seed}
         self.popType = PopulationType.KAISER
 
     def __str__(self):
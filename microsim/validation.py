@@ -31,17 +31,18 @@ class Validation:
         pop.print_baseline_summary()
 
     @staticmethod
-    def nhanes_over_time(nWorkers=5, path=None):
+    def nhanes_over_time(nWorkers=5, path=None, columnar=False):
         '''Performs the over time validation of a population against the NHANES sample.
            The filters are used only for the NHANES comparison population from 2017.
            People that died prior to 2017 are not removed from the simulation population, if the simulation population is large enough
            and the death models work well, the resulting simulated population from an advancement of 18 years should be close to the
            NHANES comparison population.
            nWorkers determines the number of cores used
-           path=None will result in displaying the figures whereas an actual path will export them to that path'''
+           path=None will result in displaying the figures whereas an actual path will export them to that path
+           columnar=True advances a ColumnarPopulation instead of a Population'''
         nYears = 18
         popSize = 100000
-        pop = PopulationFactory.get_nhanes_population(n=popSize, year=1999, personFilters=None, nhanesWeights=True, distributions=False)
+        pop = PopulationFactory.get_nhanes_population(n=popSize, year=1999, personFilters=None, nhanesWeights=True, distributions=False, horizon=nYears, columnar=columnar)
         pop.advance_parallel(nYears, None, nWorkers)
         pf = PersonFilterFactory.get_person_filter(addCommonFilters=False)
         pf.add_filter(filterType="df",
@@ -121,13 +122,13 @@ class Validation:
         print(f"{'TRUE  0.044':>31}")
 
     @staticmethod
-    def kaiser_over_time(wmhSpecific=True, nWorkers=1):
+    def kaiser_over_time(wmhSpecific=True, nWorkers=1, columnar=False):
         print(f"\nVALIDATION OF SIMULATED POPULATION OVER TIME\n")
         print("Note: this function will return a dictionary of Pandas dataframes with the information needed to do a proportional hazards analysis...")
         print("Note: so ensure you will capture the return variable from this function call...")
         print("Note: because this might take a while...")
         popSize = 500000
-        pop = PopulationFactory.get_kaiser_population(n=popSize, personFilters=None, wmhSpecific=wmhSpecific)
+        pop = PopulationFactory.get_kaiser_population(n=popSize, personFilters=None, wmhSpecific=wmhSpecific, horizon=11, columnar=columnar)
         pop.advance(11, nWorkers=nWorkers)
         groupStrings = {1:"CT SBI", 2: "CT WMD", 3: "CT BOTH", 0: "CT NONE", 5:"MRI SBI", 6:"MRI WMD", 7:"MRI BOTH", 4:"MRI NONE"}
 
@@ -1,6 +1,7 @@
 import numpy as np
 
 from microsim.gender import NHANESGender
+from microsim.population_evaluation import PopulationEvaluation
 
 class WaistPrevalenceModel:
 
@@ -21,4 +22,9 @@ class WaistPrevalenceModel:
         lp = self.calc_linear_predictor_for_patient_characteristics(person._age[-1], person._gender, person._bmi[-1])
         draw = person._rng.normal(loc = 0.0, scale = 5.85)
         return lp+draw
+
+    def estimate_next_risk_for_population(self, columns, draws):
+        """Population version of estimate_next_risk, draws are the standard normal draws of the people in columns."""
+        lp = PopulationEvaluation.apply_by_categories(self.calc_linear_predictor_for_patient_characteristics, columns, ["gender"])
+        return lp+(0.0 + 5.85*draws)
         
@@ -42,6 +42,22 @@ class WMHModel:
             wmh = True
         return WMHOutcome(fatal, sbi, wmh, wmhSeverityUnknown, wmhSeverity, priorToSim = False)
         
+    def generate_next_outcomes_for_population(self, columns, draws):
+        '''Population version of generate_next_outcome, for people without a WMH outcome, eg when a population is initialized.
+        draws: the uniform draws of the people in columns, one row per person, the columns are used by the sbi, severity unknown and severity models.
+        generate_next_outcome draws the severity only when the severity is known, so the third column is a draw that generate_next_outcome
+        makes only for these people, the severity of the other people is computed but not used.'''
+        sbi = self.sbiModel.estimate_next_risk_for_population(columns, draws[:,0]).tolist()
+        wmhSeverityUnknown = self.wmhSeverityUnknownModel.estimate_next_risk_for_population(columns, draws[:,1]).tolist()
+        #the third uniform of a person with an unknown severity is not a draw of generate_next_outcome, it is taken but not used,
+        #this is harmless only because the WMH outcome is the last draw of the initialization, nothing draws after it before the
+        #random numbers of the person are released (see PersonFactory.get_kaiser_people)
+        wmhSeverity = self.wmhSeverityModel.estimate_next_risk_for_population(columns, draws[:,2])
+        return list(map(lambda sbi, wmhSeverityUnknown, wmhSeverity:
+                            WMHOutcome(False, sbi, True, wmhSeverityUnknown, None, priorToSim=False) if wmhSeverityUnknown else
+                            WMHOutcome(False, sbi, wmhSeverity != WMHSeverity.NO, wmhSeverityUnknown, wmhSeverity, priorToSim=False),
+                        sbi, wmhSeverityUnknown, wmhSeverity))
+
     def get_next_outcome(self, person):
         if len(person._outcomes[OutcomeType.WMH])==0:
             return self.generate_next_outcome(person)
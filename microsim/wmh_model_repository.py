@@ -7,3 +7,8 @@ class WMHModelRepository:
     
     def select_outcome_model_for_person(self, person):
         return self._model
+
+    def get_initial_outcomes_for_population(self, columns, draws):
+        """The WMH outcomes of a population that is being initialized, see WMHModel.generate_next_outcomes_for_population.
+           This is not get_next_outcomes_for_population, the WMH outcome of a person is obtained only once, when the person is initialized."""
+        return self._model.generate_next_outcomes_for_population(columns, draws)
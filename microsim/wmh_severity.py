@@ -5,6 +5,7 @@ from microsim.race_ethnicity import RaceEthnicity
 from microsim.gender import NHANESGender
 from microsim.smoking_status import SmokingStatus
 from microsim.modality import Modality
+from microsim.population_evaluation import PopulationEvaluation
 
 class WMHSeverity(Enum):
     NO = "no"
@@ -404,3 +405,15 @@ class WMHSeverityModel():
             return WMHSeverity.SEVERE
         else:
             raise RuntimeError("Draw inconsistent with cumulative probabilities in WMHSeverityModel.")
+
+    def estimate_next_risk_for_population(self, columns, draws):
+        """Population version of estimate_next_risk, draws are the uniform draws of the people in columns."""
+        lpWithoutIntercept = PopulationEvaluation.apply_by_categories(self.calc_linear_predictor_for_patient_characteristics, columns,
+                                                                      ["gender", "raceEthnicity", "smokingStatus", "statin", "afib", "pvd", "anyPhysicalActivity", "modality"])
+        lpNoWMH = lpWithoutIntercept + 8.2116 -0.26733
+        lpMildWMH = lpWithoutIntercept + 10.2237 -0.43271
+        lpModerateWMH = lpWithoutIntercept + 11.6124 -0.49049
+        return PopulationEvaluation.select_category(draws,
+                                                    list(map(PopulationEvaluation.inverse_logit, [lpNoWMH, lpMildWMH, lpModerateWMH])),
+                                                    [WMHSeverity.NO, WMHSeverity.MILD, WMHSeverity.MODERATE, WMHSeverity.SEVERE],
+                                                    "WMHSeverityModel.estimate_next_risk_for_population")